@@ -16,3 +16,5 @@ from api.v1.views.amenities import *
 from api.v1.views.places import *
 from api.v1.views.users import *
 from api.v1.views.places_reviews import *
+from api.v1.views.search import *
+from api.v1.views.batch import *
@@ -6,6 +6,8 @@ It includes routes to retrieve, create, delete, and update amenities.
 
 from flask import jsonify, abort, request
 from api.v1.views import app_views
+from api.v1.views.conditional import send_object
+from api.v1.views.pagination import paginate
 from models import storage
 from models.amenity import Amenity
 
@@ -13,8 +15,7 @@ from models.amenity import Amenity
 @app_views.route('/amenities', methods=['GET'])
 def get_amenities():
     """Retrieves the list of all Amenity objects."""
-    amenities = storage.all(Amenity).values()
-    return jsonify([amenity.to_dict() for amenity in amenities])
+    return paginate(Amenity)
 
 
 @app_views.route('/amenities/<amenity_id>', methods=['GET'])
@@ -23,7 +24,7 @@ def get_amenity(amenity_id):
     amenity = storage.get(Amenity, amenity_id)
     if amenity is None:
         abort(404)
-    return jsonify(amenity.to_dict())
+    return send_object(amenity)
 
 
 @app_views.route('/amenities/<amenity_id>', methods=['DELETE'])
@@ -63,5 +64,5 @@ def update_amenity(amenity_id):
     for key, value in data.items():
         if key not in ['id', 'created_at', 'updated_at']:
             setattr(amenity, key, value)
-    storage.save()
+    amenity.save()
     return jsonify(amenity.to_dict()), 200
@@ -0,0 +1,157 @@
+#!/usr/bin/python3
+"""
+This module provides the batch endpoints, creating, updating and deleting
+many objects of one resource with a single save.
+
+POST /api/v1/<resource>/batch takes a JSON object with any of:
+    "create": [{<attributes>}, ...]
+    "update": [{"id": <id>, <attributes>}, ...]
+    "delete": [<id>, ...]
+Every item is checked before anything changes, the objects it names being
+fetched with one get_many() per class. When all are valid the batch is
+applied and saved once, the created objects being inserted together by
+bulk_new(), and each item is answered in the same position of its list
+with {"status": 201 or 200, "object": ...}. Otherwise nothing is
+applied: the response is 400, the invalid items carry {"status": 400,
+404 or 409, "error": ...} and the valid ones {"status": 424}.
+"""
+
+from datetime import datetime, timezone
+from flask import jsonify, abort, request
+from api.v1.views import app_views
+from models import storage
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+# items accepted in one batch
+max_items = 10000
+# resource -> (class, attributes required to create, {attribute: class of
+# the object it references}, attributes an update leaves unchanged)
+resources = {
+    'amenities': (Amenity, ('name',), {}, ()),
+    'cities': (City, ('name', 'state_id'), {'state_id': State},
+               ('state_id',)),
+    'places': (Place, ('name', 'city_id', 'user_id'),
+               {'city_id': City, 'user_id': User}, ('city_id', 'user_id')),
+    'reviews': (Review, ('text', 'place_id', 'user_id'),
+                {'place_id': Place, 'user_id': User},
+                ('place_id', 'user_id')),
+    'states': (State, ('name',), {}, ()),
+    'users': (User, ('email', 'password'), {}, ('email',)),
+}
+# attributes the client never sets
+ignored = ('created_at', 'updated_at', '__class__')
+
+
+def error(status, description):
+    """Returns the result of an invalid item"""
+    return {'status': status, 'error': description}
+
+
+def ids_of(batch):
+    """Returns the ids named by the items of batch, each with the number
+    of items naming it"""
+    counts = {}
+    ids = [item.get('id') for item in batch['create'] + batch['update']
+           if isinstance(item, dict)] + batch['delete']
+    for id in ids:
+        if isinstance(id, str):
+            counts[id] = counts.get(id, 0) + 1
+    return counts
+
+
+def check_create(item, required, references, found, referenced, named):
+    """Returns the error of a create item, None if it is valid"""
+    if not isinstance(item, dict):
+        return error(400, "Not a JSON object")
+    for attr in required:
+        if attr not in item:
+            return error(400, "Missing " + attr)
+    if 'id' in item:
+        if not isinstance(item['id'], str) or not item['id']:
+            return error(400, "Invalid id")
+        if item['id'] in found or named[item['id']] > 1:
+            return error(409, "Duplicate id")
+    for attr in references:
+        if not isinstance(item[attr], str) or \
+                item[attr] not in referenced[attr]:
+            return error(404, "Unknown " + attr)
+    return None
+
+
+def check_id(id, found, named):
+    """Returns the error of an update or delete of object id, None if it
+    is valid"""
+    if not isinstance(id, str):
+        return error(400, "Missing id")
+    if id not in found:
+        return error(404, "Not found")
+    if named[id] > 1:
+        return error(409, "Duplicate id")
+    return None
+
+
+@app_views.route('/<any({}):resource>/batch'.format(
+    ', '.join(sorted(resources))), methods=['POST'])
+def batch(resource):
+    """Creates, updates and deletes the objects of resource listed in the
+    JSON body, all of them or none, saving once."""
+    cls, required, references, frozen = resources[resource]
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or \
+            not set(data) <= {'create', 'update', 'delete'}:
+        abort(400, description="Not a JSON")
+    batch = {}
+    for name in ['create', 'update', 'delete']:
+        batch[name] = data.get(name, [])
+        if not isinstance(batch[name], list):
+            abort(400, description="Invalid {}".format(name))
+    if sum(map(len, batch.values())) > max_items:
+        abort(400, description="Too many items")
+    named = ids_of(batch)
+    found = storage.get_many(cls, named)
+    referenced = {}
+    for attr, other in references.items():
+        ids = {item[attr] for item in batch['create']
+               if isinstance(item, dict) and isinstance(item.get(attr), str)}
+        referenced[attr] = storage.get_many(other, ids)
+    results = {
+        'create': [check_create(item, required, references, found,
+                                referenced, named)
+                   for item in batch['create']],
+        'update': [check_id(item.get('id') if isinstance(item, dict)
+                            else None, found, named)
+                   for item in batch['update']],
+        'delete': [check_id(id, found, named) for id in batch['delete']],
+    }
+    if any(result for items in results.values() for result in items):
+        for items in results.values():
+            items[:] = [result or {'status': 424} for result in items]
+        results['error'] = "Invalid batch"
+        return jsonify(results), 400
+    now = datetime.now(timezone.utc)
+    results['create'] = [cls(**{key: value for key, value in item.items()
+                                if key not in ignored})
+                         for item in batch['create']]
+    storage.bulk_new(results['create'], detach=False)
+    for i, item in enumerate(batch['update']):
+        obj = found[item['id']]
+        for key, value in item.items():
+            if key != 'id' and key not in ignored and key not in frozen:
+                setattr(obj, key, value)
+        obj.updated_at = now
+        storage.new(obj)
+        results['update'][i] = obj
+    for id in batch['delete']:
+        storage.delete(found[id])
+    storage.save()
+    results['create'] = [{'status': 201, 'object': obj.to_dict()}
+                         for obj in results['create']]
+    results['update'] = [{'status': 200, 'object': obj.to_dict()}
+                         for obj in results['update']]
+    results['delete'] = [{'status': 200} for id in batch['delete']]
+    return jsonify(results), 200
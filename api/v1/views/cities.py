@@ -15,6 +15,8 @@ the following functionalities:
 
 
 from api.v1.views import app_views
+from api.v1.views.conditional import send_object
+from api.v1.views.pagination import paginate
 from flask import jsonify, request, abort
 from models import storage
 from models.city import City
@@ -27,8 +29,7 @@ def get_cities_by_state(state_id):
     state = storage.get(State, state_id)
     if not state:
         abort(404)
-    cities = [city.to_dict() for city in state.cities]
-    return jsonify(cities)
+    return paginate(City, state_id=state_id)
 
 
 @app_views.route('/cities/<city_id>', methods=['GET'])
@@ -36,7 +37,7 @@ def get_city(city_id):
     city = storage.get(City, city_id)
     if not city:
         abort(404)
-    return jsonify(city.to_dict())
+    return send_object(city)
 
 
 @app_views.route('/cities/<city_id>', methods=['DELETE'])
@@ -83,5 +84,5 @@ def update_city(city_id):
         if key not in ['id', 'state_id', 'created_at', 'updated_at']:
             setattr(city, key, value)
 
-    storage.save()
+    city.save()
     return jsonify(city.to_dict()), 200
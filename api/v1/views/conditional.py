@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""
+Conditional GET support for the API
+
+A single object is tagged from its class, id and updated_at, and a
+collection from the storage version of its class and the request URL,
+so a request whose If-None-Match or If-Modified-Since still holds is
+answered 304 Not Modified before any object is serialized.
+"""
+
+from datetime import timezone
+from flask import current_app, jsonify, request
+import hashlib
+from werkzeug.http import is_resource_modified
+from models import storage
+
+
+def digest(text):
+    """Returns the strong entity tag made of text"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def object_validators(obj):
+    """Returns the (ETag, Last-Modified) of obj"""
+    modified = obj.updated_at
+    if modified.tzinfo is None:
+        modified = modified.replace(tzinfo=timezone.utc)
+    return digest("{}.{} {}".format(obj.__class__.__name__, obj.id,
+                                    modified.isoformat())), modified
+
+
+def collection_validators(cls):
+    """Returns the (ETag, Last-Modified) of the collection of class cls
+    served at the requested URL; Last-Modified may be None"""
+    tag, modified = storage.version(cls)
+    return digest("{} {}".format(tag, request.full_path)), modified
+
+
+def not_modified(etag, modified):
+    """Returns the 304 response if the validators of the request still
+    match etag and modified, otherwise None"""
+    if is_resource_modified(request.environ, etag=etag,
+                            last_modified=modified):
+        return None
+    return validated(current_app.response_class(status=304), etag, modified)
+
+
+def validated(response, etag, modified):
+    """Returns response carrying the ETag etag and the Last-Modified
+    modified, if any"""
+    response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = modified
+    return response
+
+
+def send_object(obj):
+    """Returns the JSON response of obj, or 304 if the client has it"""
+    etag, modified = object_validators(obj)
+    response = not_modified(etag, modified)
+    if response is None:
+        response = validated(jsonify(obj.to_dict()), etag, modified)
+    return response
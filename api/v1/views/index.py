@@ -8,12 +8,12 @@ Defines routes for index
 from flask import jsonify
 from api.v1.views import app_views
 from models import storage
-from models.amenity import Amenity
-from models.city import City
-from models.place import Place
-from models.review import Review
-from models.state import State
-from models.user import User
+from os import getenv
+import time
+
+# seconds a /stats answer is reused for, 0 disables the cache
+stats_ttl = float(getenv('HBNB_API_STATS_TTL', '0'))
+stats_cache = {"expires": 0.0, "data": None}
 
 
 @app_views.route('/status', methods=['GET'])
@@ -25,12 +25,16 @@ def status():
 @app_views.route('/stats', methods=['GET'])
 def stats():
     """Returns the counts of each object by type."""
-    stats_data = {
-        "amenities": storage.count(Amenity),
-        "cities": storage.count(City),
-        "places": storage.count(Place),
-        "reviews": storage.count(Review),
-        "states": storage.count(State),
-        "users": storage.count(User)
-    }
-    return jsonify(stats_data)
+    now = time.monotonic()
+    if stats_cache["data"] is None or now >= stats_cache["expires"]:
+        counts = storage.counts()
+        stats_cache["data"] = {
+            "amenities": counts["Amenity"],
+            "cities": counts["City"],
+            "places": counts["Place"],
+            "reviews": counts["Review"],
+            "states": counts["State"],
+            "users": counts["User"]
+        }
+        stats_cache["expires"] = now + stats_ttl
+    return jsonify(stats_cache["data"])
@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+"""
+Cursor based pagination for the API collection endpoints
+
+A collection is returned whole unless the client sends `limit` or
+`cursor`. Paged responses keep the JSON array body and announce the next
+page with an `X-Next-Cursor` header and a `Link: <...>; rel="next"`
+header. Cursors are opaque to clients. A collection sorted on an
+attribute pages on (value, id) pairs, which its cursors carry.
+
+With `stream=1` the collection (after `cursor`, if given) is sent as a
+chunked JSON array produced from successive storage pages, so neither
+the objects nor the serialized body are ever held in memory at once.
+"""
+
+import base64
+import binascii
+from flask import Response, abort, current_app, jsonify, request
+from flask import stream_with_context, url_for
+import json
+from api.v1.views.conditional import collection_validators, not_modified
+from api.v1.views.conditional import validated
+from models import storage
+from models.engine.indexes import is_number
+
+default_limit = 100
+max_limit = 1000
+stream_chunk = 500
+
+
+def encode_cursor(obj, sort=None):
+    """Returns the opaque cursor pointing just after obj, in the order of
+    the attribute sort if given"""
+    position = [obj.id]
+    if sort:
+        position.insert(0, getattr(obj, sort.lstrip("-")))
+    raw = json.dumps(position).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, sort=None):
+    """Returns the id encoded in cursor, or the (value, id) pair if the
+    collection is sorted on sort, aborting with 400 if invalid"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw.decode("utf-8"))
+    except (binascii.Error, ValueError, TypeError):
+        abort(400, description="Invalid cursor")
+    if not isinstance(position, list) or \
+            len(position) != (2 if sort else 1) or \
+            not isinstance(position[-1], str) or \
+            sort and not is_number(position[0]):
+        abort(400, description="Invalid cursor")
+    return tuple(position) if sort else position[0]
+
+
+def page_args(sort=None):
+    """Returns the (limit, after) requested, or (None, None) for all"""
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if limit is None and cursor is None:
+        return None, None
+    after = decode_cursor(cursor, sort) if cursor else None
+    return limit_arg(), after
+
+
+def limit_arg(default=default_limit):
+    """Returns the `limit` requested, default if there is none,
+    aborting with 400 if invalid"""
+    limit = request.args.get('limit')
+    if limit is None:
+        return default
+    try:
+        limit = int(limit)
+    except ValueError:
+        abort(400, description="Invalid limit")
+    if limit < 1:
+        abort(400, description="Invalid limit")
+    return min(limit, max_limit)
+
+
+def next_link(cursor):
+    """Returns the URL of the current endpoint at the page after cursor"""
+    args = dict(request.view_args or {})
+    args.update(request.args.to_dict())
+    args["cursor"] = cursor
+    return url_for(request.endpoint, _external=True, **args)
+
+
+def stream(cls, after, filters, ranges=None, sort=None):
+    """Yields the JSON array of the objects of class cls whose attributes
+    match filters, fetching them from storage one chunk at a time"""
+    dumps = current_app.json.dumps
+    sep = "["
+    while True:
+        objs = storage.page(cls, stream_chunk, after, ranges, sort,
+                            **filters)
+        for obj in objs:
+            yield sep + dumps(obj.to_dict())
+            sep = ","
+        if len(objs) < stream_chunk:
+            break
+        after = objs[-1].id
+        if sort:
+            after = (getattr(objs[-1], sort.lstrip("-")), after)
+    yield "[]" if sep == "[" else "]"
+
+
+def paginate(cls, ranges=None, sort=None, **filters):
+    """Returns the JSON response listing the objects of class cls whose
+    attributes match filters and lie within ranges, in the order of the
+    attribute sort if given, paged or streamed when the client asked;
+    or 304 if the collection did not change since the client got it"""
+    etag, modified = collection_validators(cls)
+    response = not_modified(etag, modified)
+    if response is None:
+        response = validated(listing(cls, ranges, sort, filters), etag,
+                             modified)
+    return response
+
+
+def listing(cls, ranges, sort, filters):
+    """Returns the JSON response of paginate()"""
+    if request.args.get('stream', '0').lower() in ('1', 'true', 'yes'):
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor, sort) if cursor else None
+        return Response(stream_with_context(
+            stream(cls, after, filters, ranges, sort)),
+            mimetype='application/json')
+    limit, after = page_args(sort)
+    if limit is None:
+        return jsonify([obj.to_dict() for obj in
+                        storage.page(cls, None, None, ranges, sort,
+                                     **filters)])
+    return paged(storage.page(cls, limit + 1, after, ranges, sort,
+                              **filters), limit, sort)
+
+
+def paged(objs, limit, sort=None):
+    """Returns the JSON response listing the first limit of objs, fetched
+    with limit + 1, and pointing at the next page when there is one"""
+    if limit is None:
+        return jsonify([obj.to_dict() for obj in objs])
+    response = jsonify([obj.to_dict() for obj in objs[:limit]])
+    if len(objs) > limit:
+        cursor = encode_cursor(objs[limit - 1], sort)
+        response.headers['X-Next-Cursor'] = cursor
+        response.headers['Link'] = '<{}>; rel="next"'.format(
+            next_link(cursor))
+    return response
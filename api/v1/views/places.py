@@ -4,12 +4,48 @@ This module provides RESTful API actions for Place objects.
 """
 
 from flask import jsonify, abort, request
+from math import isfinite
 from api.v1.views import app_views
+from api.v1.views.conditional import send_object
+from api.v1.views.pagination import limit_arg, page_args, paged, paginate
 from models import storage
 from models.city import City
 from models.place import Place
 from models.user import User
 
+# query parameter names of the sortable Place attributes
+place_ranges = {'price': 'price_by_night', 'rooms': 'number_rooms',
+                'bathrooms': 'number_bathrooms', 'guests': 'max_guest'}
+
+
+def range_args():
+    """Returns the (ranges, sort) requested with min_<name>, max_<name>
+    and sort=[-]<name> for the names of place_ranges, aborting with 400
+    if invalid"""
+    ranges = {}
+    for name, attr in place_ranges.items():
+        bounds = []
+        for bound in ['min_', 'max_']:
+            value = request.args.get(bound + name)
+            if value is not None:
+                try:
+                    value = float(value)
+                except ValueError:
+                    abort(400, description="Invalid " + bound + name)
+                if not isfinite(value):
+                    abort(400, description="Invalid " + bound + name)
+            bounds.append(value)
+        if bounds != [None, None]:
+            ranges[attr] = tuple(bounds)
+    sort = request.args.get('sort')
+    if sort is not None:
+        descending = sort.startswith('-')
+        name = sort[1:] if descending else sort
+        if name not in place_ranges:
+            abort(400, description="Invalid sort")
+        sort = ('-' if descending else '') + place_ranges[name]
+    return ranges, sort
+
 
 @app_views.route('/cities/<city_id>/places', methods=['GET'])
 def get_places_by_city(city_id):
@@ -17,8 +53,8 @@ def get_places_by_city(city_id):
     city = storage.get(City, city_id)
     if not city:
         abort(404)
-    places = [place.to_dict() for place in city.places]
-    return jsonify(places)
+    ranges, sort = range_args()
+    return paginate(Place, ranges, sort, city_id=city_id)
 
 
 @app_views.route('/places/<place_id>', methods=['GET'])
@@ -27,7 +63,7 @@ def get_place(place_id):
     place = storage.get(Place, place_id)
     if not place:
         abort(404)
-    return jsonify(place.to_dict())
+    return send_object(place)
 
 
 @app_views.route('/places/<place_id>', methods=['DELETE'])
@@ -89,5 +125,74 @@ def update_place(place_id):
         if key not in ['id', 'user_id', 'city_id', 'created_at', 'updated_at']:
             setattr(place, key, value)
 
-    storage.save()
+    place.save()
     return jsonify(place.to_dict()), 200
+
+
+@app_views.route('/places_search', methods=['POST'])
+def places_search():
+    """Retrieves the Place objects located in the states and cities
+    listed in the JSON body and offering all the amenities listed."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        abort(400, description="Not a JSON")
+    filters = {}
+    for name in ['states', 'cities', 'amenities']:
+        ids = data.get(name) or []
+        if not isinstance(ids, list) or \
+                not all(isinstance(id, str) for id in ids):
+            abort(400, description="Invalid {}".format(name))
+        filters[name] = ids
+    ranges, sort = range_args()
+    limit, after = page_args(sort)
+    places = storage.places_search(
+        limit=None if limit is None else limit + 1, after=after,
+        ranges=ranges, sort=sort, **filters)
+    return paged(places, limit, sort)
+
+
+def coordinate(name, bound):
+    """Returns the float query argument name, aborting with 400 unless it
+    lies within [-bound, bound]"""
+    try:
+        value = float(request.args[name])
+    except (KeyError, ValueError):
+        abort(400, description="Invalid {}".format(name))
+    if not isfinite(value) or not -bound <= value <= bound:
+        abort(400, description="Invalid {}".format(name))
+    return value
+
+
+def located(pairs):
+    """Returns the JSON list of the (place, distance) pairs, each place
+    with its distance_km"""
+    places = []
+    for place, distance in pairs:
+        place = place.to_dict()
+        place['distance_km'] = round(distance, 3)
+        places.append(place)
+    return jsonify(places)
+
+
+@app_views.route('/places/near', methods=['GET'])
+def places_near():
+    """Retrieves the Place objects within radius_km of (lat, lng),
+    nearest first."""
+    lat = coordinate('lat', 90)
+    lng = coordinate('lng', 180)
+    radius = coordinate('radius_km', float('inf'))
+    if radius <= 0:
+        abort(400, description="Invalid radius_km")
+    return located(storage.places_near(lat, lng, radius, limit_arg()))
+
+
+@app_views.route('/places/within', methods=['GET'])
+def places_within():
+    """Retrieves the Place objects inside the box from (south, west) to
+    (north, east), nearest to its center first."""
+    south, north = coordinate('south', 90), coordinate('north', 90)
+    west, east = coordinate('west', 180), coordinate('east', 180)
+    if south > north:
+        abort(400, description="Invalid box")
+    return located(storage.places_in_box(south, west, north, east,
+                                         limit_arg()))
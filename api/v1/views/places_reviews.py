@@ -6,6 +6,8 @@ This module provides RESTful API actions for Review objects.
 
 from flask import jsonify, abort, request
 from api.v1.views import app_views
+from api.v1.views.conditional import send_object
+from api.v1.views.pagination import paginate
 from models import storage
 from models.place import Place
 from models.review import Review
@@ -18,8 +20,7 @@ def get_reviews_by_place(place_id):
     place = storage.get(Place, place_id)
     if not place:
         abort(404)
-    reviews = [review.to_dict() for review in place.reviews]
-    return jsonify(reviews)
+    return paginate(Review, place_id=place_id)
 
 
 @app_views.route('/reviews/<review_id>', methods=['GET'])
@@ -28,7 +29,7 @@ def get_review(review_id):
     review = storage.get(Review, review_id)
     if not review:
         abort(404)
-    return jsonify(review.to_dict())
+    return send_object(review)
 
 
 @app_views.route('/reviews/<review_id>', methods=['DELETE'])
@@ -93,5 +94,5 @@ def update_review(review_id):
         ]:
             setattr(review, key, value)
 
-    storage.save()
+    review.save()
     return jsonify(review.to_dict()), 200
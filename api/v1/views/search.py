@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+"""
+This module provides the full-text search over Place descriptions and
+Review texts, and the name completion of states, cities and amenities.
+"""
+
+from flask import jsonify, abort, request
+from api.v1.views import app_views
+from api.v1.views.pagination import limit_arg
+from models import storage
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+
+# values of the type query parameter
+search_types = {'place': Place, 'review': Review}
+autocomplete_types = {'amenity': Amenity, 'city': City, 'state': State}
+# completions returned when no limit is given
+autocomplete_limit = 10
+
+
+@app_views.route('/search', methods=['GET'])
+def search():
+    """Retrieves the Place and Review objects whose text holds a word of
+    q, a word ending in * standing for any word it starts, best match
+    first, each with its score; type restricts them to places or
+    reviews."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        abort(400, description="Missing q")
+    cls = None
+    if 'type' in request.args:
+        cls = search_types.get(request.args['type'])
+        if cls is None:
+            abort(400, description="Invalid type")
+    results = []
+    for obj, score in storage.search(query, cls, limit_arg()):
+        obj = obj.to_dict()
+        obj['score'] = round(score, 6)
+        results.append(obj)
+    return jsonify(results)
+
+
+@app_views.route('/autocomplete', methods=['GET'])
+def autocomplete():
+    """Retrieves the State, City or Amenity objects, as chosen by type,
+    whose name starts with prefix, ignoring case, ordered by name."""
+    cls = autocomplete_types.get(request.args.get('type'))
+    if cls is None:
+        abort(400, description="Invalid type")
+    prefix = request.args.get('prefix')
+    if prefix is None:
+        abort(400, description="Missing prefix")
+    objs = storage.autocomplete(cls, prefix, limit_arg(autocomplete_limit))
+    return jsonify([obj.to_dict() for obj in objs])
@@ -7,13 +7,14 @@ from flask import jsonify, request, abort
 from models import storage
 from models.state import State
 from api.v1.views import app_views
+from api.v1.views.conditional import send_object
+from api.v1.views.pagination import paginate
 
 
 @app_views.route('/states', methods=['GET'])
 def get_states():
     """Retrieves the list of all State objects"""
-    states = [state.to_dict() for state in storage.all(State).values()]
-    return jsonify(states)
+    return paginate(State)
 
 
 @app_views.route('/states/<state_id>', methods=['GET'])
@@ -22,7 +23,7 @@ def get_state(state_id):
     state = storage.get(State, state_id)
     if not state:
         abort(404)
-    return jsonify(state.to_dict())
+    return send_object(state)
 
 
 @app_views.route(
@@ -67,5 +68,5 @@ def update_state(state_id):
         if key not in ignore_keys:
             setattr(state, key, value)
 
-    storage.save()
+    state.save()
     return jsonify(state.to_dict()), 200
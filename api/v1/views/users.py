@@ -5,6 +5,8 @@ This module provides RESTful API actions for User objects.
 
 from flask import jsonify, abort, request
 from api.v1.views import app_views
+from api.v1.views.conditional import send_object
+from api.v1.views.pagination import paginate
 from models import storage
 from models.user import User
 
@@ -12,8 +14,7 @@ from models.user import User
 @app_views.route('/users', methods=['GET'])
 def get_users():
     """Retrieves the list of all User objects."""
-    users = storage.all(User).values()
-    return jsonify([user.to_dict() for user in users])
+    return paginate(User)
 
 
 @app_views.route('/users/<user_id>', methods=['GET'])
@@ -22,7 +23,7 @@ def get_user(user_id):
     user = storage.get(User, user_id)
     if user is None:
         abort(404)
-    return jsonify(user.to_dict())
+    return send_object(user)
 
 
 @app_views.route('/users/<user_id>', methods=['DELETE'])
@@ -64,5 +65,5 @@ def update_user(user_id):
     for key, value in data.items():
         if key not in ['id', 'email', 'created_at', 'updated_at']:
             setattr(user, key, value)
-    storage.save()
+    user.save()
     return jsonify(user.to_dict()), 200
@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+"""
+Micro-benchmarks for the storage engines
+
+Each module can be run from the repository root, e.g.
+    python3 -m benchmarks.bench_reload --sizes 10000,100000
+"""
+
+import json
+import os
+import tempfile
+import time
+import uuid
+
+time_format = "%Y-%m-%dT%H:%M:%S.%f"
+class_names = ["State", "City", "User", "Place", "Review", "Amenity"]
+
+
+def make_record(cls_name, i):
+    """Returns the raw JSON record of a fake object of class cls_name"""
+    stamp = "2017-09-28T21:03:54.{:06d}".format(i % 1000000)
+    return {"__class__": cls_name, "id": str(uuid.uuid4()),
+            "created_at": stamp, "updated_at": stamp,
+            "name": "{} {}".format(cls_name, i)}
+
+
+def make_records(n):
+    """Returns a dict of n raw records spread over the model classes"""
+    records = {}
+    for i in range(n):
+        record = make_record(class_names[i % len(class_names)], i)
+        records["{}.{}".format(record["__class__"], record["id"])] = record
+    return records
+
+
+def write_records(path, records):
+    """Writes raw records to path the same way FileStorage.save does"""
+    with open(path, 'w') as f:
+        json.dump(records, f)
+
+
+def temp_path(name="file.json"):
+    """Returns a path inside a fresh temporary directory"""
+    return os.path.join(tempfile.mkdtemp(prefix="hbnb-bench-"), name)
+
+
+def empty_file_storage(storage):
+    """Points storage, or the storage a CachedStorage wraps, at a new
+    temporary file and drops its objects if it is a FileStorage; the
+    other engines keep the database their environment names"""
+    from models.engine.file_storage import FileStorage
+    storage = getattr(storage, "storage", storage)
+    if isinstance(storage, FileStorage):
+        storage._FileStorage__file_path = temp_path()
+        storage._FileStorage__objects.clear()
+
+
+def timed(func, repeat=1):
+    """Calls func repeat times and returns the mean duration in seconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def parse_sizes(text):
+    """Parses a comma separated list of sizes such as 10000,100000"""
+    return [int(size) for size in text.split(",") if size]
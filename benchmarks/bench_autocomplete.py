@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+"""
+storage.autocomplete() benchmark on City names
+
+Times the first 10 cities whose name starts with a prefix against the
+scan and sort it replaces.
+"""
+
+import argparse
+import models
+import random
+from benchmarks import empty_file_storage, parse_sizes, timed
+from models.city import City
+
+syllables = ["san", "ta", "ro", "sa", "mon", "ver", "de", "la", "port",
+             "ville", "ber", "ka", "lo", "ne", "ri"]
+
+
+def populate(storage, size):
+    """Adds size cities with random names"""
+    rand = random.Random(size)
+    for i in range(size):
+        name = "".join(rand.choice(syllables)
+                       for _ in range(rand.randrange(2, 5)))
+        storage.new(City(name=name.capitalize(), state_id="s"))
+
+
+def scan_autocomplete(storage, prefix, limit):
+    """The scan and sort autocomplete() replaces, kept for comparison"""
+    prefix = prefix.casefold()
+    cities = [city for city in storage.all(City).values()
+              if city.name.casefold().startswith(prefix)]
+    cities.sort(key=lambda city: (city.name.casefold(), city.id))
+    return cities[:limit]
+
+
+def run(storage, size, repeat):
+    """Benchmarks the completions among size cities"""
+    populate(storage, size)
+    storage.autocomplete(City, "", 1)
+    for prefix in ["S", "San", "Santaro"]:
+        index = timed(lambda: storage.autocomplete(City, prefix, 10), repeat)
+        scan = timed(lambda: scan_autocomplete(storage, prefix, 10),
+                     max(1, repeat // 100))
+        print("{:>9} cities | prefix {:8} | index {:9.3f} us | "
+              "scan {:9.3f} ms".format(size, prefix, index * 1e6,
+                                       scan * 1e3))
+
+
+def main():
+    """Parses the command line and runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=parse_sizes,
+                        default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+    storage = models.storage
+    for size in args.sizes:
+        empty_file_storage(storage)
+        run(storage, size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
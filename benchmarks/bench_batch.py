@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+"""
+Batch endpoint benchmark creating places
+
+Runs against whatever engine HBNB_TYPE_STORAGE selects, through the Flask
+test client. Creating places with one POST /cities/<id>/places each is
+compared with POST /places/batch carrying all of them.
+"""
+
+import argparse
+import models
+from api.v1.app import app
+from benchmarks import empty_file_storage, parse_sizes, timed
+from models.city import City
+from models.state import State
+from models.user import User
+
+
+def run(client, size):
+    """Creates size places one by one, then size more in one batch"""
+    state = State(name="Bench")
+    city = City(name="Bench", state_id=state.id)
+    user = User(email="bench@hbnb", password="bench")
+    for obj in (state, city, user):
+        models.storage.new(obj)
+    models.storage.save()
+    places = [{"name": "Place {}".format(i), "user_id": user.id,
+               "city_id": city.id} for i in range(size)]
+    url = '/api/v1/cities/{}/places'.format(city.id)
+
+    def one_by_one():
+        """Posts every place on its own"""
+        for place in places:
+            client.post(url, json=place)
+
+    def batch():
+        """Posts every place in one batch"""
+        response = client.post('/api/v1/places/batch',
+                               json={"create": places})
+        assert response.status_code == 200, response.json
+    single = timed(one_by_one)
+    batched = timed(batch)
+    print("{:>7} places | one by one {:8.2f} s | batch {:8.2f} s".format(
+        size, single, batched))
+
+
+def main():
+    """Parses the command line and runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=parse_sizes, default="1000,5000")
+    args = parser.parse_args()
+    storage = models.storage
+    empty_file_storage(storage)
+    client = app.test_client()
+    for size in args.sizes:
+        run(client, size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+"""
+Bulk insert benchmark creating places in the database
+
+Runs with HBNB_TYPE_STORAGE=db. Inserting places with new() and one
+save(), which adds every object to the session and flushes them one
+INSERT at a time, is compared with bulk_new() at several batch sizes,
+with and without detaching the objects afterwards.
+"""
+
+import argparse
+import models
+import sys
+from benchmarks import parse_sizes, timed
+from models.city import City
+from models.place import Place
+from models.state import State
+from models.user import User
+
+
+def make_places(city, user, size):
+    """Returns size new places of city and user"""
+    return [Place(name="Place {}".format(i), city_id=city.id,
+                  user_id=user.id, price_by_night=i % 500)
+            for i in range(size)]
+
+
+def run(storage, size, batches):
+    """Inserts size places per object, then in bulk for each batch size"""
+    state = State(name="Bench")
+    city = City(name="Bench", state_id=state.id)
+    user = User(email="bench@hbnb", password="bench")
+    storage.bulk_new([state, city, user])
+    storage.save()
+
+    def one_by_one(places):
+        """Returns a function adding places one object at a time"""
+        def insert():
+            """Adds every place to the session, then commits"""
+            for place in places:
+                storage.new(place)
+            storage.save()
+            storage.close()
+        return insert
+
+    def bulk(places, batch_size, detach):
+        """Returns a function inserting places with bulk_new()"""
+        def insert():
+            """Inserts every place in batches, then commits"""
+            storage.bulk_new(places, batch_size, detach)
+            storage.save()
+            storage.close()
+        return insert
+    seconds = timed(one_by_one(make_places(city, user, size)))
+    print("{:>8} places | new() per object         | {:9.0f} rows/s".format(
+        size, size / seconds))
+    for batch_size in batches:
+        for detach in (True, False):
+            seconds = timed(bulk(make_places(city, user, size), batch_size,
+                                 detach))
+            print("{:>8} places | bulk_new({:>5}, detach={:d}) | {:9.0f} "
+                  "rows/s".format(size, batch_size, detach, size / seconds))
+
+
+def main():
+    """Parses the command line and runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=parse_sizes, default="10000,100000")
+    parser.add_argument("--batches", type=parse_sizes,
+                        default="100,1000,5000")
+    args = parser.parse_args()
+    if models.storage_t != "db":
+        sys.exit("run with HBNB_TYPE_STORAGE=db")
+    for size in args.sizes:
+        run(models.storage, size, args.batches)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+"""
+Read-through cache benchmark on State objects
+
+Runs against whatever engine HBNB_TYPE_STORAGE selects. get(), all() and
+count() of states are timed directly on the storage and through a
+CachedStorage, in a new session for every call as in an API request.
+"""
+
+import argparse
+import models
+from benchmarks import empty_file_storage, parse_sizes, timed
+from models.engine.cache import CachedStorage
+from models.state import State
+
+
+def populate(storage, size):
+    """Adds size states and returns their ids"""
+    ids = []
+    for i in range(size):
+        state = State(name="State {}".format(i))
+        storage.new(state)
+        ids.append(state.id)
+    storage.save()
+    return ids
+
+
+def request(storage, func):
+    """Returns a function calling func(storage) and closing the session,
+    which on the file engine reloads only if the file changed"""
+    def call():
+        """Runs func in its own session"""
+        func(storage)
+        storage.close()
+    return call
+
+
+def run(storage, size, repeat):
+    """Benchmarks the reads of size states with and without the cache"""
+    ids = populate(storage, size)
+    id = ids[size // 2]
+    cached = CachedStorage(storage, ["State"])
+    reads = [("get", lambda s: s.get(State, id)),
+             ("all", lambda s: s.all(State)),
+             ("count", lambda s: s.count(State))]
+    for label, func in reads:
+        direct = timed(request(storage, func), repeat)
+        through = timed(request(cached, func), repeat)
+        print("{:>7} states | {:5} | direct {:10.2f} us | "
+              "cached {:10.2f} us".format(size, label, direct * 1e6,
+                                          through * 1e6))
+    print("{:>7} states | {}".format(size, cached.cache_metrics()))
+
+
+def main():
+    """Parses the command line and runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=parse_sizes, default="100,1000")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    storage = models.storage
+    empty_file_storage(storage)
+    for size in args.sizes:
+        run(storage, size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+"""
+Cold start of FileStorage with lazily built objects
+
+For every size, a JSON file of size records is written, then read by a
+fresh process in each mode:
+    lazy  - reload() files the records and builds only the object a
+            first page() returns, as the storage does
+    eager - all() is called after reload() and builds every object, which
+            is what reload() used to do
+Each reports the time from reload() to the first object returned and the
+peak memory of the process.
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from benchmarks import make_records, parse_sizes, temp_path
+from benchmarks import write_records
+from models.engine.file_storage import FileStorage
+
+modes = ["lazy", "eager"]
+
+
+def rss_mb():
+    """Returns the peak resident memory of the process in MB"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(mode, path):
+    """Prints the cold start cost of mode on the JSON file at path"""
+    FileStorage._FileStorage__file_path = path
+    before = rss_mb()
+    start = time.perf_counter()
+    storage = FileStorage()
+    storage.reload()
+    if mode == "eager":
+        storage.all()
+    storage.page("State", 1)
+    seconds = time.perf_counter() - start
+    print("{:>9} objects | {:5} | start {:9.1f} ms | peak RSS {:6.0f} MB "
+          "(+{:.0f} MB)".format(storage.count(), mode, seconds * 1000,
+                                rss_mb(), rss_mb() - before))
+
+
+def run(size):
+    """Writes size records and measures each mode in its own process,
+    writing them from another one so that no process starts with the
+    peak memory of the records"""
+    path = temp_path()
+    command = [sys.executable, "-m", "benchmarks.bench_coldstart",
+               "--path", path]
+    subprocess.run(command + ["--write", str(size)], check=True)
+    for mode in modes:
+        subprocess.run(command + ["--mode", mode], check=True)
+    shutil.rmtree(os.path.dirname(path))
+
+
+def main():
+    """Parses the command line and runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=parse_sizes,
+                        default="10000,100000,1000000")
+    parser.add_argument("--mode", choices=modes, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    parser.add_argument("--write", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.write:
+        write_records(args.path, make_records(args.write))
+        return
+    if args.mode:
+        measure(args.mode, args.path)
+        return
+    for size in args.sizes:
+        run(size)
+
+
+if __name__ == "__main__":
+    main()
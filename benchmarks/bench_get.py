@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+storage.get() micro-benchmarks for the six model classes
+
+Runs against whatever engine HBNB_TYPE_STORAGE selects. For every class
+the direct lookup is compared with the old all(cls).get(key) scan, for
+both existing and missing ids.
+"""
+
+import argparse
+import models
+from benchmarks import empty_file_storage, parse_sizes, timed
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+classes = [Amenity, City, Place, Review, State, User]
+
+
+def populate(storage, size):
+    """Adds size objects of every class and returns their ids"""
+    ids = {}
+    for cls in classes:
+        ids[cls] = []
+        for i in range(size):
+            obj = cls(name="{} {}".format(cls.__name__, i), state_id="s",
+                      city_id="c", user_id="u", place_id="p", text="t",
+                      email="e", password="p")
+            storage.new(obj)
+            ids[cls].append(obj.id)
+    storage.save()
+    return ids
+
+
+def scan_get(storage, cls, id):
+    """The pre-index implementation of get, kept for comparison"""
+    return storage.all(cls).get("{}.{}".format(cls.__name__, id))
+
+
+def run(storage, size, repeat):
+    """Benchmarks get for every class with size objects per class"""
+    ids = populate(storage, size)
+    print("{} objects per class".format(size))
+    for cls in classes:
+        id = ids[cls][size // 2]
+        hit = timed(lambda: storage.get(cls, id), repeat)
+        miss = timed(lambda: storage.get(cls, "missing"), repeat)
+        scan = timed(lambda: scan_get(storage, cls, id),
+                     max(1, repeat // 100))
+        print("  {:8} get {:9.2f} us | miss {:9.2f} us | "
+              "all(cls) scan {:11.2f} us".format(cls.__name__, hit * 1e6,
+                                                 miss * 1e6, scan * 1e6))
+
+
+def main():
+    """Parses the command line and runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=parse_sizes, default="1000,10000")
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+    storage = models.storage
+    empty_file_storage(storage)
+    for size in args.sizes:
+        run(storage, size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+"""
+Key-value storage benchmark against FileStorage
+
+For every size, a JSON file and a dbm database of the same records are
+written, then each engine is measured in a process of its own: the time
+to start and read a first object, the mean time of a get() of a random
+object and of a save() after changing one, and the peak memory of the
+process.
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from benchmarks import make_records, parse_sizes, temp_path, timed
+from benchmarks import write_records
+from models.engine.file_storage import FileStorage, classes
+from models.engine.kv_storage import KVStorage
+
+engines = ["file", "kv"]
+
+
+def rss_mb():
+    """Returns the peak resident memory of the process in MB"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_database(path, records, chunk=10000):
+    """Writes records to the dbm database at path, chunk at a time"""
+    storage = KVStorage(path)
+    storage.reload()
+    items = list(records.values())
+    for start in range(0, len(items), chunk):
+        for record in items[start:start + chunk]:
+            storage.new(classes[record["__class__"]](**record))
+        storage.save()
+        storage.reload()
+    storage.shutdown()
+
+
+def open_storage(engine, path):
+    """Returns the started storage of engine on path"""
+    if engine == "file":
+        FileStorage._FileStorage__file_path = path
+        storage = FileStorage()
+    else:
+        storage = KVStorage(path)
+    storage.reload()
+    return storage
+
+
+def measure(engine, path, keys, repeat):
+    """Prints the costs of engine on the records at path"""
+    cls_name, id = random.choice(keys).split(".")
+    start = time.perf_counter()
+    storage = open_storage(engine, path)
+    storage.get(cls_name, id)
+    startup = time.perf_counter() - start
+
+    def get():
+        """Reads a random object"""
+        cls_name, id = random.choice(keys).split(".")
+        storage.get(cls_name, id)
+
+    def save():
+        """Changes a random object and saves it"""
+        cls_name, id = random.choice(keys).split(".")
+        obj = storage.get(cls_name, id)
+        obj.name = "renamed {}".format(time.perf_counter())
+        storage.new(obj)
+        storage.save()
+    seconds_get = timed(get, repeat * 100)
+    seconds_save = timed(save, repeat)
+    print("{:>9} objects | {:4} | start {:9.1f} ms | get {:8.1f} us | "
+          "save {:9.2f} ms | peak RSS {:6.0f} MB".format(
+              len(keys), engine, startup * 1000, seconds_get * 1e6,
+              seconds_save * 1000, rss_mb()))
+
+
+def run(size, repeat):
+    """Writes size records for each engine and measures them apart"""
+    path = temp_path()
+    directory = os.path.dirname(path)
+    records = make_records(size)
+    write_records(path, records)
+    write_database(os.path.join(directory, "file.db"), records)
+    with open(os.path.join(directory, "keys.json"), 'w') as f:
+        json.dump(list(records), f)
+    del records
+    for engine in engines:
+        target = path if engine == "file" else \
+            os.path.join(directory, "file.db")
+        subprocess.run([sys.executable, "-m", "benchmarks.bench_kv",
+                        "--engine", engine, "--path", target,
+                        "--repeat", str(repeat)], check=True)
+    shutil.rmtree(directory)
+
+
+def main():
+    """Parses the command line and runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=parse_sizes,
+                        default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--engine", choices=engines,
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.engine:
+        keys_path = os.path.join(os.path.dirname(args.path), "keys.json")
+        with open(keys_path, 'r') as f:
+            keys = json.load(f)
+        measure(args.engine, args.path, keys, args.repeat)
+        return
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+"""
+Migration benchmark between a JSON file and the database
+
+Runs with HBNB_TYPE_STORAGE=db. Writes a JSON file of size objects with
+consistent foreign keys, imports it into the database, exports it back
+to another file, and reports the rows per second of each direction and
+the peak memory of the process.
+"""
+
+import argparse
+import json
+import models
+import os
+import resource
+import shutil
+import sys
+from benchmarks import parse_sizes, temp_path, timed
+from models.engine.migration import Migration
+
+stamp = "2017-09-28T21:03:54.000000"
+
+
+def write_file(path, size):
+    """Writes size records to path: a state per 100, a city per 10, a
+    user per 10, a review per 4 places and 10 amenities, one record at a
+    time"""
+    def record(cls_name, i, **attrs):
+        """Returns the key and JSON text of a record"""
+        id = "{}-{:09d}".format(cls_name.lower(), i)
+        attrs.update({"__class__": cls_name, "id": id,
+                      "created_at": stamp, "updated_at": stamp})
+        return json.dumps(cls_name + "." + id) + ": " + json.dumps(attrs)
+    places = size * 2 // 3
+    with open(path, 'w') as f:
+        parts = [record("Amenity", i, name="Amenity {}".format(i))
+                 for i in range(10)]
+        for i in range(max(places // 100, 1)):
+            parts.append(record("State", i, name="State {}".format(i)))
+        for i in range(max(places // 10, 1)):
+            parts.append(record("City", i, name="City {}".format(i),
+                                state_id="state-{:09d}".format(i // 10)))
+            parts.append(record("User", i, email="{}@hbnb".format(i),
+                                password="pwd"))
+        f.write("{" + ",\n".join(parts))
+        for i in range(places):
+            f.write(",\n" + record(
+                "Place", i, name="Place {}".format(i),
+                city_id="city-{:09d}".format(i // 10),
+                user_id="user-{:09d}".format(i // 10),
+                price_by_night=i % 500,
+                amenity_ids=["amenity-{:09d}".format(j)
+                             for j in range(i % 3)]))
+            if i % 4 == 0:
+                f.write(",\n" + record(
+                    "Review", i, text="Review {}".format(i),
+                    place_id="place-{:09d}".format(i),
+                    user_id="user-{:09d}".format(i // 10)))
+        f.write("}")
+
+
+def rss_mb():
+    """Returns the peak resident memory of the process in MB"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(size, chunk):
+    """Benchmarks importing and exporting about size objects"""
+    source = temp_path()
+    write_file(source, size)
+    target = os.path.join(os.path.dirname(source), "export.json")
+    migration = Migration(models.storage, source, chunk=chunk)
+    seconds = timed(migration.to_db)
+    rows = sum(sum(counts.values()) for counts in migration.stats.values())
+    print("{:>9} objects | import {:9.0f} rows/s | {:7.1f} s | "
+          "peak RSS {:6.0f} MB".format(size, rows / seconds, seconds,
+                                       rss_mb()))
+    migration = Migration(models.storage, target, chunk=chunk)
+    seconds = timed(migration.to_file)
+    rows = sum(counts["copied"] for counts in migration.stats.values())
+    print("{:>9} objects | export {:9.0f} rows/s | {:7.1f} s | "
+          "peak RSS {:6.0f} MB".format(size, rows / seconds, seconds,
+                                       rss_mb()))
+    shutil.rmtree(os.path.dirname(source))
+
+
+def main():
+    """Parses the command line and runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=parse_sizes, default="100000")
+    parser.add_argument("--chunk", type=int, default=5000)
+    args = parser.parse_args()
+    if models.storage_t != "db":
+        sys.exit("run with HBNB_TYPE_STORAGE=db")
+    for size in args.sizes:
+        run(size, args.chunk)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+storage.places_near() benchmark: grid index against a linear scan
+
+Places are spread at random over the inhabited latitudes, then the
+radius search is timed against the scan of every place it replaces.
+"""
+
+import argparse
+import models
+import random
+from benchmarks import empty_file_storage, parse_sizes, timed
+from models.engine import geo
+from models.place import Place
+
+
+def populate(storage, size):
+    """Adds size places at random locations"""
+    rand = random.Random(size)
+    for i in range(size):
+        storage.new(Place(name="Place {}".format(i), city_id="c",
+                          user_id="u", latitude=rand.uniform(-60, 70),
+                          longitude=rand.uniform(-180, 180)))
+
+
+def scan_near(storage, lat, lng, radius_km, limit):
+    """The linear scan places_near replaces, kept for comparison"""
+    found = []
+    for place in storage.all(Place).values():
+        if place.latitude is None or place.longitude is None:
+            continue
+        distance = geo.distance_km(lat, lng, place.latitude, place.longitude)
+        if distance <= radius_km:
+            found.append((distance, place.id, place))
+    found.sort()
+    return [(place, distance) for distance, id, place in found[:limit]]
+
+
+def run(storage, size, radius_km, repeat):
+    """Benchmarks a radius search among size places"""
+    populate(storage, size)
+    rand = random.Random(0)
+    points = [(rand.uniform(-60, 70), rand.uniform(-180, 180))
+              for _ in range(repeat)]
+    queries = iter(points)
+    index = timed(lambda: storage.places_near(*next(queries), radius_km,
+                                              100), repeat)
+    queries = iter(points)
+    scans = max(1, repeat // 10)
+    scan = timed(lambda: scan_near(storage, *next(queries), radius_km, 100),
+                 scans)
+    print("{:>9} places | grid {:9.3f} ms | scan {:9.3f} ms".format(
+        size, index * 1e3, scan * 1e3))
+
+
+def main():
+    """Parses the command line and runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=parse_sizes,
+                        default="10000,100000,1000000")
+    parser.add_argument("--radius", type=float, default=50.0)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+    storage = models.storage
+    for size in args.sizes:
+        empty_file_storage(storage)
+        run(storage, size, args.radius, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""
+storage.page() range and top-k benchmark on Place.price_by_night
+
+Times the cheapest 20 places above a price and a narrow price range
+against the scan-and-sort they replace.
+"""
+
+import argparse
+import models
+import random
+from benchmarks import empty_file_storage, parse_sizes, timed
+from models.place import Place
+
+
+def populate(storage, size):
+    """Adds size places with random prices and capacities"""
+    rand = random.Random(size)
+    for i in range(size):
+        storage.new(Place(name="Place {}".format(i), city_id="c",
+                          user_id="u", price_by_night=rand.randrange(10000),
+                          max_guest=rand.randrange(1, 12)))
+
+
+def scan_page(storage, low, high, limit):
+    """The scan and sort page() replaces, kept for comparison"""
+    places = [place for place in storage.all(Place).values()
+              if low <= place.price_by_night <= high]
+    places.sort(key=lambda place: (place.price_by_night, place.id))
+    return places[:limit]
+
+
+def run(storage, size, repeat):
+    """Benchmarks the queries among size places"""
+    populate(storage, size)
+    storage.page(Place, 1, None, None, "price_by_night")
+    queries = [("top 20 from 5000", (5000, None), 20),
+               ("range 5000-5010", (5000, 5010), None)]
+    for label, (low, high), limit in queries:
+        ranges = {"price_by_night": (low, high)}
+        index = timed(lambda: storage.page(Place, limit, None, ranges,
+                                           "price_by_night"), repeat)
+        scan = timed(lambda: scan_page(storage, low, high or 10000, limit),
+                     max(1, repeat // 10))
+        print("{:>9} places | {:16} | index {:9.3f} ms | "
+              "scan {:9.3f} ms".format(size, label, index * 1e3, scan * 1e3))
+
+
+def main():
+    """Parses the command line and runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=parse_sizes,
+                        default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+    storage = models.storage
+    for size in args.sizes:
+        empty_file_storage(storage)
+        run(storage, size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
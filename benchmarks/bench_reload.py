@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""
+Per-request cost of FileStorage.close() at teardown
+
+For every size three cases are measured:
+    full        - the old behaviour, every record is parsed and rebuilt
+    unchanged   - close() when nobody wrote to the file since last sync
+    one changed - close() after another writer updated a single record
+"""
+
+import argparse
+from benchmarks import make_records, parse_sizes, temp_path, timed
+from benchmarks import write_records
+from models.engine.file_storage import FileStorage
+
+
+def reset(storage):
+    """Forgets everything FileStorage knows about the file"""
+    FileStorage._FileStorage__objects.clear()
+    FileStorage._FileStorage__records = {}
+    FileStorage._FileStorage__signature = None
+
+
+def run(size, repeat):
+    """Benchmarks close() on a file holding size records"""
+    path = temp_path()
+    records = make_records(size)
+    write_records(path, records)
+    FileStorage._FileStorage__file_path = path
+    storage = FileStorage()
+
+    reset(storage)
+    full = timed(storage.close)
+    unchanged = timed(storage.close, repeat)
+
+    key = next(iter(records))
+    changed = 0.0
+    for i in range(repeat):
+        records[key]["name"] = "renamed {}".format(i)
+        write_records(path, records)
+        changed += timed(storage.close)
+    changed /= repeat
+    assert storage.all()[key].name == records[key]["name"]
+
+    print("{:>9} objects | full {:10.3f} ms | unchanged {:8.4f} ms | "
+          "one changed {:10.3f} ms".format(size, full * 1000,
+                                           unchanged * 1000, changed * 1000))
+    reset(storage)
+
+
+def main():
+    """Parses the command line and runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=parse_sizes,
+                        default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
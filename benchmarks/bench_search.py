@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+"""
+Full-text index benchmark on review texts
+
+Times building the index by tokenizing and from its cache, a few top-10
+searches against a substring scan of the texts, and reports the memory
+the index takes.
+"""
+
+import argparse
+import itertools
+import os
+import random
+import resource
+import shutil
+from types import SimpleNamespace
+from benchmarks import parse_sizes, temp_path, timed
+from models.engine import fulltext
+from models.engine.fulltext import FullTextIndex
+
+vocabulary_size = 30000
+
+
+def make_texts(size):
+    """Returns size review texts of 10 to 60 words drawn from a
+    vocabulary with a Zipf distribution, keyed like Review objects"""
+    rand = random.Random(size)
+    words = ["w{}".format(i) for i in range(vocabulary_size)]
+    weights = list(itertools.accumulate(1 / (i + 1)
+                                        for i in range(vocabulary_size)))
+    return {"Review.{:08d}".format(i):
+            " ".join(rand.choices(words, cum_weights=weights,
+                                  k=rand.randrange(10, 61)))
+            for i in range(size)}
+
+
+def populate(index, texts):
+    """Indexes the texts"""
+    for key, text in texts.items():
+        index.add(key, SimpleNamespace(text=text))
+
+
+def scan_search(texts, word, limit):
+    """The substring scan search() replaces, kept for comparison"""
+    word = " " + word + " "
+    return [key for key, text in texts.items()
+            if word in " " + text.lower() + " "][:limit]
+
+
+def rss_mb():
+    """Returns the peak resident memory of the process in MB"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(size, repeat):
+    """Benchmarks the index of size texts"""
+    texts = make_texts(size)
+    before = rss_mb()
+    index = FullTextIndex("Review", "text")
+    build = timed(lambda: populate(index, texts))
+    memory = rss_mb() - before
+    path = temp_path("file.json.fts")
+    save = timed(lambda: fulltext.save_cache(path, [index]))
+    cached = FullTextIndex("Review", "text")
+
+    def load():
+        """Rebuilds the index from the cache"""
+        cached.cache = fulltext.load_cache(path)["Review.text"]
+        populate(cached, texts)
+    load = timed(load)
+    print("{:>9} texts | tokenize {:7.2f} s | cache {:7.2f} s | "
+          "write cache {:6.2f} s {:6.0f} MB | index ~{:6.0f} MB".format(
+              size, build, load, save, os.path.getsize(path) / 2 ** 20,
+              memory))
+    shutil.rmtree(os.path.dirname(path))
+    queries = [("rare word", "w29999"), ("common word", "w1"),
+               ("two words", "w500 w20000"), ("common + rare", "w1 w3000"),
+               ("prefix", "w2999*")]
+    for label, query in queries:
+        search = timed(lambda: index.search(query, 10), repeat)
+        word = query.split()[0].rstrip("*")
+        scan = timed(lambda: scan_search(texts, word, 10),
+                     max(1, repeat // 10))
+        print("{:>9} texts | {:13} | index {:9.3f} ms | "
+              "scan {:9.3f} ms".format(size, label, search * 1e3,
+                                       scan * 1e3))
+
+
+def main():
+    """Parses the command line and runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=parse_sizes,
+                        default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+"""
+SQLite benchmark of the WAL mode and tuned pragmas
+
+Runs with HBNB_TYPE_STORAGE=db. A SQLite file of size places is opened
+once with the pragmas DBStorage sets (WAL, synchronous=NORMAL, mmap and
+a 64 MiB cache) and once with SQLite's defaults (rollback journal,
+synchronous=FULL). Each reports the commits per second of a writer
+saving one place at a time, and the reads per second of indexed page()
+queries run meanwhile by another thread.
+"""
+
+import argparse
+import models
+import os
+import shutil
+import sys
+import threading
+import time
+from benchmarks import parse_sizes, temp_path
+from models.city import City
+from models.engine.db_storage import DBStorage
+from models.place import Place
+from models.state import State
+from models.user import User
+
+configs = [
+    ("defaults", {"HBNB_SQLITE_JOURNAL_MODE": "DELETE",
+                  "HBNB_SQLITE_SYNCHRONOUS": "FULL",
+                  "HBNB_SQLITE_MMAP_SIZE": "0",
+                  "HBNB_SQLITE_CACHE_SIZE": "-2000"}),
+    ("tuned", {}),
+]
+
+
+def open_storage(path, env):
+    """Returns a DBStorage on the SQLite file at path, with the pragmas
+    of env"""
+    variables = dict(env, HBNB_DB_URL="sqlite:///" + path)
+    saved = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    try:
+        storage = DBStorage()
+        storage.reload()
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name)
+            else:
+                os.environ[name] = value
+    return storage
+
+
+def run(size, seconds, label, env):
+    """Benchmarks writes and concurrent reads on size places"""
+    path = temp_path("hbnb.db")
+    storage = open_storage(path, env)
+    state = State(name="Bench")
+    city = City(name="Bench", state_id=state.id)
+    user = User(email="bench@hbnb", password="bench")
+    places = [Place(name="Place {}".format(i), city_id=city.id,
+                    user_id=user.id, price_by_night=i % 500)
+              for i in range(size)]
+    storage.bulk_new([state, city, user] + places, detach=False)
+    storage.save()
+    storage.close()
+    done = threading.Event()
+    counts = {"commits": 0, "reads": 0}
+
+    def write():
+        """Saves one new place per commit until done"""
+        while not done.is_set():
+            storage.new(Place(name="New", city_id=city.id, user_id=user.id))
+            storage.save()
+            counts["commits"] += 1
+        storage.close()
+    writer = threading.Thread(target=write)
+    writer.start()
+    end = time.perf_counter() + seconds
+    price = 0
+    while time.perf_counter() < end:
+        ranges = {"price_by_night": (price, None)}
+        storage.page(Place, limit=20, ranges=ranges, sort="price_by_night",
+                     city_id=city.id)
+        storage.close()
+        counts["reads"] += 1
+        price = (price + 37) % 500
+    done.set()
+    writer.join()
+    print("{:>8} places | {:8} | {:8.0f} commits/s | {:8.0f} reads/s".format(
+        size, label, counts["commits"] / seconds, counts["reads"] / seconds))
+    shutil.rmtree(os.path.dirname(path))
+
+
+def main():
+    """Parses the command line and runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=parse_sizes, default="10000,100000")
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+    if models.storage_t != "db":
+        sys.exit("run with HBNB_TYPE_STORAGE=db")
+    for size in args.sizes:
+        for label, env in configs:
+            run(size, args.seconds, label, env)
+
+
+if __name__ == "__main__":
+    main()
@@ -67,7 +67,8 @@ class HBNBCommand(cmd.Cmd):
             print("** class doesn't exist **")
             return False
         print(instance.id)
-        instance.save()
+        models.storage.bulk_new([instance], detach=False)
+        models.storage.save()
 
     def do_show(self, arg):
         """Prints an instance as a string based on the class and id"""
@@ -94,9 +95,9 @@ class HBNBCommand(cmd.Cmd):
             print("** class name missing **")
         elif args[0] in classes:
             if len(args) > 1:
-                key = args[0] + "." + args[1]
-                if key in models.storage.all():
-                    models.storage.all().pop(key)
+                obj = models.storage.get(args[0], args[1])
+                if obj is not None:
+                    models.storage.delete(obj)
                     models.storage.save()
                 else:
                     print("** no instance found **")
@@ -160,6 +161,27 @@ class HBNBCommand(cmd.Cmd):
         else:
             print("** class doesn't exist **")
 
+    def do_migrate(self, arg):
+        """Copies every object between a JSON file and the database:
+        migrate import [<file>] or migrate export [<file>]"""
+        args = shlex.split(arg)
+        if len(args) == 0 or args[0] not in ("import", "export"):
+            print("** usage: migrate import|export [<file>] **")
+        elif models.storage_t != "db":
+            print("** migrate needs HBNB_TYPE_STORAGE=db **")
+        else:
+            from models.engine.migration import migrate
+            from sqlalchemy.exc import SQLAlchemyError
+            path = args[1] if len(args) > 1 else "file.json"
+            try:
+                migrate(args[0], path)
+            except (OSError, ValueError) as e:
+                print("** {} **".format(e))
+            except SQLAlchemyError as e:
+                # ends the failed transaction for the next commands
+                models.storage.close()
+                print("** {} **".format(str(e).splitlines()[0]))
+
 
 if __name__ == '__main__':
     HBNBCommand().cmdloop()
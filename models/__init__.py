@@ -11,7 +11,14 @@ storage_t = getenv("HBNB_TYPE_STORAGE")
 if storage_t == "db":
     from models.engine.db_storage import DBStorage
     storage = DBStorage()
+elif storage_t == "kv":
+    from models.engine.kv_storage import KVStorage
+    storage = KVStorage()
 else:
     from models.engine.file_storage import FileStorage
-    storage = FileStorage()
+    storage = FileStorage(log=storage_t == "wal")
 storage.reload()
+
+if getenv("HBNB_CACHE_CLASSES"):
+    from models.engine.cache import CachedStorage, cache_options
+    storage = CachedStorage(storage, **cache_options())
@@ -8,10 +8,16 @@ import models
 from os import getenv
 import sqlalchemy
 from sqlalchemy import Column, String, DateTime
+from sqlalchemy.dialects.mysql import DATETIME
 from sqlalchemy.ext.declarative import declarative_base
+import threading
 import uuid
 
 time = "%Y-%m-%dT%H:%M:%S.%f"
+# keeps the microseconds on MySQL, whose DATETIME drops them by default
+timestamp = DateTime().with_variant(DATETIME(fsp=6), "mysql")
+# the object each thread is initializing, which no storage holds yet
+building = threading.local()
 
 if models.storage_t == "db":
     Base = declarative_base()
@@ -23,29 +29,48 @@ class BaseModel:
     """The BaseModel class from which future classes will be derived"""
     if models.storage_t == "db":
         id = Column(String(60), primary_key=True)
-        created_at = Column(DateTime, default=datetime.now(timezone.utc))
-        updated_at = Column(DateTime, default=datetime.now(timezone.utc))
+        created_at = Column(timestamp, default=datetime.now(timezone.utc))
+        updated_at = Column(timestamp, default=datetime.now(timezone.utc))
 
     def __init__(self, *args, **kwargs):
         """Initialization of the base model"""
-        if kwargs:
-            for key, value in kwargs.items():
-                if key != "__class__":
-                    setattr(self, key, value)
-            if kwargs.get("created_at", None) and type(self.created_at) is str:
-                self.created_at = datetime.strptime(kwargs["created_at"], time)
+        outer = getattr(building, "obj", None)
+        building.obj = self
+        try:
+            if kwargs:
+                for key, value in kwargs.items():
+                    if key != "__class__":
+                        setattr(self, key, value)
+                if kwargs.get("created_at", None) and \
+                        type(self.created_at) is str:
+                    self.created_at = datetime.strptime(kwargs["created_at"],
+                                                        time)
+                else:
+                    self.created_at = datetime.now(timezone.utc)
+                if kwargs.get("updated_at", None) and \
+                        type(self.updated_at) is str:
+                    self.updated_at = datetime.strptime(kwargs["updated_at"],
+                                                        time)
+                else:
+                    self.updated_at = datetime.now(timezone.utc)
+                if kwargs.get("id", None) is None:
+                    self.id = str(uuid.uuid4())
             else:
-                self.created_at = datetime.now(timezone.utc)
-            if kwargs.get("updated_at", None) and type(self.updated_at) is str:
-                self.updated_at = datetime.strptime(kwargs["updated_at"], time)
-            else:
-                self.updated_at = datetime.now(timezone.utc)
-            if kwargs.get("id", None) is None:
                 self.id = str(uuid.uuid4())
-        else:
-            self.id = str(uuid.uuid4())
-            self.created_at = datetime.now(timezone.utc)
-            self.updated_at = self.created_at
+                self.created_at = datetime.now(timezone.utc)
+                self.updated_at = self.created_at
+        finally:
+            building.obj = outer
+
+    if models.storage_t != "db":
+        def __setattr__(self, name, value):
+            """Sets an attribute and lets the storage update its indexes,
+            unless the object is still being initialized"""
+            super().__setattr__(name, value)
+            storage = getattr(models, "storage", None)
+            if storage is not None and \
+                    getattr(building, "obj", None) is not self:
+                storage.changed(self, name)
 
     def __str__(self):
         """String representation of the BaseModel class"""
@@ -66,8 +91,10 @@ class BaseModel:
         if "updated_at" in new_dict:
             new_dict["updated_at"] = new_dict["updated_at"].strftime(time)
         new_dict["__class__"] = self.__class__.__name__
-        if "_sa_instance_state" in new_dict:
-            del new_dict["_sa_instance_state"]
+        state = new_dict.pop("_sa_instance_state", None)
+        if state is not None:
+            for name in state.mapper.relationships.keys():
+                new_dict.pop(name, None)
         return new_dict
 
     def delete(self):
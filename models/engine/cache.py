@@ -0,0 +1,284 @@
+#!/usr/bin/python3
+"""
+Contains the CachedStorage class, a read-through cache in front of a
+storage engine
+
+The cache is tuned through the environment:
+    HBNB_CACHE_CLASSES - comma separated names of the classes cached, such
+        as State,Amenity; no cache when empty (default empty)
+    HBNB_CACHE_SIZE - objects held across all the entries, the least
+        recently used entries being evicted past it (default 10000)
+    HBNB_CACHE_TTL - seconds an entry is served for, bounding how long a
+        change made by another process goes unseen (default 60)
+
+get() is cached by class and id; all(), count(), page() and version() of
+a class are cached by their arguments. Objects created, updated or
+deleted through new(), delete() or BaseModel.save() drop their entry and
+every collection of their class, once when changed and again when saved.
+An engine providing detach() and attach() has its objects cached as
+plain values and rebuilt in the caller's session; other engines have the
+objects themselves cached.
+"""
+
+from collections import OrderedDict
+from os import getenv
+import threading
+import time
+
+
+def cache_options():
+    """Returns the CachedStorage() keyword arguments set by the
+    environment"""
+    names = getenv("HBNB_CACHE_CLASSES", "")
+    return {
+        "classes": [name.strip() for name in names.split(",")
+                    if name.strip()],
+        "size": int(getenv("HBNB_CACHE_SIZE", "10000")),
+        "ttl": float(getenv("HBNB_CACHE_TTL", "60")),
+    }
+
+
+def class_name(cls):
+    """Returns the name of class cls, given as a class or a name"""
+    return cls if isinstance(cls, str) else getattr(cls, "__name__", None)
+
+
+class CachedStorage:
+    """Storage engine wrapper serving repeated reads of the cached classes
+    from a bounded LRU of entries expiring after ttl seconds"""
+
+    def __init__(self, storage, classes=(), size=10000, ttl=60.0):
+        """Creates a cache of up to size objects in front of storage for
+        the classes named by classes"""
+        self.storage = storage
+        self.classes = set(map(class_name, classes))
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expiry, cost, class, value)
+        self.collections = {}  # class name -> keys of its collections
+        self.generations = {}  # class name -> invalidations of the class
+        self.held = 0  # objects held by the entries
+        self.lock = threading.Lock()
+        self.local = threading.local()  # .touched: keys changed, not saved
+        self.__metrics = {"hits": 0, "misses": 0, "evictions": 0,
+                          "expirations": 0, "invalidations": 0}
+
+    def __getattr__(self, name):
+        """Forwards everything not cached to the storage engine"""
+        return getattr(self.storage, name)
+
+    def enable(self, cls):
+        """Starts caching the objects of class cls"""
+        self.classes.add(class_name(cls))
+
+    def disable(self, cls):
+        """Stops caching the objects of class cls and drops their entries"""
+        name = class_name(cls)
+        self.classes.discard(name)
+        with self.lock:
+            for key in [key for key, entry in self.entries.items()
+                        if entry[2] == name]:
+                self.__drop(key)
+
+    def cached(self, cls):
+        """Returns whether the objects of class cls are cached"""
+        return class_name(cls) in self.classes
+
+    def cache_metrics(self):
+        """Returns the cache metrics: hits, misses, entries evicted for
+        room, expired and invalidated, with the entries and objects held"""
+        with self.lock:
+            metrics = dict(self.__metrics)
+            metrics.update(entries=len(self.entries), objects=self.held,
+                           size=self.size)
+        return metrics
+
+    def clear(self):
+        """Drops every entry"""
+        with self.lock:
+            self.entries.clear()
+            self.collections.clear()
+            self.held = 0
+            for name in list(self.generations):
+                self.generations[name] += 1
+
+    def get(self, cls, id, load=None):
+        """Returns the object of class cls and id, or None if not found"""
+        name = class_name(cls)
+        if load or name not in self.classes:
+            return self.storage.get(cls, id, load)
+        return self.__read(("get", name, id), name, "object",
+                           lambda: self.storage.get(cls, id))
+
+    def all(self, cls=None, load=None):
+        """Returns the {<class name>.id: object} of class cls, or of every
+        class"""
+        name = class_name(cls)
+        if cls is None or load or name not in self.classes:
+            return self.storage.all(cls, load)
+        return self.__read(("all", name), name, "dict",
+                           lambda: self.storage.all(cls))
+
+    def page(self, cls, limit=None, after=None, ranges=None, sort=None,
+             **filters):
+        """Returns a page of the objects of class cls, as the storage
+        engine does"""
+        name = class_name(cls)
+        if name not in self.classes:
+            return self.storage.page(cls, limit, after, ranges, sort,
+                                     **filters)
+        key = ("page", name, repr((limit, after, sorted(
+            (ranges or {}).items()), sort, sorted(filters.items()))))
+        return self.__read(key, name, "list", lambda: self.storage.page(
+            cls, limit, after, ranges, sort, **filters))
+
+    def count(self, cls=None):
+        """Returns the number of objects of class cls, or of every class"""
+        name = class_name(cls)
+        if cls is None or name not in self.classes:
+            return self.storage.count(cls)
+        return self.__read(("count", name), name, "value",
+                           lambda: self.storage.count(cls))
+
+    def version(self, cls):
+        """Returns the (tag, last modified) version of class cls"""
+        name = class_name(cls)
+        if name not in self.classes:
+            return self.storage.version(cls)
+        return self.__read(("version", name), name, "value",
+                           lambda: self.storage.version(cls))
+
+    def new(self, obj):
+        """Adds obj to the storage and drops what it makes stale"""
+        self.__changed(obj)
+        self.storage.new(obj)
+
+    def bulk_new(self, objs, batch_size=None, detach=True):
+        """Adds objs to the storage at once and drops what they make
+        stale"""
+        objs = list(objs)
+        for obj in objs:
+            self.__changed(obj)
+        self.storage.bulk_new(objs, batch_size, detach)
+
+    def delete(self, obj=None):
+        """Deletes obj from the storage and drops what it makes stale"""
+        if obj is not None:
+            self.__changed(obj)
+        self.storage.delete(obj)
+
+    def changed(self, obj, attr):
+        """Lets the storage know attr of obj changed, then drops what it
+        makes stale if obj is the object the storage holds under its key,
+        not one being built from a record or a copy; returns whether it
+        is"""
+        if not self.storage.changed(obj, attr):
+            return False
+        self.__changed(obj)
+        return True
+
+    def save(self):
+        """Saves the storage, then drops again the entries of the objects
+        changed by this thread, which another thread may have read back
+        before they were saved"""
+        self.storage.save()
+        touched = getattr(self.local, "touched", None)
+        if touched:
+            self.local.touched = set()
+            with self.lock:
+                for name, id in touched:
+                    self.__invalidate(name, id)
+
+    def __changed(self, obj):
+        """Drops the entries made stale by a change of obj"""
+        name = type(obj).__name__
+        if name not in self.classes:
+            return
+        id = getattr(obj, "id", None)
+        touched = getattr(self.local, "touched", None)
+        if touched is None:
+            touched = self.local.touched = set()
+        touched.add((name, id))
+        with self.lock:
+            self.__invalidate(name, id)
+
+    def __invalidate(self, name, id):
+        """Drops the entry of object id of class name and every collection
+        of its class; called with the lock held"""
+        self.generations[name] = self.generations.get(name, 0) + 1
+        keys = self.collections.pop(name, set())
+        keys.add(("get", name, id))
+        for key in keys:
+            if key in self.entries:
+                self.__drop(key)
+                self.__metrics["invalidations"] += 1
+
+    def __read(self, key, name, kind, fetch):
+        """Returns the cached value of key, or the value fetch() returns,
+        cached unless class name changed meanwhile"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self.__drop(key)
+                self.__metrics["expirations"] += 1
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.__metrics["hits"] += 1
+            else:
+                self.__metrics["misses"] += 1
+                generation = self.generations.get(name, 0)
+        if entry is not None:
+            return self.__thaw(kind, entry[3])
+        value = fetch()
+        frozen, cost = self.__freeze(kind, value)
+        if cost > self.size:
+            return value
+        with self.lock:
+            if self.generations.get(name, 0) == generation:
+                if key in self.entries:
+                    self.__drop(key)
+                self.entries[key] = (now + self.ttl, cost, name, frozen)
+                self.held += cost
+                if key[0] != "get":
+                    self.collections.setdefault(name, set()).add(key)
+                while self.held > self.size:
+                    self.__drop(next(iter(self.entries)))
+                    self.__metrics["evictions"] += 1
+        return value
+
+    def __drop(self, key):
+        """Removes the entry of key; called with the lock held"""
+        expiry, cost, name, value = self.entries.pop(key)
+        self.held -= cost
+        if key[0] != "get":
+            self.collections.get(name, set()).discard(key)
+
+    def __freeze(self, kind, value):
+        """Returns the (cached form, number of objects) of value"""
+        detach = getattr(self.storage, "detach", None)
+        if kind == "value" or value is None:
+            return value, 1
+        if kind == "object":
+            return (type(value), detach(value)) if detach else value, 1
+        frozen = value.copy()
+        if detach is not None:
+            objs = value.values() if kind == "dict" else value
+            frozen = [(type(obj), detach(obj)) for obj in objs]
+        return frozen, max(len(frozen), 1)
+
+    def __thaw(self, kind, frozen):
+        """Returns the value rebuilt from its cached form, a copy for a
+        collection"""
+        attach = getattr(self.storage, "attach", None)
+        if kind == "value" or frozen is None:
+            return frozen
+        if attach is None:
+            return frozen.copy() if kind != "object" else frozen
+        if kind == "object":
+            return attach(*frozen)
+        objs = [attach(cls, values) for cls, values in frozen]
+        if kind == "dict":
+            return {type(obj).__name__ + "." + obj.id: obj for obj in objs}
+        return objs
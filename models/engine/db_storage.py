@@ -7,16 +7,31 @@ import models
 from models.amenity import Amenity
 from models.base_model import BaseModel, Base
 from models.city import City
+from models.engine import geo
+from models.engine.fulltext import FullTextIndex, parse_query
+from models.engine.pool import create_db_engine, database_url
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
+import os
 from os import getenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+import time
+from sqlalchemy import and_, event, func, inspect, or_
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, make_transient_to_detached
+from sqlalchemy.orm import scoped_session, selectinload, sessionmaker
+from sqlalchemy.orm.util import identity_key
 
 classes = {"Amenity": Amenity, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
+loaders = {"joined": joinedload, "selectin": selectinload}
+# text columns searched by search(), with a FULLTEXT index on MySQL
+texts = {"Place": ("description",), "Review": ("text",)}
+# ids bound to one SELECT ... IN by get_many()
+in_chunk = 1000
+# rows sent to the database by one executemany() of bulk_insert()
+bulk_batch = int(getenv("HBNB_MYSQL_BULK_BATCH", "1000"))
 
 
 class DBStorage:
@@ -24,28 +39,37 @@ class DBStorage:
 
     __engine = None
     __session = None
+    __metrics = None
 
     def __init__(self):
-        """Instantiate a DBStorage object"""
-        HBNB_MYSQL_USER = getenv('HBNB_MYSQL_USER')
-        HBNB_MYSQL_PWD = getenv('HBNB_MYSQL_PWD')
-        HBNB_MYSQL_HOST = getenv('HBNB_MYSQL_HOST')
-        HBNB_MYSQL_DB = getenv('HBNB_MYSQL_DB')
+        """Instantiate a DBStorage object on the database of
+        HBNB_DB_URL, or the MySQL database of HBNB_MYSQL_DB"""
         HBNB_ENV = getenv('HBNB_ENV')
-        self.__engine = create_engine(
-            'mysql+mysqldb://{}:{}@{}/{}'.format(HBNB_MYSQL_USER,
-                                                 HBNB_MYSQL_PWD,
-                                                 HBNB_MYSQL_HOST,
-                                                 HBNB_MYSQL_DB))
+        self.__metrics = {"saves": 0, "skipped": 0, "objects": 0,
+                          "seconds": 0.0, "last_objects": 0,
+                          "last_seconds": 0.0}
+        self.__engine = create_db_engine(database_url())
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self.__forked)
         if HBNB_ENV == "test":
             Base.metadata.drop_all(self.__engine)
 
-    def all(self, cls=None):
-        """Query on the current database session"""
+    def all(self, cls=None, load=None):
+        """Query on the current database session
+
+        load names the relationships to fetch along with the objects
+        instead of one query per object when they are first accessed: a
+        list of relationship paths such as ["cities", "cities.places"]
+        loaded with one SELECT ... IN per relationship, or a dictionary
+        mapping each path to "selectin" or "joined". Paths that a class
+        does not have are ignored.
+        """
         new_dict = {}
         for clss in classes:
             if cls is None or cls is classes[clss] or cls is clss:
-                objs = self.__session.query(classes[clss]).all()
+                query = self.__session.query(classes[clss])
+                options = self.__options(classes[clss], load)
+                objs = query.options(*options).all()
                 for obj in objs:
                     key = obj.__class__.__name__ + '.' + obj.id
                     new_dict[key] = obj
@@ -55,9 +79,89 @@ class DBStorage:
         """Add the object to the current database session"""
         self.__session.add(obj)
 
+    def bulk_new(self, objs, batch_size=None, detach=True):
+        """Inserts objs with one executemany() per batch_size rows of a
+        table, parents before children, instead of one INSERT per object
+        at the next flush; save() commits them
+
+        The objects are not added to the session, so nothing is kept per
+        object: only their column values and the links of their
+        many-to-many relationships are written. With detach, they are
+        then marked as stored, so that new() and save() update them
+        later rather than insert them again; callers that drop them
+        once written skip that with detach=False.
+        """
+        objs = list(objs)
+        rows = {}
+        links = {}  # secondary table -> {link: row}, set from either side
+        for obj in objs:
+            mapper = inspect(obj).mapper
+            rows.setdefault(mapper.local_table, []).append(
+                self.__row(obj, mapper))
+            for rel in mapper.relationships:
+                if rel.secondary is not None and rel.key in obj.__dict__:
+                    (key, link), = rel.synchronize_pairs
+                    (other_key, other_link), = rel.secondary_synchronize_pairs
+                    table = links.setdefault(rel.secondary, {})
+                    for other in obj.__dict__[rel.key]:
+                        row = {link.name: getattr(obj, key.key),
+                               other_link.name: getattr(other, other_key.key)}
+                        table[tuple(sorted(row.items()))] = row
+        for table, found in links.items():
+            rows[table] = list(found.values())
+        for table in Base.metadata.sorted_tables:
+            if table in rows:
+                self.bulk_insert(table, rows[table], batch_size)
+        if detach:
+            for obj in objs:
+                make_transient_to_detached(obj)
+
+    @staticmethod
+    def __row(obj, mapper):
+        """Returns the row of table columns holding obj, with the default
+        of each column it has no value for"""
+        values = obj.__dict__
+        row = {}
+        for attr in mapper.column_attrs:
+            column = attr.columns[0]
+            if attr.key in values:
+                row[column.name] = values[attr.key]
+            elif column.default is not None and column.default.is_scalar:
+                row[column.name] = column.default.arg
+            else:
+                row[column.name] = None
+        return row
+
+    def bulk_insert(self, table, rows, batch_size=None):
+        """Inserts the rows, dictionaries of column values, into table
+        with one executemany() per batch_size rows (bulk_batch by
+        default); save() commits them"""
+        batch_size = batch_size or bulk_batch
+        for i in range(0, len(rows), batch_size):
+            self.execute(table.insert(), rows[i:i + batch_size])
+
     def save(self):
-        """Commit all changes of the current database session"""
-        self.__session.commit()
+        """Commit all changes of the current database session, unless
+        nothing was added, modified or deleted since the last commit"""
+        session = self.__session
+        pending = len(session.new) + len(session.dirty) + len(session.deleted)
+        if not pending and not session.info.get("flushed"):
+            self.__metrics["skipped"] += 1
+            return
+        start = time.perf_counter()
+        session.commit()
+        seconds = time.perf_counter() - start
+        self.__metrics["saves"] += 1
+        self.__metrics["objects"] += pending
+        self.__metrics["seconds"] += seconds
+        self.__metrics["last_objects"] = pending
+        self.__metrics["last_seconds"] = seconds
+
+    def metrics(self):
+        """Returns the save metrics: the number of commits and of skipped
+        saves, objects written and seconds spent, in total and for the
+        last commit"""
+        return dict(self.__metrics)
 
     def delete(self, obj=None):
         """Delete from the current database session obj if not None"""
@@ -69,22 +173,323 @@ class DBStorage:
         Base.metadata.create_all(self.__engine)
         sess_factory = sessionmaker(bind=self.__engine,
                                     expire_on_commit=False)
+        event.listen(sess_factory, "after_flush", self.__flushed)
+        event.listen(sess_factory, "after_commit", self.__ended)
+        event.listen(sess_factory, "after_soft_rollback", self.__ended)
         Session = scoped_session(sess_factory)
         self.__session = Session
 
+    @staticmethod
+    def __flushed(session, flush_context):
+        """Remembers that the session wrote changes not yet committed"""
+        session.info["flushed"] = True
+
+    @staticmethod
+    def __ended(session, *args):
+        """Forgets the flushed changes once the transaction is over"""
+        session.info.pop("flushed", None)
+
     def close(self):
-        """Call remove() method on the private session attribute"""
+        """Call remove() method on the private session attribute
+
+        Called at the end of every request, this ends the request's
+        session and returns its connection to the pool, where the next
+        request checks it out again.
+        """
         self.__session.remove()
 
-    def get(self, cls, id):
+    def __forked(self):
+        """Drops the connections and session inherited from the parent
+        process, which keeps using them, so a forked worker opens its own"""
+        self.__engine.dispose(close=False)
+        if self.__session is not None:
+            self.__session.registry.clear()
+
+    def pool_metrics(self):
+        """Returns the connection pool metrics: checkouts, checkouts past
+        the pool size, timeouts and seconds waited for a connection, with
+        the pool size and the connections checked out and in overflow;
+        all are zero for a pool that does not count them, as the single
+        connection of an in-memory SQLite database"""
+        stats = getattr(self.__engine.pool, "stats", None)
+        if stats is not None:
+            return stats()
+        return {"checkouts": 0, "overflows": 0, "timeouts": 0,
+                "wait_seconds": 0.0, "max_wait_seconds": 0.0, "size": 0,
+                "checked_out": 0, "overflow": 0}
+
+    def get(self, cls, id, load=None):
         """Retrieve one object based on the
-        class and ID, or None if not found."""
-        if cls and id:
-            key = "{}.{}".format(cls.__name__, id)
-            return self.all(cls).get(key)
+        class and ID, or None if not found.
+        load eagerly fetches relationships, as for all()."""
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls in classes.values() and id:
+            return self.__session.get(cls, id,
+                                      options=self.__options(cls, load))
         return None
 
+    def execute(self, statement, parameters=None):
+        """Runs the Core statement in the current session, once per
+        dictionary if parameters is a list of them, and returns its
+        result; save() commits the rows it changed"""
+        result = self.__session.execute(statement, parameters)
+        if statement.is_dml:
+            self.__session.info["flushed"] = True
+        return result
+
+    def get_many(self, cls, ids):
+        """Returns the {id: object} of the objects of class cls whose id
+        is in ids, leaving out the ids not found, fetched with one
+        SELECT ... IN per in_chunk ids"""
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls not in classes.values():
+            return {}
+        ids = list(set(ids))
+        found = {}
+        for i in range(0, len(ids), in_chunk):
+            query = self.__session.query(cls).filter(
+                cls.id.in_(ids[i:i + in_chunk]))
+            found.update((obj.id, obj) for obj in query)
+        return found
+
+    @staticmethod
+    def detach(obj):
+        """Returns the column values of obj, from which attach() rebuilds
+        it in any session"""
+        return {attr.key: getattr(obj, attr.key)
+                for attr in inspect(obj).mapper.column_attrs}
+
+    def attach(self, cls, values):
+        """Returns the object of class cls with the column values of
+        detach(), added to the current session without a query: the one
+        the session holds if any, else a new persistent instance whose
+        relationships load on first access"""
+        session = self.__session
+        obj = session.identity_map.get(identity_key(cls, values["id"]))
+        if obj is not None:
+            return obj
+        obj = inspect(cls).class_manager.new_instance()
+        obj.__dict__.update(values)
+        make_transient_to_detached(obj)
+        session.add(obj)
+        return obj
+
+    @staticmethod
+    def __options(cls, load):
+        """Returns the loader options fetching the relationship paths of
+        load from class cls"""
+        if not load:
+            return []
+        if not isinstance(load, dict):
+            load = dict.fromkeys(load, "selectin")
+        options = []
+        for path, strategy in load.items():
+            loader = loaders[strategy]
+            option = None
+            current = cls
+            for name in path.split("."):
+                attr = getattr(current, name, None)
+                prop = getattr(attr, "property", None)
+                if not hasattr(prop, "mapper"):
+                    option = None
+                    break
+                if option is None:
+                    option = loader(attr)
+                else:
+                    option = getattr(option, loader.__name__)(attr)
+                current = prop.mapper.class_
+            if option is not None:
+                options.append(option)
+        return options
+
+    def page(self, cls, limit=None, after=None, ranges=None, sort=None,
+             **filters):
+        """Returns up to limit objects of class cls whose columns match
+        filters, ordered by id and starting after the id after.
+        ranges maps columns to (low, high) bounds, None for no bound.
+        With sort, a column name prefixed by - for descending order,
+        objects are ordered by (sort, id) and after is a (value, id)
+        pair."""
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls not in classes.values():
+            return []
+        query = self.__session.query(cls).filter_by(**filters)
+        return self.__ordered(query, cls, limit, after, ranges, sort)
+
+    @staticmethod
+    def __ordered(query, cls, limit, after, ranges, sort):
+        """Returns the page of query restricted to ranges, ordered by
+        (sort, id) or id and starting past after"""
+        for attr, (low, high) in (ranges or {}).items():
+            column = getattr(cls, attr)
+            if low is not None:
+                query = query.filter(column >= low)
+            if high is not None:
+                query = query.filter(column <= high)
+        if not sort:
+            if after is not None:
+                query = query.filter(cls.id > after)
+            return query.order_by(cls.id).limit(limit).all()
+        column = getattr(cls, sort.lstrip("-"))
+        query = query.filter(column.isnot(None))
+        if sort.startswith("-"):
+            if after is not None:
+                query = query.filter(or_(column < after[0], and_(
+                    column == after[0], cls.id < after[1])))
+            query = query.order_by(column.desc(), cls.id.desc())
+        else:
+            if after is not None:
+                query = query.filter(or_(column > after[0], and_(
+                    column == after[0], cls.id > after[1])))
+            query = query.order_by(column, cls.id)
+        return query.limit(limit).all()
+
+    def places_search(self, states=(), cities=(), amenities=(),
+                      limit=None, after=None, ranges=None, sort=None):
+        """Returns up to limit places, ordered by id and starting after the
+        id after, located in one of cities or in a city of one of states
+        (anywhere when neither is given) and offering all of amenities,
+        selected by a single query; ranges and sort restrict and order
+        the places as for page()"""
+        query = self.__session.query(Place)
+        located = []
+        if cities:
+            located.append(Place.city_id.in_(cities))
+        if states:
+            located.append(Place.city_id.in_(
+                select(City.id).where(City.state_id.in_(states))))
+        if located:
+            query = query.filter(or_(*located))
+        if amenities:
+            links = Place.amenities.property.secondary
+            amenities = set(amenities)
+            query = query.filter(Place.id.in_(
+                select(links.c.place_id)
+                .where(links.c.amenity_id.in_(amenities))
+                .group_by(links.c.place_id)
+                .having(func.count() == len(amenities))))
+        return self.__ordered(query, Place, limit, after, ranges, sort)
+
+    def places_near(self, lat, lng, radius_km, limit=None):
+        """Returns up to limit (place, distance in km) pairs, nearest
+        first, for the places within radius_km of (lat, lng)"""
+        return self.__located(geo.bounding_box(lat, lng, radius_km),
+                              lat, lng, radius_km, limit)
+
+    def places_in_box(self, south, west, north, east, limit=None):
+        """Returns up to limit (place, distance in km) pairs for the
+        places inside the box, nearest to its center first; west > east
+        for a box crossing the antimeridian"""
+        box = (south, west, north, east)
+        lat, lng = geo.box_center(box)
+        return self.__located(box, lat, lng, None, limit)
+
+    def __located(self, box, lat, lng, radius_km, limit):
+        """Returns the (place, distance) pairs inside box, selected on the
+        indexed latitude and longitude columns, and within radius_km of
+        (lat, lng)"""
+        south, west, north, east = box
+        query = self.__session.query(Place).filter(
+            Place.latitude.between(south, north),
+            or_(*[Place.longitude.between(w, e)
+                  for w, e in geo.longitude_ranges(west, east)]))
+        found = []
+        for place in query:
+            distance = geo.distance_km(lat, lng, place.latitude,
+                                       place.longitude)
+            if radius_km is None or distance <= radius_km:
+                found.append((distance, place.id, place))
+        found.sort()
+        return [(place, distance) for distance, id, place in found[:limit]]
+
+    def search(self, query, cls=None, limit=None):
+        """Returns up to limit (object, score) pairs, best first, for the
+        objects of class cls, or of every class with a text column, whose
+        text holds a word of query; a word ending in * is a prefix"""
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        words = parse_query(query)
+        found = []
+        for name, attrs in texts.items():
+            if words and cls in (None, classes[name]):
+                for attr in attrs:
+                    found.extend(self.__matching(classes[name], attr,
+                                                 words, limit))
+        found.sort(key=lambda item: (-item[1], item[0].id))
+        return found[:limit]
+
+    def __matching(self, cls, attr, words, limit):
+        """Returns the (object, score) pairs of class cls whose column
+        attr holds one of the (word, is prefix) words
+
+        MySQL ranks the rows through the FULLTEXT index of the column.
+        Other databases select the rows containing a word with LIKE and
+        rank them with BM25 in Python.
+        """
+        column = getattr(cls, attr)
+        if self.__engine.dialect.name == "mysql":
+            against = " ".join(w + ("*" if prefix else "")
+                               for w, prefix in words)
+            score = column.match(against).label("score")
+            query = self.__session.query(cls, score).filter(
+                column.match(against)).order_by(score.desc(), cls.id)
+            return [(obj, float(score))
+                    for obj, score in query.limit(limit)]
+        query = self.__session.query(cls).filter(
+            or_(*[column.like("%" + w + "%") for w, prefix in words]))
+        objs = {obj.id: obj for obj in query}
+        index = FullTextIndex(cls.__name__, attr)
+        for id, obj in objs.items():
+            index.add(id, obj)
+        terms = " ".join(w + ("*" if prefix else "") for w, prefix in words)
+        return [(objs[id], score) for id, score in index.search(terms,
+                                                                limit)]
+
+    def autocomplete(self, cls, prefix, limit=None, attr="name"):
+        """Returns up to limit objects of class cls whose column attr
+        starts with prefix, ordered by that column; with the default
+        case-insensitive collation, LIKE 'prefix%' ignores case and is
+        answered by the index on the column"""
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls not in classes.values():
+            return []
+        column = getattr(cls, attr)
+        query = self.__session.query(cls).filter(
+            column.startswith(prefix, autoescape=True))
+        return query.order_by(column, cls.id).limit(limit).all()
+
+    def version(self, cls):
+        """Returns the (tag, last modified) version of the objects of
+        class cls: the tag combines their number and latest updated_at,
+        so it changes when one is created, deleted or saved. Last
+        modified is None, since a deletion leaves no time behind."""
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls not in classes.values():
+            return "", None
+        query = select(func.count(), func.max(cls.updated_at))
+        count, latest = self.__session.execute(query).one()
+        return "{}.{}".format(count, latest), None
+
     def count(self, cls=None):
-        """Count the number of objects in storage.
+        """Count the number of objects in storage with SELECT COUNT(*).
         If cls is provided, count only those objects."""
-        return len(self.all(cls))
+        if cls is None:
+            return sum(self.counts().values())
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls not in classes.values():
+            return 0
+        query = select(func.count()).select_from(cls)
+        return self.__session.execute(query).scalar()
+
+    def counts(self):
+        """Returns the number of objects of every class, in one query"""
+        query = select(*[select(func.count()).select_from(cls)
+                         .scalar_subquery().label(name)
+                         for name, cls in classes.items()])
+        return dict(self.__session.execute(query).one()._mapping)
@@ -3,10 +3,22 @@
 Contains the FileStorage class
 """
 
+from bisect import bisect_right
+from datetime import datetime, timezone
 import json
+import os
+import threading
+import time
+import uuid
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
+from models.engine import fulltext, geo
+from models.engine.fulltext import FullTextIndex
+from models.engine.indexes import ForeignKeyIndex, GridIndex, MultiValueIndex
+from models.engine.indexes import PrefixIndex, SortedIndex, is_number
+from models.engine.locks import FileLock, ReadWriteLock
+from models.engine.wal import ChangeLog
 from models.place import Place
 from models.review import Review
 from models.state import State
@@ -14,6 +26,61 @@ from models.user import User
 
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
+foreign_keys = {"City": ("state_id",), "Place": ("city_id",),
+                "Review": ("place_id",)}
+# list attributes indexed by each of their elements
+multi_keys = {"Place": ("amenity_ids",)}
+# numeric attributes kept sorted for range filters and ordering
+sorted_keys = {"Place": ("price_by_night", "number_rooms",
+                         "number_bathrooms", "max_guest")}
+# text attributes kept sorted for prefix completion
+prefix_keys = {"Amenity": ("name",), "City": ("name",), "State": ("name",)}
+# (latitude, longitude) attributes filed in a grid of grid_degrees cells
+locations = {"Place": ("latitude", "longitude")}
+grid_degrees = float(os.getenv("HBNB_GRID_DEGREES", "0.5"))
+# text attributes indexed word by word for search()
+texts = {"Place": ("description",), "Review": ("text",)}
+# share of the indexed texts tokenized since the full-text cache was
+# written past which save() writes it again
+fulltext_stale = float(os.getenv("HBNB_FTS_STALE", "0.1"))
+# log size past which the write-ahead log is folded into the snapshot
+compact_bytes = int(os.getenv("HBNB_WAL_COMPACT_BYTES", str(4 << 20)))
+# fsync every log append, so a saved change survives a power loss
+wal_fsync = os.getenv("HBNB_WAL_FSYNC", "1") == "1"
+# fsync every snapshot written by save(), before and after moving it in place
+file_fsync = os.getenv("HBNB_FILE_FSYNC", "0") == "1"
+
+
+class Record:
+    """Stands in __objects for an object read from the JSON file and not
+    built yet: attributes are read from its record, or from its class for
+    those the record lacks, so indexes and filters work on it unbuilt"""
+
+    __slots__ = ("cls", "record")
+
+    def __init__(self, record):
+        """Wraps the raw JSON record of an object"""
+        self.cls = classes[record["__class__"]]
+        self.record = record
+
+    def __getattr__(self, attr):
+        """Returns attribute attr of the object the record describes"""
+        try:
+            return self.record[attr]
+        except KeyError:
+            return getattr(self.cls, attr)
+
+    def to_dict(self):
+        """Returns the record, which is what the object would serialize
+        to"""
+        return self.record
+
+
+def class_name(obj):
+    """Returns the class name of obj, an object or a Record"""
+    if type(obj) is Record:
+        return obj.cls.__name__
+    return obj.__class__.__name__
 
 
 class FileStorage:
@@ -21,64 +88,789 @@ class FileStorage:
 
     __file_path = "file.json"  # string - path to the JSON file
     __objects = {}  # dictionary - stores all objects by <class name>.id
+    __records = {}  # dictionary - raw records as last read from/written to
+    __signature = None  # tuple - (inode, size, mtime) of the file at sync
+    __classes = {}  # dictionary - <class name> -> {<class name>.id: obj}
+    __indexes = {}  # dictionary - <class name> -> {attribute: index}
+    __sorted = {}  # dictionary - <class name> -> sorted list of keys
+    __indexed = None  # dictionary - the __objects that __classes describes
+    __lock = ReadWriteLock()  # guards __objects and the file I/O
+    __building = threading.Lock()  # serializes readers building Records
+    __compacting = False  # boolean - a background compaction is running
+    __dirty = set()  # set - keys changed since the last save
+    __fragments = {}  # dictionary - <class name>.id -> (obj, JSON text)
+    __generation = 0  # integer - bumped by every change of __objects
+    __generations = {}  # dictionary - <class name> -> (generation, time)
+    __rebuilt = (0, datetime.now(timezone.utc))  # last rebuild of __classes
+    __instance = uuid.uuid4().hex  # string - tells this process's apart
+    __metrics = {"saves": 0, "serialized": 0, "bytes": 0, "seconds": 0.0,
+                 "last_serialized": 0, "last_bytes": 0, "last_seconds": 0.0}
 
-    def all(self, cls=None):
-        """Returns the dictionary __objects"""
-        if cls is not None:
-            new_dict = {}
-            for key, value in self.__objects.items():
-                if cls == value.__class__ or cls == value.__class__.__name__:
-                    new_dict[key] = value
-            return new_dict
+    def __init__(self, log=False):
+        """Creates a storage; with log set, save() appends the changed
+        records to a write-ahead log instead of rewriting the JSON file"""
+        self.__log = ChangeLog(self.__file_path + ".log") if log else None
+
+    def all(self, cls=None, load=None):
+        """Returns the dictionary __objects, or a dictionary of the objects
+        of class cls (a class or a class name) when it is given; load is
+        accepted for DBStorage compatibility, relationships being index
+        lookups here. The objects returned are built first."""
+        with FileStorage.__lock.reading():
+            if cls is not None:
+                name = cls if isinstance(cls, str) else cls.__name__
+                return {key: self.__built(obj) for key, obj in
+                        self.__buckets().get(name, {}).items()}
+            for obj in list(self.__objects.values()):
+                self.__built(obj)
         return self.__objects
 
     def new(self, obj):
         """Sets in __objects the obj with key <obj class name>.id"""
         if obj is not None:
             key = obj.__class__.__name__ + "." + obj.id
-            self.__objects[key] = obj
+            with FileStorage.__lock.writing():
+                self.__add(key, obj)
+                self.__touch(key)
+
+    def bulk_new(self, objs, batch_size=None, detach=True):
+        """Sets in __objects every object of objs, as new() does, taking
+        the lock once; batch_size and detach only matter to the database
+        engine"""
+        with FileStorage.__lock.writing():
+            for obj in objs:
+                key = obj.__class__.__name__ + "." + obj.id
+                self.__add(key, obj)
+                self.__touch(key)
 
     def save(self):
-        """Serializes __objects to the JSON file (path: __file_path)"""
-        json_objects = {key: self.__objects[key].to_dict()
-                        for key in self.__objects}
-        with open(self.__file_path, 'w') as f:
-            json.dump(json_objects, f)
+        """Serializes __objects to the JSON file (path: __file_path), or
+        appends the records changed since the last save to the log
+
+        The save holds the lock file of the JSON file, and first picks up
+        what other processes saved, so that none of their changes is lost.
+        """
+        path = self.__file_path
+        with FileStorage.__lock.writing(), FileLock(path).exclusive():
+            self.__buckets()
+            self.__sync()
+            if self.__log is None:
+                self.__write_snapshot(file_fsync)
+            elif FileStorage.__signature is None:
+                self.__write_snapshot(wal_fsync)
+                self.__changelog().reset(FileStorage.__signature, wal_fsync)
+            else:
+                self.__append()
+            self.__save_fulltext()
+        if self.__log is not None and \
+                self.__changelog().size() > compact_bytes:
+            self.compact(wait=False)
+
+    def __append(self):
+        """Appends the records changed since the last save to the log"""
+        start = time.perf_counter()
+        records = FileStorage.__records
+        changes = []
+        for key in FileStorage.__dirty:
+            obj = self.__objects.get(key)
+            if obj is not None:
+                record = obj.to_dict()
+                if records.get(key) != record:
+                    changes.append((key, record))
+            elif key in records:
+                changes.append((key, None))
+        size = 0
+        if changes:
+            size = self.__changelog().append(
+                changes, FileStorage.__signature, wal_fsync)
+        for key, record in changes:
+            FileStorage.__fragments.pop(key, None)
+            if record is None:
+                del records[key]
+            else:
+                records[key] = record
+        FileStorage.__dirty = set()
+        self.__measure(start, len(changes), size)
+
+    def compact(self, wait=True):
+        """Folds the write-ahead log into a new snapshot of the JSON file,
+        in a background thread unless wait is set"""
+        if self.__log is None or FileStorage.__compacting:
+            return
+        FileStorage.__compacting = True
+        if wait:
+            self.__compact()
+        else:
+            threading.Thread(target=self.__compact, daemon=True).start()
+
+    def __compact(self):
+        """Writes a new snapshot and an empty log on top of it"""
+        try:
+            path = self.__file_path
+            with FileStorage.__lock.writing(), FileLock(path).exclusive():
+                self.__buckets()
+                self.__sync()
+                self.__write_snapshot(wal_fsync)
+                self.__changelog().reset(FileStorage.__signature, wal_fsync)
+                self.__save_fulltext(0)
+        finally:
+            FileStorage.__compacting = False
+
+    def __write_snapshot(self, sync=False):
+        """Writes every object to a temporary file, then moves it over the
+        JSON file so readers never see a partially written snapshot; with
+        sync set, the data reaches the disk before save() returns
+
+        Objects that did not change since the last save are written from
+        their cached JSON text instead of being serialized again.
+        """
+        start = time.perf_counter()
+        dirty = FileStorage.__dirty
+        records = FileStorage.__records
+        fragments = FileStorage.__fragments
+        for key in dirty:
+            if key not in self.__objects:
+                records.pop(key, None)
+                fragments.pop(key, None)
+        serialized = 0
+        parts = []
+        for key, obj in list(self.__objects.items()):
+            fragment = fragments.get(key)
+            if fragment is None or fragment[0] is not obj or key in dirty:
+                record = obj.to_dict()
+                fragment = (obj, json.dumps(record))
+                fragments[key] = fragment
+                records[key] = record
+                serialized += 1
+            parts.append(json.dumps(key) + ": " + fragment[1])
+        data = "{" + ",\n".join(parts) + "}"
+        tmp = self.__file_path + ".tmp"
+        with open(tmp, 'w') as f:
+            f.write(data)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, self.__file_path)
+        if sync and hasattr(os, "O_DIRECTORY"):
+            fd = os.open(os.path.dirname(self.__file_path) or ".",
+                         os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        FileStorage.__signature = self.__stat()
+        FileStorage.__dirty = set()
+        self.__measure(start, serialized, len(data))
+
+    def __measure(self, start, serialized, size):
+        """Records the cost of a save that started at start"""
+        metrics = FileStorage.__metrics
+        seconds = time.perf_counter() - start
+        metrics["saves"] += 1
+        metrics["serialized"] += serialized
+        metrics["bytes"] += size
+        metrics["seconds"] += seconds
+        metrics["last_serialized"] = serialized
+        metrics["last_bytes"] = size
+        metrics["last_seconds"] = seconds
+
+    def metrics(self):
+        """
+        Returns the save metrics: the number of saves and of objects
+        serialized, bytes written and seconds spent, in total and for
+        the last save.
+        """
+        return dict(FileStorage.__metrics)
+
+    def __changelog(self):
+        """Returns the write-ahead log of the current JSON file"""
+        if self.__log.path != self.__file_path + ".log":
+            self.__log = ChangeLog(self.__file_path + ".log")
+        return self.__log
+
+    def __replay(self, keep=()):
+        """Applies the log records appended since the last replay, except
+        to the keys in keep"""
+        records = FileStorage.__records
+        changes = self.__changelog().read(FileStorage.__signature)
+        for key, record in changes:
+            if key in keep:
+                continue
+            if record is None:
+                if records.pop(key, None) is not None:
+                    self.__remove(key)
+            elif records.get(key) != record:
+                self.__add(key, Record(record))
+                records[key] = record
 
     def reload(self):
-        """Deserializes the JSON file to __objects"""
+        """Deserializes the JSON file to __objects, then replays the
+        write-ahead log on top of it when the storage keeps one
+
+        Nothing is read when the file has the same signature as the last
+        time it was read or written. Otherwise only the records that differ
+        from the last known version are refiled, and records removed from
+        the file by another writer are dropped from __objects. Objects
+        changed since the last save keep their unsaved state.
+
+        Records are filed in __objects and the indexes as they are, and
+        only built into model instances when get(), all() or a query first
+        returns them, so most objects are never built by a request.
+        """
+        snapshot = self.__read_snapshot()
+        if snapshot is None and (self.__log is None or
+                                 not self.__changelog().pending()):
+            return
+        with FileStorage.__lock.writing():
+            self.__buckets()
+            keep = FileStorage.__dirty
+            if snapshot is not None:
+                self.__apply_snapshot(snapshot[0], snapshot[1], keep)
+            if self.__log is not None:
+                self.__replay(keep)
+            for index in self.__fulltext_indexes():
+                index.cache = {}
+            self.__save_fulltext()
+
+    def __sync(self):
+        """Picks up the changes saved by other writers before a save,
+        keeping the objects changed or removed here since the last save"""
+        keep = FileStorage.__dirty
+        snapshot = self.__read_snapshot()
+        if snapshot is not None:
+            self.__apply_snapshot(snapshot[0], snapshot[1], keep)
+        if self.__log is not None and FileStorage.__signature is not None:
+            self.__replay(keep)
+
+    def __read_snapshot(self):
+        """Returns the (signature, records) of the JSON file, or None if it
+        did not change since it was last read or written"""
+        signature = self.__stat()
+        if signature is None or signature == FileStorage.__signature:
+            return None
         try:
             with open(self.__file_path, 'r') as f:
-                jo = json.load(f)
-            for key in jo:
-                self.__objects[key] = classes[jo[key]["__class__"]](**jo[key])
+                return signature, json.load(f)
         except (FileNotFoundError, json.JSONDecodeError):
-            pass
+            return None
+
+    def __apply_snapshot(self, signature, jo, keep):
+        """Applies the records jo read from the JSON file when it had
+        signature, except to the keys in keep"""
+        if self.__stat() != signature:
+            return
+        records = FileStorage.__records
+        for key in records.keys() - jo.keys():
+            if key not in keep:
+                del records[key]
+                self.__remove(key)
+        for key, record in jo.items():
+            if key not in keep and records.get(key) != record:
+                self.__add(key, Record(record))
+                records[key] = record
+        FileStorage.__signature = signature
+
+    def __stat(self):
+        """Returns the (inode, size, mtime) signature of the JSON file"""
+        try:
+            st = os.stat(self.__file_path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
 
     def delete(self, obj=None):
         """Delete obj from __objects if it’s inside"""
         if obj is not None:
             key = obj.__class__.__name__ + '.' + obj.id
-            if key in self.__objects:
-                del self.__objects[key]
+            with FileStorage.__lock.writing():
+                self.__remove(key)
+                self.__touch(key)
 
     def close(self):
-        """Call reload() method for deserializing the JSON file to objects"""
+        """Call reload() method to pick up changes made to the JSON file"""
         self.reload()
 
-    def get(self, cls, id):
+    def get(self, cls, id, load=None):
         """
         Retrieve one object based on the
         class and ID, or None if not found.
+        load is accepted for DBStorage compatibility and ignored.
         """
         if cls and id:
-            key = "{}.{}".format(cls.__name__, id)
-            return self.all(cls).get(key)
+            name = cls if isinstance(cls, str) else cls.__name__
+            with FileStorage.__lock.reading():
+                obj = self.__objects.get("{}.{}".format(name, id))
+                return None if obj is None else self.__built(obj)
         return None
 
+    def get_many(self, cls, ids):
+        """Returns the {id: object} of the objects of class cls whose id
+        is in ids, leaving out the ids not found"""
+        name = cls if isinstance(cls, str) else cls.__name__
+        found = {}
+        with FileStorage.__lock.reading():
+            for id in ids:
+                obj = self.__objects.get("{}.{}".format(name, id))
+                if obj is not None:
+                    found[id] = self.__built(obj)
+        return found
+
     def count(self, cls=None):
         """
         Count the number of objects in storage.
         If cls is provided, count only those objects.
         """
-        return len(self.all(cls))
+        if cls is None:
+            return len(self.__objects)
+        name = cls if isinstance(cls, str) else cls.__name__
+        with FileStorage.__lock.reading():
+            return len(self.__buckets().get(name, {}))
+
+    def counts(self):
+        """Returns the number of objects of every class"""
+        with FileStorage.__lock.reading():
+            buckets = self.__buckets()
+            return {name: len(buckets.get(name, {})) for name in classes}
+
+    def page(self, cls, limit=None, after=None, ranges=None, sort=None,
+             **filters):
+        """
+        Returns up to limit objects of class cls whose attributes
+        match filters, ordered by id and starting after the id after.
+        ranges maps attributes to (low, high) bounds, None for no bound.
+        With sort, an attribute name prefixed by - for descending order,
+        objects are ordered by (sort, id) and after is a (value, id) pair.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        with FileStorage.__lock.reading():
+            if ranges or sort:
+                return self.__range_page(name, limit, after, ranges or {},
+                                         sort, filters)
+            if filters:
+                indexes = FileStorage.__indexes.get(name, {})
+                attr = next((attr for attr in filters if attr in indexes),
+                            next(iter(filters)))
+                objs = [obj for obj in
+                        self.__matching(name, attr, filters[attr]).values()
+                        if (after is None or obj.id > after) and
+                        all(getattr(obj, a, None) == v
+                            for a, v in filters.items())]
+                objs.sort(key=lambda obj: obj.id)
+                return [self.__built(obj) for obj in objs[:limit]]
+            buckets = self.__buckets()
+            keys = FileStorage.__sorted.get(name)
+            if keys is None:
+                keys = sorted(buckets.get(name, {}))
+                FileStorage.__sorted[name] = keys
+            start = 0
+            if after is not None:
+                start = bisect_right(keys, "{}.{}".format(name, after))
+            end = len(keys) if limit is None else start + limit
+            return [self.__built(self.__objects[key])
+                    for key in keys[start:end]]
+
+    def __range_page(self, name, limit, after, ranges, sort, filters,
+                     keys=None):
+        """Returns the page() of the objects of class name, among keys when
+        given, whose attributes lie within ranges and match filters
+
+        The candidates come from the smallest of keys, the index of an
+        equality filter and the sorted index of a range. When the sorted
+        index of sort is no larger, it is walked in order instead, and the
+        walk stops after limit matches.
+        """
+        buckets = self.__buckets()
+        indexes = FileStorage.__indexes.get(name, {})
+        attr = sort.lstrip("-") if sort else None
+        reverse = bool(sort) and sort.startswith("-")
+        prefix = name + "."
+
+        def matches(obj):
+            """Returns whether obj lies within ranges and matches filters"""
+            for a, (low, high) in ranges.items():
+                value = getattr(obj, a, None)
+                if not is_number(value) or \
+                        low is not None and value < low or \
+                        high is not None and value > high:
+                    return False
+            return all(getattr(obj, a, None) == v
+                       for a, v in filters.items())
+
+        candidates = keys
+        if candidates is None:
+            candidates = buckets.get(name, {}).keys()
+        for a, value in filters.items():
+            index = indexes.get(a)
+            if isinstance(index, ForeignKeyIndex):
+                members = index.members(value)
+                if len(members) < len(candidates):
+                    candidates = members
+        size = len(candidates)
+        scan = None
+        for a, (low, high) in ranges.items():
+            index = indexes.get(a)
+            if isinstance(index, SortedIndex) and \
+                    index.count(low, high) < size:
+                size = index.count(low, high)
+                scan = (index, low, high)
+        walk = indexes.get(attr) if attr else None
+        if isinstance(walk, SortedIndex):
+            low, high = ranges.get(attr, (None, None))
+            if walk.count(low, high) <= size:
+                if after is not None:
+                    after = (after[0], prefix + after[1])
+                objs = []
+                for key in walk.scan(low, high, after, reverse):
+                    if limit is not None and len(objs) == limit:
+                        break
+                    obj = self.__objects[key]
+                    if (keys is None or key in keys) and matches(obj):
+                        objs.append(self.__built(obj))
+                return objs
+        if scan is not None:
+            candidates = scan[0].scan(scan[1], scan[2])
+        objs = [self.__objects[key] for key in candidates
+                if keys is None or key in keys]
+        objs = [obj for obj in objs if matches(obj)]
+        if attr:
+            objs = [obj for obj in objs if is_number(getattr(obj, attr,
+                                                             None))]
+
+            def order(obj):
+                """Returns the (value, id) position of obj"""
+                return (getattr(obj, attr), obj.id)
+        else:
+            def order(obj):
+                """Returns the id position of obj"""
+                return obj.id
+        if after is not None:
+            after = tuple(after) if attr else after
+            objs = [obj for obj in objs if
+                    (order(obj) < after if reverse else order(obj) > after)]
+        objs.sort(key=order, reverse=reverse)
+        return [self.__built(obj) for obj in objs[:limit]]
+
+    def lookup(self, cls, attr, value):
+        """
+        Returns a dictionary of the objects of class cls whose
+        attribute attr equals value, using an index when there is one.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        with FileStorage.__lock.reading():
+            return {key: self.__built(obj) for key, obj in
+                    self.__matching(name, attr, value).items()}
+
+    def __matching(self, name, attr, value):
+        """Returns the {key: object or Record} of the objects of class name
+        whose attribute attr equals value"""
+        buckets = self.__buckets()
+        index = FileStorage.__indexes.get(name, {}).get(attr)
+        if index is None:
+            return {key: obj for key, obj in buckets.get(name, {}).items()
+                    if getattr(obj, attr, None) == value}
+        objs = ((key, self.__objects[key]) for key in index.lookup(value))
+        return {key: obj for key, obj in objs
+                if getattr(obj, attr, None) == value}
+
+    def autocomplete(self, cls, prefix, limit=None, attr="name"):
+        """
+        Returns up to limit objects of class cls whose attribute attr
+        starts with prefix, ignoring case, ordered by that attribute.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        with FileStorage.__lock.reading():
+            self.__buckets()
+            index = FileStorage.__indexes.get(name, {}).get(attr)
+            if isinstance(index, PrefixIndex):
+                return [self.__built(self.__objects[key])
+                        for key in index.prefix(prefix, limit)]
+            prefix = prefix.casefold()
+            objs = [obj for obj in self.__buckets().get(name, {}).values()
+                    if isinstance(getattr(obj, attr, None), str) and
+                    getattr(obj, attr).casefold().startswith(prefix)]
+            objs.sort(key=lambda obj: (getattr(obj, attr).casefold(),
+                                       obj.id))
+            return [self.__built(obj) for obj in objs[:limit]]
+
+    def places_search(self, states=(), cities=(), amenities=(),
+                      limit=None, after=None, ranges=None, sort=None):
+        """
+        Returns up to limit places, ordered by id and starting after the
+        id after, located in one of cities or in a city of one of states
+        (anywhere when neither is given) and offering all of amenities.
+        The result is the intersection of the key sets of the indexes.
+        ranges and sort restrict and order the places as for page().
+        """
+        if not states and not cities and not amenities:
+            return self.page(Place, limit, after, ranges, sort)
+        with FileStorage.__lock.reading():
+            self.__buckets()
+            indexes = FileStorage.__indexes
+            sets = []
+            if states or cities:
+                city_ids = set(cities)
+                for state_id in states:
+                    city_ids.update(
+                        self.__objects[key].id for key in
+                        indexes["City"]["state_id"].members(state_id))
+                by_city = indexes["Place"]["city_id"]
+                keys = set()
+                for city_id in city_ids:
+                    keys.update(by_city.members(city_id))
+                sets.append(keys)
+            by_amenity = indexes["Place"]["amenity_ids"]
+            sets.extend(by_amenity.members(amenity_id)
+                        for amenity_id in set(amenities))
+            sets.sort(key=len)
+            keys = set(sets[0])
+            for other in sets[1:]:
+                keys.intersection_update(other)
+            if ranges or sort:
+                return self.__range_page("Place", limit, after, ranges or {},
+                                         sort, {}, keys)
+            if after is not None:
+                after = "Place." + after
+                keys = [key for key in keys if key > after]
+            keys = sorted(keys)[:limit]
+            return [self.__built(self.__objects[key]) for key in keys]
+
+    def places_near(self, lat, lng, radius_km, limit=None):
+        """
+        Returns up to limit (place, distance in km) pairs, nearest first,
+        for the places within radius_km of (lat, lng).
+        """
+        return self.__located(geo.bounding_box(lat, lng, radius_km),
+                              lat, lng, radius_km, limit)
+
+    def places_in_box(self, south, west, north, east, limit=None):
+        """
+        Returns up to limit (place, distance in km) pairs for the places
+        inside the box, nearest to its center first; west > east for a
+        box crossing the antimeridian.
+        """
+        box = (south, west, north, east)
+        lat, lng = geo.box_center(box)
+        return self.__located(box, lat, lng, None, limit)
+
+    def __located(self, box, lat, lng, radius_km, limit):
+        """Returns the (place, distance) pairs inside box and within
+        radius_km of (lat, lng), using the grid index of Place"""
+        with FileStorage.__lock.reading():
+            self.__buckets()
+            grid = FileStorage.__indexes["Place"][locations["Place"]]
+            found = []
+            for key in grid.box(*box):
+                location = grid.location(key)
+                if not geo.in_box(location[0], location[1], box):
+                    continue
+                distance = geo.distance_km(lat, lng, *location)
+                if radius_km is None or distance <= radius_km:
+                    found.append((distance, key))
+            found.sort()
+            return [(self.__built(self.__objects[key]), distance)
+                    for distance, key in found[:limit]]
+
+    def search(self, query, cls=None, limit=None):
+        """
+        Returns up to limit (object, score) pairs, best first, for the
+        objects of class cls, or of every class with indexed text, whose
+        text holds a word of query; a word ending in * is a prefix.
+        """
+        names = texts if cls is None else \
+            [cls if isinstance(cls, str) else cls.__name__]
+        with FileStorage.__lock.reading():
+            self.__buckets()
+            found = []
+            for name in names:
+                for attr in texts.get(name, ()):
+                    index = FileStorage.__indexes[name][attr]
+                    found.extend(index.search(query, limit))
+            found.sort(key=lambda item: (-item[1], item[0]))
+            return [(self.__built(self.__objects[key]), score)
+                    for key, score in found[:limit]]
+
+    def __fulltext_indexes(self):
+        """Returns the full-text indexes"""
+        indexes = FileStorage.__indexes
+        return [indexes[name][attr] for name, attrs in texts.items()
+                for attr in attrs if attr in indexes.get(name, {})]
+
+    def __save_fulltext(self, stale=None):
+        """Writes the full-text cache once more than stale documents, by
+        default the fulltext_stale share of them, were tokenized since it
+        was last written"""
+        indexes = self.__fulltext_indexes()
+        if stale is None:
+            stale = fulltext_stale * sum(len(index.docs)
+                                         for index in indexes)
+        if sum(index.stale for index in indexes) > stale:
+            try:
+                fulltext.save_cache(self.__file_path + ".fts", indexes,
+                                    wal_fsync if self.__log else file_fsync)
+            except OSError:
+                pass  # the cache only saves tokenizing at the next start
+
+    def version(self, cls):
+        """
+        Returns the (tag, last modified) version of the objects of class
+        cls. The tag changes whenever one of them is created, changed or
+        deleted, and never takes the same value for different contents;
+        last modified is the time of the last of those changes.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        with FileStorage.__lock.reading():
+            self.__buckets()
+            generation, modified = FileStorage.__generations.get(
+                name, FileStorage.__rebuilt)
+            return "{}.{}".format(FileStorage.__instance, generation), \
+                modified
+
+    @staticmethod
+    def _forked():
+        """Gives a forked process its own version tags, since its changes
+        and its parent's are counted apart from now on"""
+        FileStorage.__instance = uuid.uuid4().hex
+
+    def __bump(self, name):
+        """Records a change of the objects of class name"""
+        FileStorage.__generation += 1
+        FileStorage.__generations[name] = (FileStorage.__generation,
+                                           datetime.now(timezone.utc))
+
+    def changed(self, obj, attr):
+        """Marks obj as modified after its attribute attr was set and
+        re-files it in the index on attr, if it is a stored object;
+        returns whether it is"""
+        id = obj.__dict__.get("id")
+        if id is None:
+            return False
+        name = obj.__class__.__name__
+        key = name + "." + id
+        if self.__objects.get(key) is not obj:
+            return False
+        with FileStorage.__lock.writing():
+            self.__touch(key)
+            self.__buckets()
+            self.__bump(name)
+            for index in FileStorage.__indexes.get(name, {}).values():
+                if attr in index.attrs:
+                    index.remove(key)
+                    index.add(key, obj)
+        return True
+
+    def __touch(self, key):
+        """Marks key as changed since the last save"""
+        FileStorage.__dirty.add(key)
+
+    def __buckets(self):
+        """Returns the per-class buckets of __objects, rebuilding them and
+        the attribute indexes when __objects was replaced or changed without
+        going through the storage
+        """
+        buckets = FileStorage.__classes
+        if (FileStorage.__indexed is not self.__objects or
+                sum(map(len, buckets.values())) != len(self.__objects)):
+            buckets = {}
+            indexes = {name: {attr: ForeignKeyIndex(name, attr)
+                              for attr in attrs}
+                       for name, attrs in foreign_keys.items()}
+            for name, attrs in multi_keys.items():
+                indexes.setdefault(name, {}).update(
+                    (attr, MultiValueIndex(name, attr)) for attr in attrs)
+            for name, attrs in sorted_keys.items():
+                indexes.setdefault(name, {}).update(
+                    (attr, SortedIndex(name, attr)) for attr in attrs)
+            for name, attrs in prefix_keys.items():
+                indexes.setdefault(name, {}).update(
+                    (attr, PrefixIndex(name, attr)) for attr in attrs)
+            for name, attrs in locations.items():
+                indexes.setdefault(name, {})[attrs] = GridIndex(
+                    name, attrs, grid_degrees)
+            cache = fulltext.load_cache(self.__file_path + ".fts")
+            for name, attrs in texts.items():
+                for attr in attrs:
+                    index = FullTextIndex(name, attr)
+                    index.cache = cache.get(name + "." + attr, {})
+                    indexes.setdefault(name, {})[attr] = index
+            for key, obj in self.__objects.items():
+                name = class_name(obj)
+                buckets.setdefault(name, {})[key] = obj
+                for index in indexes.get(name, {}).values():
+                    index.add(key, obj)
+            if self.__objects:
+                for name, attrs in texts.items():
+                    for attr in attrs:
+                        indexes[name][attr].cache = {}
+            FileStorage.__classes = buckets
+            FileStorage.__indexes = indexes
+            FileStorage.__sorted = {}
+            FileStorage.__indexed = self.__objects
+            FileStorage.__dirty = self.__unsaved()
+            FileStorage.__generation += 1
+            FileStorage.__generations = {}
+            FileStorage.__rebuilt = (FileStorage.__generation,
+                                     datetime.now(timezone.utc))
+        return buckets
+
+    def __unsaved(self):
+        """Returns the keys whose object differs from its record as last
+        read or written, or which no longer hold an object, once __objects
+        was replaced or changed without going through the storage"""
+        records = FileStorage.__records
+        unsaved = records.keys() - self.__objects.keys()
+        for key, obj in self.__objects.items():
+            if records.get(key) != obj.to_dict():
+                unsaved.add(key)
+        return unsaved
+
+    def __add(self, key, obj):
+        """Stores obj under key in __objects, its class bucket and indexes"""
+        buckets = self.__buckets()
+        name = class_name(obj)
+        indexes = FileStorage.__indexes.get(name, {}).values()
+        for index in indexes:
+            index.remove(key)
+        if key not in self.__objects:
+            FileStorage.__sorted.pop(name, None)
+        self.__objects[key] = obj
+        buckets.setdefault(name, {})[key] = obj
+        self.__bump(name)
+        for index in indexes:
+            index.add(key, obj)
+
+    def __built(self, obj):
+        """Returns obj, or the model instance built from it if it is a
+        Record, which then takes its place in __objects and its bucket"""
+        if type(obj) is not Record:
+            return obj
+        name = obj.cls.__name__
+        key = name + "." + obj.record["id"]
+        with FileStorage.__building:
+            current = self.__objects.get(key)
+            if current is not obj:
+                return current  # built by another reader meanwhile
+            instance = obj.cls(**obj.record)
+            self.__objects[key] = instance
+            bucket = FileStorage.__classes.get(name, {})
+            if key in bucket:
+                bucket[key] = instance
+            fragment = FileStorage.__fragments.get(key)
+            if fragment is not None and fragment[0] is obj:
+                FileStorage.__fragments[key] = (instance, fragment[1])
+        return instance
+
+    def __remove(self, key):
+        """Removes key from __objects, its class bucket and indexes"""
+        buckets = self.__buckets()
+        obj = self.__objects.pop(key, None)
+        if obj is not None:
+            name = class_name(obj)
+            del buckets[name][key]
+            FileStorage.__sorted.pop(name, None)
+            self.__bump(name)
+            for index in FileStorage.__indexes.get(name, {}).values():
+                index.remove(key)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=FileStorage._forked)
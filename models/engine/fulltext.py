@@ -0,0 +1,286 @@
+#!/usr/bin/python3
+"""
+Contains the FullTextIndex class, the inverted index kept by FileStorage
+over the free text attributes
+
+Text is split into lowercase words of letters and digits. A query
+matches the objects holding any of its words, ranked by BM25; a query
+word ending in * matches every indexed word starting with it.
+
+The indexes are cached in <file>.fts, next to the JSON snapshot. Each
+entry holds the checksum of the text it was built from, so an object
+whose text did not change is indexed again from the cache without being
+tokenized; a stale or unreadable cache only costs that tokenization.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import Counter
+import heapq
+from math import log
+import marshal
+import os
+import re
+import sys
+import zlib
+
+word = re.compile(r"[^\W_]+")
+query_word = re.compile(r"[^\W_]+\*?")
+k1 = 1.2  # BM25 term frequency saturation
+b = 0.75  # BM25 document length normalization
+max_expansions = 50  # most frequent words a prefix is expanded to
+cache_format = 1  # version of the layout of the cache file
+
+
+def tokenize(text):
+    """Returns the lowercase words of text"""
+    return word.findall(text.lower())
+
+
+def parse_query(query):
+    """Returns the (word, is prefix) pairs of query"""
+    words = []
+    for token in query_word.findall(query.lower()):
+        pair = (token.rstrip("*"), token.endswith("*"))
+        if pair not in words:
+            words.append(pair)
+    return words
+
+
+class FullTextIndex:
+    """Maps the words of a text attribute to the objects whose text holds
+    them, with their number of occurrences
+
+    Each indexed document gets a number, and the postings of a word are
+    compact arrays of document numbers and occurrences. Removing a
+    document only forgets its number; the postings are rebuilt once
+    they hold as many removed entries as live ones.
+    """
+
+    def __init__(self, cls_name, attr):
+        """Creates an empty index on attribute attr of class cls_name"""
+        self.cls_name = cls_name
+        self.attr = attr
+        self.attrs = (attr,)
+        self.docs = {}  # key -> (checksum, words, occurrences up to 255)
+        self.numbers = {}  # key -> document number
+        self.keys = []  # document number -> key, None once removed
+        self.lengths = array("I")  # document number -> number of words
+        self.postings = {}  # word -> (document numbers, occurrences)
+        self.df = {}  # word -> number of documents holding it
+        self.live = 0  # posting entries of the indexed documents
+        self.dead = 0  # posting entries of removed documents
+        self.total = 0  # number of words of all the documents
+        self.vocabulary = None  # sorted words, None until next needed
+        self.cache = {}  # key -> a docs entry to reuse if still current
+        self.stale = 0  # documents tokenized since the cache was written
+        self.last = None  # (key, docs entry) of the last removed document
+
+    def add(self, key, obj):
+        """Indexes the text of obj under key, unless it has none"""
+        text = getattr(obj, self.attr, None)
+        if not isinstance(text, str) or not text:
+            return
+        checksum = zlib.crc32(text.encode("utf-8"))
+        doc = self.cache.pop(key, None)
+        if self.last is not None and self.last[0] == key:
+            doc = self.last[1]
+        self.last = None
+        if doc is None or doc[0] != checksum:
+            counts = Counter(tokenize(text))
+            try:
+                occurrences = bytes(counts.values())
+            except ValueError:
+                occurrences = bytes(min(n, 255) for n in counts.values())
+            doc = (checksum, tuple(map(sys.intern, counts)), occurrences)
+            self.stale += 1
+        self.docs[key] = doc
+        self.__post(key, doc)
+
+    def __post(self, key, doc):
+        """Files the words of doc under a new number for key"""
+        number = len(self.keys)
+        self.keys.append(key)
+        self.numbers[key] = number
+        length = sum(doc[2])
+        self.lengths.append(length)
+        self.total += length
+        self.live += len(doc[1])
+        postings, df = self.postings, self.df
+        for term, n in zip(doc[1], doc[2]):
+            posting = postings.get(term)
+            if posting is None:
+                posting = postings[term] = (array("I"), bytearray())
+                self.vocabulary = None
+            posting[0].append(number)
+            posting[1].append(n)
+            df[term] = df.get(term, 0) + 1
+
+    def remove(self, key):
+        """Removes key from the index"""
+        doc = self.docs.pop(key, None)
+        if doc is None:
+            return
+        number = self.numbers.pop(key)
+        self.keys[number] = None
+        self.total -= self.lengths[number]
+        self.live -= len(doc[1])
+        df = self.df
+        for term in doc[1]:
+            df[term] -= 1
+            if df[term]:
+                self.dead += 1
+            else:
+                del df[term]
+                self.dead -= len(self.postings.pop(term)[0]) - 1
+                self.vocabulary = None
+        self.last = (key, doc)
+        if self.dead > max(self.live, 1000):
+            self.__compact()
+
+    def __compact(self):
+        """Renumbers the documents and rebuilds the postings without the
+        entries of the removed ones"""
+        self.numbers, self.keys = {}, []
+        self.lengths = array("I")
+        self.postings, self.df = {}, {}
+        self.live = self.dead = self.total = 0
+        for key, doc in self.docs.items():
+            self.__post(key, doc)
+
+    def expand(self, prefix):
+        """Returns the indexed words starting with prefix, at most the
+        max_expansions held by the most documents"""
+        if self.vocabulary is None:
+            self.vocabulary = sorted(self.postings)
+        vocabulary = self.vocabulary
+        words = []
+        i = bisect_left(vocabulary, prefix)
+        while i < len(vocabulary) and vocabulary[i].startswith(prefix):
+            words.append(vocabulary[i])
+            i += 1
+        if len(words) > max_expansions:
+            words = heapq.nlargest(max_expansions, words, key=self.df.get)
+        return words
+
+    def __terms(self, query):
+        """Returns the (upper bound, [(word, idf)]) of each word of query,
+        by decreasing upper bound: a prefix stands for the words it
+        expands to, and scores the best of them"""
+        n = len(self.docs)
+        units = []
+        for term, prefix in parse_query(query):
+            if prefix:
+                terms = self.expand(term)
+            else:
+                terms = [term] if term in self.df else []
+            weights = [(term, log(1 + (n - self.df[term] + 0.5) /
+                                  (self.df[term] + 0.5)))
+                       for term in terms]
+            if weights:
+                bound = max(idf for term, idf in weights) * (k1 + 1)
+                units.append((bound, weights))
+        units.sort(key=lambda unit: -unit[0])
+        return units
+
+    def search(self, query, limit=None):
+        """Returns up to limit (key, score) pairs for the documents
+        matching query, best first and ties ordered by key
+
+        Words are scored by decreasing upper bound, as in MaxScore: once
+        the words left cannot lift a document that none of the scored
+        words holds into the top limit, they are only looked up in the
+        documents found so far instead of being scanned.
+        """
+        if not self.total:
+            return []  # no document holds a word
+        keys, lengths = self.keys, self.lengths
+        norm = k1 * (1 - b)
+        slope = k1 * b * len(self.docs) / self.total
+
+        def score(weights, number):
+            """Returns the score of the word of weights for a document"""
+            words, occurrences = self.docs[keys[number]][1:]
+            best = 0.0
+            for term, idf in weights:
+                if term in words:
+                    tf = occurrences[words.index(term)]
+                    best = max(best, idf * tf * (k1 + 1) /
+                               (tf + norm + slope * lengths[number]))
+            return best
+        units = self.__terms(query)
+        scores = {}
+        for i, (bound, weights) in enumerate(units):
+            found = {}
+            for term, idf in weights:
+                numbers, occurrences = self.postings[term]
+                idf *= k1 + 1
+                if len(weights) == 1:
+                    found = {number: idf * tf /
+                             (tf + norm + slope * lengths[number])
+                             for number, tf in zip(numbers, occurrences)
+                             if keys[number] is not None}
+                    break
+                for number, tf in zip(numbers, occurrences):
+                    if keys[number] is not None:
+                        value = idf * tf / (tf + norm +
+                                            slope * lengths[number])
+                        if value > found.get(number, 0.0):
+                            found[number] = value
+            for number, value in found.items():
+                scores[number] = scores.get(number, 0.0) + value
+            rest = units[i + 1:]
+            if limit is None or not rest or len(scores) < limit:
+                continue
+            totals = {number: value + sum(score(weights, number)
+                                          for bound, weights in rest)
+                      for number, value in scores.items()}
+            if sum(bound for bound, weights in rest) < \
+                    heapq.nlargest(limit, totals.values())[-1]:
+                scores = totals
+                break
+        if limit is not None and len(scores) > limit:
+            threshold = heapq.nlargest(limit, scores.values())[-1]
+            scores = {number: value for number, value in scores.items()
+                      if value >= threshold}
+        ranked = sorted((-value, keys[number])
+                        for number, value in scores.items())
+        return [(key, -value) for value, key in ranked[:limit]]
+
+    def entries(self):
+        """Returns the cache entries of the indexed documents"""
+        return self.docs
+
+
+def cache_tag():
+    """Returns the tag of the cache files this interpreter can read"""
+    return (cache_format, tuple(sys.version_info[:2]))
+
+
+def load_cache(path):
+    """Returns the {<class name>.<attribute>: entries} cached at path, or
+    nothing if there is no cache this interpreter can read"""
+    try:
+        with open(path, 'rb') as f:
+            data = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return {}
+    if not isinstance(data, dict) or data.get("tag") != cache_tag():
+        return {}
+    return data.get("indexes", {})
+
+
+def save_cache(path, indexes, sync=False):
+    """Writes the entries of the full-text indexes to the cache at path"""
+    data = {"tag": cache_tag(),
+            "indexes": {index.cls_name + "." + index.attr: index.entries()
+                        for index in indexes}}
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(marshal.dumps(data))
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+    for index in indexes:
+        index.stale = 0
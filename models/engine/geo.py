@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+"""
+Great-circle distances and bounding boxes shared by the storage engines
+
+Boxes are (south, west, north, east) in degrees. A box crossing the
+antimeridian has west > east.
+"""
+
+from math import asin, cos, degrees, radians, sin, sqrt
+
+earth_radius_km = 6371.0088
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    """Returns the haversine distance in km between two points"""
+    dlat = radians(lat2 - lat1)
+    dlng = radians(lng2 - lng1)
+    a = sin(dlat / 2) ** 2 + \
+        cos(radians(lat1)) * cos(radians(lat2)) * sin(dlng / 2) ** 2
+    return 2 * earth_radius_km * asin(min(1.0, sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """Returns the smallest box holding every point within radius_km of
+    (lat, lng)"""
+    dlat = degrees(radius_km / earth_radius_km)
+    south, north = lat - dlat, lat + dlat
+    if south <= -90 or north >= 90 or radius_km >= earth_radius_km:
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    dlng = degrees(asin(min(1.0, sin(radians(dlat)) / cos(radians(lat)))))
+    west, east = lng - dlng, lng + dlng
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return south, west, north, east
+
+
+def longitude_ranges(west, east):
+    """Returns the (west, east) ranges covered by a box, split in two
+    when it crosses the antimeridian"""
+    if west <= east:
+        return [(west, east)]
+    return [(west, 180.0), (-180.0, east)]
+
+
+def in_box(lat, lng, box):
+    """Returns whether (lat, lng) lies inside box"""
+    south, west, north, east = box
+    if not south <= lat <= north:
+        return False
+    return any(w <= lng <= e for w, e in longitude_ranges(west, east))
+
+
+def box_center(box):
+    """Returns the (lat, lng) center of box"""
+    south, west, north, east = box
+    if west > east:
+        east += 360
+    lng = (west + east) / 2
+    return (south + north) / 2, lng - 360 if lng > 180 else lng
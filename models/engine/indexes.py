@@ -0,0 +1,282 @@
+#!/usr/bin/python3
+"""
+Contains the secondary indexes kept by the file based storage engines
+
+An index covers one attribute of one class, or several for GridIndex.
+It only stores object keys (<class name>.id); the storage engine
+resolves them back to objects.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from math import floor
+import threading
+from models.engine.geo import longitude_ranges
+
+max_key = chr(0x10ffff)  # sorts after every key
+merge_threshold = 1000  # queued changes past which entries are re-sorted
+
+
+class ForeignKeyIndex:
+    """Maps each value of a foreign key attribute to the keys holding it"""
+
+    def __init__(self, cls_name, attr):
+        """Creates an empty index on attribute attr of class cls_name"""
+        self.cls_name = cls_name
+        self.attr = attr
+        self.attrs = (attr,)  # attributes whose change moves an object
+        self.values = {}  # key -> indexed value
+        self.buckets = {}  # value -> {key: None}, an insertion ordered set
+
+    def add(self, key, obj):
+        """Indexes obj under key"""
+        value = getattr(obj, self.attr, None)
+        if value is None:
+            return
+        self.values[key] = value
+        self.buckets.setdefault(value, {})[key] = None
+
+    def remove(self, key):
+        """Removes key from the index"""
+        if key not in self.values:
+            return
+        value = self.values.pop(key)
+        bucket = self.buckets[value]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[value]
+
+    def lookup(self, value):
+        """Returns the keys of the objects whose attribute equals value"""
+        return list(self.buckets.get(value, ()))
+
+    def members(self, value):
+        """Returns a read-only set view of the keys of the objects whose
+        attribute equals value, for intersections without copying"""
+        return self.buckets.get(value, {}).keys()
+
+
+class MultiValueIndex(ForeignKeyIndex):
+    """Maps each element of a list attribute to the keys of the objects
+    whose list holds it"""
+
+    def add(self, key, obj):
+        """Indexes obj under key for every element of its list"""
+        values = tuple(set(getattr(obj, self.attr, None) or ()))
+        if not values:
+            return
+        self.values[key] = values
+        for value in values:
+            self.buckets.setdefault(value, {})[key] = None
+
+    def remove(self, key):
+        """Removes key from the index"""
+        for value in self.values.pop(key, ()):
+            bucket = self.buckets[value]
+            del bucket[key]
+            if not bucket:
+                del self.buckets[value]
+
+
+class SortedIndex:
+    """Keeps the (value, key) pairs of a numeric attribute sorted, so a
+    range or the first k objects in value order cost O(log N + k)
+
+    Changes are queued and only merged into the sorted entries by the
+    next query: one at a time when there are few, with a single sort when
+    there are many, so that loading N objects costs O(N log N).
+    """
+
+    def __init__(self, cls_name, attr):
+        """Creates an empty index on attribute attr of class cls_name"""
+        self.cls_name = cls_name
+        self.attr = attr
+        self.attrs = (attr,)
+        self.values = {}  # key -> indexed value
+        self.entries = []  # sorted list of (value, key)
+        self.added = []  # (value, key) pairs not merged into entries yet
+        self.removed = set()  # (value, key) pairs to drop from entries
+        self.lock = threading.Lock()  # serializes merges by readers
+
+    def value(self, obj):
+        """Returns the value indexed for obj, None if it is not a number"""
+        value = getattr(obj, self.attr, None)
+        return value if is_number(value) else None
+
+    def add(self, key, obj):
+        """Indexes obj under key, unless it has no value to index"""
+        value = self.value(obj)
+        if value is None:
+            return
+        self.values[key] = value
+        if (value, key) in self.removed:
+            self.removed.discard((value, key))
+        else:
+            self.added.append((value, key))
+
+    def remove(self, key):
+        """Removes key from the index"""
+        if key in self.values:
+            self.removed.add((self.values.pop(key), key))
+
+    def __merge(self):
+        """Applies the queued changes to the sorted entries"""
+        with self.lock:
+            added, removed = self.added, self.removed
+            if not added and not removed:
+                return
+            if len(added) + len(removed) > merge_threshold:
+                entries = [entry for entry in self.entries
+                           if entry not in removed]
+                entries.extend(entry for entry in added
+                               if entry not in removed)
+                entries.sort()
+                self.entries = entries
+            else:
+                entries = self.entries
+                for entry in added:
+                    if entry not in removed:
+                        insort(entries, entry)
+                for entry in removed:
+                    i = bisect_left(entries, entry)
+                    if i < len(entries) and entries[i] == entry:
+                        del entries[i]
+            self.added, self.removed = [], set()
+
+    def bounds(self, low=None, high=None):
+        """Returns the [start, end) slice of the entries whose value lies
+        between low and high, both included when given"""
+        self.__merge()
+        start = 0 if low is None else bisect_left(self.entries, (low,))
+        end = len(self.entries) if high is None else \
+            bisect_right(self.entries, (high, max_key))
+        return start, max(start, end)
+
+    def count(self, low=None, high=None):
+        """Returns the number of keys whose value lies in [low, high]"""
+        start, end = self.bounds(low, high)
+        return end - start
+
+    def scan(self, low=None, high=None, after=None, reverse=False):
+        """Yields the keys whose value lies in [low, high] in (value, key)
+        order, or the reverse, starting past the (value, key) pair after"""
+        start, end = self.bounds(low, high)
+        entries = self.entries
+        if after is not None and reverse:
+            end = min(end, bisect_left(entries, tuple(after)))
+        elif after is not None:
+            start = max(start, bisect_right(entries, tuple(after)))
+        steps = range(end - 1, start - 1, -1) if reverse else \
+            range(start, end)
+        for i in steps:
+            yield entries[i][1]
+
+    def lookup(self, value):
+        """Returns the keys of the objects whose attribute equals value"""
+        return list(self.scan(value, value))
+
+
+class PrefixIndex(SortedIndex):
+    """Keeps the (case folded value, key) pairs of a text attribute
+    sorted, so the first k objects whose value starts with a prefix cost
+    O(log N + k)"""
+
+    def value(self, obj):
+        """Returns the case folded text of obj, None if it has none"""
+        value = getattr(obj, self.attr, None)
+        return value.casefold() if isinstance(value, str) and value else None
+
+    def lookup(self, value):
+        """Returns the keys of the objects whose attribute equals value,
+        ignoring case"""
+        if not isinstance(value, str):
+            return []
+        return list(self.scan(value.casefold(), value.casefold()))
+
+    def prefix(self, prefix, limit=None):
+        """Returns up to limit keys whose value starts with prefix, in
+        (value, key) order"""
+        prefix = prefix.casefold()
+        start, end = self.bounds(prefix, prefix + max_key)
+        if limit is not None:
+            end = min(end, start + limit)
+        return [key for value, key in self.entries[start:end]]
+
+
+def is_number(value):
+    """Returns whether value is an int or a float other than NaN"""
+    return isinstance(value, (int, float)) and \
+        not isinstance(value, bool) and value == value
+
+
+def stored_value(obj, attr):
+    """Returns attribute attr as obj stores it, or its record for an
+    object not built yet, or None when only its class has a default, as
+    the class defaults stand for the NULL columns of the database"""
+    record = getattr(obj, "record", None)  # set on a file storage Record
+    values = record if isinstance(record, dict) else obj.__dict__
+    return values.get(attr)
+
+
+class GridIndex:
+    """Files the keys of located objects in square cells of a latitude /
+    longitude grid, so a box query only visits the cells it overlaps"""
+
+    def __init__(self, cls_name, attrs=("latitude", "longitude"), cell=0.5):
+        """Creates an empty index on the (latitude, longitude) attributes
+        attrs of class cls_name, with cells of cell degrees"""
+        self.cls_name = cls_name
+        self.attrs = attrs
+        self.cell = cell
+        self.values = {}  # key -> (cell, latitude, longitude)
+        self.buckets = {}  # cell -> {key: None}
+
+    def __cell(self, lat, lng):
+        """Returns the (row, column) of the cell holding (lat, lng)"""
+        return floor((lat + 90) / self.cell), floor((lng + 180) / self.cell)
+
+    def add(self, key, obj):
+        """Indexes obj under key, unless it stores no location"""
+        lat = stored_value(obj, self.attrs[0])
+        lng = stored_value(obj, self.attrs[1])
+        try:
+            lat, lng = float(lat), float(lng)
+        except (TypeError, ValueError):
+            return
+        cell = self.__cell(lat, lng)
+        self.values[key] = (cell, lat, lng)
+        self.buckets.setdefault(cell, {})[key] = None
+
+    def remove(self, key):
+        """Removes key from the index"""
+        if key not in self.values:
+            return
+        cell = self.values.pop(key)[0]
+        bucket = self.buckets[cell]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[cell]
+
+    def location(self, key):
+        """Returns the (latitude, longitude) indexed for key"""
+        return self.values[key][1:]
+
+    def box(self, south, west, north, east):
+        """Returns the keys filed in the cells overlapping the box; some
+        may lie outside of it, so callers check the exact locations"""
+        bottom = self.__cell(south, 0)[0]
+        top = self.__cell(north, 0)[0]
+        columns = [(self.__cell(0, w)[1], self.__cell(0, e)[1])
+                   for w, e in longitude_ranges(west, east)]
+        cells = (top - bottom + 1) * sum(e - w + 1 for w, e in columns)
+        keys = []
+        if cells > len(self.buckets):
+            for (row, column), bucket in self.buckets.items():
+                if bottom <= row <= top and \
+                        any(w <= column <= e for w, e in columns):
+                    keys.extend(bucket)
+            return keys
+        for row in range(bottom, top + 1):
+            for w, e in columns:
+                for column in range(w, e + 1):
+                    keys.extend(self.buckets.get((row, column), ()))
+        return keys
@@ -0,0 +1,554 @@
+#!/usr/bin/python3
+"""
+Contains the KVStorage class, used when HBNB_TYPE_STORAGE=kv
+
+Every object is stored under its own <class name>.<id> key of a dbm
+database, as the JSON record FileStorage writes, so that get(), new(),
+delete() and save() read or write a few keys whatever the number of
+objects, and nothing is loaded at startup. Index keys live alongside:
+    ~meta - the layout of the database
+    ~class/<class name>/<n> - the ids of the objects of the class whose
+        id hashes to bucket n, listing a class without a full scan
+    ~count/<class name> - the number of objects of the class
+    ~version/<class name> - the generation and time of its last change
+    ~fk/<class name>/<attr>/<value> - the ids of the objects whose foreign
+        key attr, or list attr, holds value
+save() reads, updates and writes each index key once for all the
+objects it writes.
+
+The database is HBNB_KV_PATH (file.db by default), opened with the best
+dbm module available. dbm.gnu and dbm.ndbm work on disk; the pure Python
+dbm.dumb fallback keeps the offsets of the keys in memory and rewrites
+them on every save. The objects read are kept in an LRU of
+HBNB_KV_CACHE_SIZE objects (10000 by default), which bounds the memory
+used whatever the size of the database. Changes wait in memory until
+save(), like those of a FileStorage, and a database is used by one
+process at a time.
+"""
+
+from collections import OrderedDict
+import dbm
+from datetime import datetime, timezone
+from bisect import bisect_right
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from models.engine import geo
+from models.engine.file_storage import classes, foreign_keys, multi_keys
+from models.engine.file_storage import texts
+from models.engine.fulltext import FullTextIndex, parse_query
+from models.engine.indexes import is_number, stored_value
+from models.place import Place
+
+# attributes whose values are indexed, per class
+indexed = {name: foreign_keys.get(name, ()) + multi_keys.get(name, ())
+           for name in classes}
+kv_path = os.getenv("HBNB_KV_PATH", "file.db")
+kv_cache_size = int(os.getenv("HBNB_KV_CACHE_SIZE", "10000"))
+# buckets of the id lists of a class, set when the database is created
+kv_buckets = int(os.getenv("HBNB_KV_BUCKETS", "256"))
+
+
+def index_values(name, attr, values):
+    """Returns the set of values of attr, a foreign key or a list, that
+    index an object of class name whose attributes are values"""
+    value = values.get(attr)
+    if attr in multi_keys.get(name, ()):
+        return set(value or ())
+    return set() if value is None else {value}
+
+
+class KVStorage:
+    """Stores every object under its own key of a dbm database"""
+
+    def __init__(self, path=None, cache_size=None):
+        """Creates a storage on the dbm database at path, keeping up to
+        cache_size objects in memory"""
+        self.__path = path or kv_path
+        self.__cache_size = kv_cache_size if cache_size is None \
+            else cache_size
+        self.__db = None
+        self.__meta = None
+        self.__lock = threading.RLock()
+        self.__cache = OrderedDict()  # key -> object, least recent first
+        self.__pending = {}  # key -> object, None when deleted, until save
+        self.__metrics = {"saves": 0, "serialized": 0, "bytes": 0,
+                          "seconds": 0.0, "last_serialized": 0,
+                          "last_bytes": 0, "last_seconds": 0.0,
+                          "hits": 0, "misses": 0, "evictions": 0}
+
+    def reload(self):
+        """Opens the database, creating it if needed, and empties the
+        cache of objects; changes not saved yet are kept"""
+        with self.__lock:
+            if self.__db is None:
+                self.__db = dbm.open(self.__path, 'c')
+                self.__meta = self.__read("~meta")
+                if self.__meta is None:
+                    self.__meta = {"buckets": kv_buckets,
+                                   "uid": uuid.uuid4().hex}
+                    self.__write("~meta", self.__meta)
+                    self.__sync()
+            self.__cache.clear()
+
+    def close(self):
+        """Ends a request; every read goes to the database, so there is
+        nothing to pick up, and changes not saved yet are kept"""
+
+    def shutdown(self):
+        """Closes the database, which the next reload() opens again"""
+        with self.__lock:
+            if self.__db is not None:
+                self.__db.close()
+                self.__db = None
+
+    def new(self, obj):
+        """Adds obj, written by the next save()"""
+        if obj is not None:
+            key = obj.__class__.__name__ + "." + obj.id
+            with self.__lock:
+                self.__pending[key] = obj
+                self.__cache.pop(key, None)
+
+    def bulk_new(self, objs, batch_size=None, detach=True):
+        """Adds every object of objs, as new() does; batch_size and detach
+        only matter to the database engine"""
+        with self.__lock:
+            for obj in objs:
+                self.new(obj)
+
+    def delete(self, obj=None):
+        """Deletes obj, from the database at the next save()"""
+        if obj is not None:
+            key = obj.__class__.__name__ + "." + obj.id
+            with self.__lock:
+                self.__pending[key] = None
+                self.__cache.pop(key, None)
+
+    def changed(self, obj, attr):
+        """Marks obj as modified after its attribute attr was set, if its
+        key is stored and has no other change pending, as an object the
+        cache no longer holds may still be changed; returns whether it
+        is marked"""
+        id = obj.__dict__.get("id")
+        if id is None:
+            return False
+        key = obj.__class__.__name__ + "." + id
+        with self.__lock:
+            if key in self.__pending:
+                return self.__pending[key] is obj
+            if self.__cache.get(key) is not obj and \
+                    (self.__db is None or not self.__db.get(key)):
+                return False
+            self.__pending[key] = obj
+            self.__cache.pop(key, None)
+            return True
+
+    def save(self):
+        """Writes the objects added, changed or deleted since the last
+        save, then the index keys they change, and syncs the database"""
+        with self.__lock:
+            start = time.perf_counter()
+            buckets = self.__meta["buckets"]
+            lists = {}  # index key -> (ids added, ids removed)
+            counts = {}  # class name -> change of its number of objects
+            serialized = size = 0
+            for key, obj in self.__pending.items():
+                name, id = key.split(".", 1)
+                old = self.__read(key)
+                record = None if obj is None else obj.to_dict()
+                if record == old:
+                    continue
+                data = None if record is None else json.dumps(record)
+                self.__put(key, data)
+                serialized += 1
+                size += len(data or "")
+                if (old is None) != (record is None):
+                    bucket = zlib.crc32(id.encode("utf-8")) % buckets
+                    changes = lists.setdefault(
+                        "~class/{}/{}".format(name, bucket), (set(), set()))
+                    changes[record is None].add(id)
+                    counts[name] = counts.get(name, 0) + \
+                        (1 if old is None else -1)
+                counts.setdefault(name, 0)
+                for attr in indexed[name]:
+                    before = index_values(name, attr, old or {})
+                    after = index_values(name, attr, record or {})
+                    for value in before ^ after:
+                        changes = lists.setdefault(
+                            self.__fk_key(name, attr, value), (set(), set()))
+                        changes[value in before].add(id)
+            for list_key, (added, removed) in lists.items():
+                ids = set(self.__read(list_key) or ())
+                ids.difference_update(removed)
+                ids.update(added)
+                self.__write(list_key, sorted(ids) if ids else None)
+            now = datetime.now(timezone.utc).isoformat()
+            for name, change in counts.items():
+                count = self.__read("~count/" + name) or 0
+                self.__write("~count/" + name, count + change)
+                version = self.__read("~version/" + name) or [0, None]
+                self.__write("~version/" + name, [version[0] + 1, now])
+            self.__sync()
+            for key, obj in self.__pending.items():
+                if obj is not None:
+                    self.__remember(key, obj)
+            self.__pending = {}
+            self.__measure(start, serialized, size)
+
+    def __measure(self, start, serialized, size):
+        """Records the cost of a save that started at start"""
+        metrics = self.__metrics
+        seconds = time.perf_counter() - start
+        metrics["saves"] += 1
+        metrics["serialized"] += serialized
+        metrics["bytes"] += size
+        metrics["seconds"] += seconds
+        metrics["last_serialized"] = serialized
+        metrics["last_bytes"] = size
+        metrics["last_seconds"] = seconds
+
+    def metrics(self):
+        """Returns the save metrics, as FileStorage does, with the hits,
+        misses and evictions of the cache of objects and its size"""
+        with self.__lock:
+            metrics = dict(self.__metrics)
+            metrics["cached"] = len(self.__cache)
+            return metrics
+
+    def get(self, cls, id, load=None):
+        """Returns the object of class cls and id, or None if not found;
+        load is accepted for DBStorage compatibility and ignored"""
+        if cls and id:
+            name = cls if isinstance(cls, str) else cls.__name__
+            with self.__lock:
+                return self.__load("{}.{}".format(name, id))
+        return None
+
+    def get_many(self, cls, ids):
+        """Returns the {id: object} of the objects of class cls whose id
+        is in ids, leaving out the ids not found"""
+        name = cls if isinstance(cls, str) else cls.__name__
+        found = {}
+        with self.__lock:
+            for id in ids:
+                obj = self.__load("{}.{}".format(name, id))
+                if obj is not None:
+                    found[id] = obj
+        return found
+
+    def all(self, cls=None, load=None):
+        """Returns a dictionary of the objects of class cls (a class or a
+        class name), or of every object, by <class name>.id; load is
+        accepted for DBStorage compatibility and ignored"""
+        names = classes if cls is None else \
+            [cls if isinstance(cls, str) else cls.__name__]
+        found = {}
+        with self.__lock:
+            for name in names:
+                for id in sorted(self.__ids(name)):
+                    key = "{}.{}".format(name, id)
+                    obj = self.__load(key)
+                    if obj is not None:
+                        found[key] = obj
+        return found
+
+    def count(self, cls=None):
+        """Returns the number of objects, of class cls if it is given,
+        read from the count keys"""
+        if cls is None:
+            return sum(self.counts().values())
+        name = cls if isinstance(cls, str) else cls.__name__
+        with self.__lock:
+            count = self.__read("~count/" + name) or 0
+            for key, obj in self.__pending.items():
+                if key.startswith(name + "."):
+                    stored = self.__read(key) is not None
+                    count += (obj is not None) - stored
+            return count
+
+    def counts(self):
+        """Returns the number of objects of every class"""
+        return {name: self.count(name) for name in classes}
+
+    def lookup(self, cls, attr, value):
+        """Returns a dictionary of the objects of class cls whose attribute
+        attr equals value, using an index key when there is one"""
+        name = cls if isinstance(cls, str) else cls.__name__
+        with self.__lock:
+            if attr in indexed.get(name, ()):
+                keys = ["{}.{}".format(name, id) for id in
+                        sorted(self.__members(name, attr, value))]
+                objs = ((key, self.__load(key)) for key in keys)
+            else:
+                objs = self.all(name).items()
+            return {key: obj for key, obj in objs
+                    if obj is not None and getattr(obj, attr, None) == value}
+
+    def page(self, cls, limit=None, after=None, ranges=None, sort=None,
+             **filters):
+        """Returns up to limit objects of class cls whose attributes match
+        filters, ordered by id and starting after the id after. ranges and
+        sort restrict and order them as for FileStorage.page().
+
+        The ids come from the index key of a filter, or from the class
+        buckets; without ranges or sort, only the objects of the page are
+        read."""
+        name = cls if isinstance(cls, str) else cls.__name__
+        with self.__lock:
+            attr = next((a for a in filters if a in indexed.get(name, ())),
+                        None)
+            if attr is not None:
+                ids = self.__members(name, attr, filters[attr])
+            else:
+                ids = self.__ids(name)
+            if not ranges and not sort and not filters:
+                ids = sorted(ids)
+                start = 0 if after is None else bisect_right(ids, after)
+                ids = ids[start:None if limit is None else start + limit]
+                keys = ["{}.{}".format(name, id) for id in ids]
+                return [obj for obj in map(self.__load, keys)
+                        if obj is not None]
+            objs = [self.__load("{}.{}".format(name, id)) for id in ids]
+            return self.__ordered([obj for obj in objs if obj is not None],
+                                  limit, after, ranges or {}, sort, filters)
+
+    @staticmethod
+    def __ordered(objs, limit, after, ranges, sort, filters):
+        """Returns the page of objs within ranges and matching filters,
+        ordered by (sort, id) or id and starting past after"""
+        attr = sort.lstrip("-") if sort else None
+        reverse = bool(sort) and sort.startswith("-")
+
+        def matches(obj):
+            """Returns whether obj lies within ranges and matches filters"""
+            for a, (low, high) in ranges.items():
+                value = getattr(obj, a, None)
+                if not is_number(value) or \
+                        low is not None and value < low or \
+                        high is not None and value > high:
+                    return False
+            return all(getattr(obj, a, None) == v
+                       for a, v in filters.items())
+        objs = [obj for obj in objs if matches(obj)]
+        if attr:
+            objs = [obj for obj in objs if is_number(getattr(obj, attr,
+                                                             None))]
+
+            def order(obj):
+                """Returns the (value, id) position of obj"""
+                return (getattr(obj, attr), obj.id)
+        else:
+            def order(obj):
+                """Returns the id position of obj"""
+                return obj.id
+        if after is not None:
+            after = tuple(after) if attr else after
+            objs = [obj for obj in objs if
+                    (order(obj) < after if reverse else order(obj) > after)]
+        objs.sort(key=order, reverse=reverse)
+        return objs[:limit]
+
+    def autocomplete(self, cls, prefix, limit=None, attr="name"):
+        """Returns up to limit objects of class cls whose attribute attr
+        starts with prefix, ignoring case, ordered by that attribute"""
+        prefix = prefix.casefold()
+        objs = [obj for obj in self.all(cls).values()
+                if isinstance(getattr(obj, attr, None), str) and
+                getattr(obj, attr).casefold().startswith(prefix)]
+        objs.sort(key=lambda obj: (getattr(obj, attr).casefold(), obj.id))
+        return objs[:limit]
+
+    def places_search(self, states=(), cities=(), amenities=(),
+                      limit=None, after=None, ranges=None, sort=None):
+        """Returns up to limit places, ordered by id and starting after the
+        id after, located in one of cities or in a city of one of states
+        (anywhere when neither is given) and offering all of amenities,
+        intersecting the ids of the index keys; ranges and sort restrict
+        and order the places as for page()"""
+        if not states and not cities and not amenities:
+            return self.page(Place, limit, after, ranges, sort)
+        with self.__lock:
+            sets = []
+            if states or cities:
+                city_ids = set(cities)
+                for state_id in states:
+                    city_ids.update(self.__members("City", "state_id",
+                                                   state_id))
+                ids = set()
+                for city_id in city_ids:
+                    ids.update(self.__members("Place", "city_id", city_id))
+                sets.append(ids)
+            sets.extend(self.__members("Place", "amenity_ids", amenity_id)
+                        for amenity_id in set(amenities))
+            sets.sort(key=len)
+            ids = set(sets[0])
+            for other in sets[1:]:
+                ids.intersection_update(other)
+            objs = [self.__load("Place." + id) for id in ids]
+            return self.__ordered([obj for obj in objs if obj is not None],
+                                  limit, after, ranges or {}, sort, {})
+
+    def places_near(self, lat, lng, radius_km, limit=None):
+        """Returns up to limit (place, distance in km) pairs, nearest
+        first, for the places within radius_km of (lat, lng)"""
+        return self.__located(geo.bounding_box(lat, lng, radius_km),
+                              lat, lng, radius_km, limit)
+
+    def places_in_box(self, south, west, north, east, limit=None):
+        """Returns up to limit (place, distance in km) pairs for the
+        places inside the box, nearest to its center first; west > east
+        for a box crossing the antimeridian"""
+        box = (south, west, north, east)
+        lat, lng = geo.box_center(box)
+        return self.__located(box, lat, lng, None, limit)
+
+    def __located(self, box, lat, lng, radius_km, limit):
+        """Returns the (place, distance) pairs inside box and within
+        radius_km of (lat, lng), scanning the places"""
+        found = []
+        for key, place in self.all(Place).items():
+            location = (stored_value(place, "latitude"),
+                        stored_value(place, "longitude"))
+            if not all(map(is_number, location)) or \
+                    not geo.in_box(location[0], location[1], box):
+                continue
+            distance = geo.distance_km(lat, lng, *location)
+            if radius_km is None or distance <= radius_km:
+                found.append((distance, key, place))
+        found.sort(key=lambda item: item[:2])
+        return [(place, distance) for distance, key, place in found[:limit]]
+
+    def search(self, query, cls=None, limit=None):
+        """Returns up to limit (object, score) pairs, best first, for the
+        objects of class cls, or of every class with a text attribute,
+        whose text holds a word of query; a word ending in * is a prefix.
+        The objects holding a word are scanned for and ranked with BM25."""
+        names = texts if cls is None else \
+            [cls if isinstance(cls, str) else cls.__name__]
+        words = [word for word, prefix in parse_query(query)]
+        found = []
+        for name in names:
+            objs = self.all(name) if words else {}
+            for attr in texts.get(name, ()):
+                index = FullTextIndex(name, attr)
+                for key, obj in objs.items():
+                    text = getattr(obj, attr, None)
+                    if isinstance(text, str) and \
+                            any(word in text.casefold() for word in words):
+                        index.add(key, obj)
+                found.extend((objs[key], score)
+                             for key, score in index.search(query, limit))
+        found.sort(key=lambda item: (-item[1], item[0].id))
+        return found[:limit]
+
+    def version(self, cls):
+        """Returns the (tag, last modified) version of the objects of class
+        cls, read from its version key: the tag changes whenever a save
+        creates, changes or deletes one of them, and last modified is the
+        time of that save"""
+        name = cls if isinstance(cls, str) else cls.__name__
+        with self.__lock:
+            generation, modified = self.__read("~version/" + name) or \
+                [0, None]
+            tag = "{}.{}".format(self.__meta["uid"], generation)
+        if modified is not None:
+            modified = datetime.fromisoformat(modified)
+        return tag, modified
+
+    def __ids(self, name):
+        """Returns the set of ids of the objects of class name, with the
+        changes not saved yet"""
+        ids = set()
+        for bucket in range(self.__meta["buckets"]):
+            ids.update(self.__read("~class/{}/{}".format(name, bucket)) or ())
+        prefix = name + "."
+        for key, obj in self.__pending.items():
+            if key.startswith(prefix):
+                if obj is None:
+                    ids.discard(key[len(prefix):])
+                else:
+                    ids.add(key[len(prefix):])
+        return ids
+
+    def __members(self, name, attr, value):
+        """Returns the set of ids of the objects of class name whose
+        attribute attr holds value, with the changes not saved yet"""
+        ids = set(self.__read(self.__fk_key(name, attr, value)) or ())
+        prefix = name + "."
+        for key, obj in self.__pending.items():
+            if key.startswith(prefix):
+                id = key[len(prefix):]
+                ids.discard(id)
+                if obj is not None and \
+                        value in index_values(name, attr, obj.__dict__):
+                    ids.add(id)
+        return ids
+
+    @staticmethod
+    def __fk_key(name, attr, value):
+        """Returns the index key of the objects of class name whose
+        attribute attr holds value"""
+        if not isinstance(value, str):
+            value = json.dumps(value)
+        return "~fk/{}/{}/{}".format(name, attr, value)
+
+    def __load(self, key):
+        """Returns the object stored under key, from the changes not saved
+        yet, the cache or the database, or None"""
+        if key in self.__pending:
+            return self.__pending[key]
+        obj = self.__cache.get(key)
+        if obj is not None:
+            self.__cache.move_to_end(key)
+            self.__metrics["hits"] += 1
+            return obj
+        self.__metrics["misses"] += 1
+        record = self.__read(key)
+        if record is None:
+            return None
+        obj = classes[record["__class__"]](**record)
+        self.__remember(key, obj)
+        return obj
+
+    def __remember(self, key, obj):
+        """Caches obj under key, evicting the least recently used objects
+        past the size of the cache"""
+        if self.__cache_size <= 0:
+            return
+        self.__cache[key] = obj
+        self.__cache.move_to_end(key)
+        while len(self.__cache) > self.__cache_size:
+            self.__cache.popitem(last=False)
+            self.__metrics["evictions"] += 1
+
+    def __read(self, key):
+        """Returns the JSON value stored under key, or None"""
+        data = self.__db.get(key)
+        return json.loads(data) if data else None
+
+    def __write(self, key, value):
+        """Stores the JSON text of value under key, or removes key if value
+        is None"""
+        self.__put(key, None if value is None else json.dumps(value))
+
+    def __put(self, key, data):
+        """Stores data under key, or removes key if data is None; dbm.dumb
+        rewrites all of its offsets on every removal, so an empty value
+        stands for a removed key there"""
+        if data is not None:
+            self.__db[key] = data
+        elif type(self.__db).__module__ == "dbm.dumb":
+            if self.__db.get(key):
+                self.__db[key] = b""
+        elif key in self.__db:
+            del self.__db[key]
+
+    def __sync(self):
+        """Writes the changes of the database to the disk"""
+        sync = getattr(self.__db, "sync", None)
+        if sync is not None:
+            sync()
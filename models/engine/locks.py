@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+"""
+Contains the locks used by the file based storage engines
+
+ReadWriteLock lets the threads of one process read the stored objects
+together while a writer changes them alone. FileLock is an advisory
+lock on <file>.lock that the writers of every process sharing the same
+JSON file take, so that their saves never interleave; readers do not
+need it since the JSON file is only ever replaced atomically.
+"""
+
+from contextlib import contextmanager
+import os
+import threading
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class ReadWriteLock:
+    """
+    Many readers or a single writer, writers first. A thread holding
+    the lock may acquire it again; a reader may not upgrade to a writer.
+    """
+
+    def __init__(self):
+        """Creates an unlocked lock"""
+        self.__cond = threading.Condition(threading.Lock())
+        self.__readers = 0  # threads holding the read lock
+        self.__writer = None  # ident of the thread holding the write lock
+        self.__waiting = 0  # writers waiting for the readers to leave
+        self.__local = threading.local()  # this thread's (reads, writes)
+
+    def __depth(self):
+        """Returns how many times this thread holds the (read, write) lock"""
+        return getattr(self.__local, "depth", (0, 0))
+
+    @contextmanager
+    def reading(self):
+        """Holds the lock shared for the duration of the with block"""
+        reads, writes = self.__depth()
+        if not reads and not writes:
+            with self.__cond:
+                while self.__writer is not None or self.__waiting:
+                    self.__cond.wait()
+                self.__readers += 1
+        self.__local.depth = (reads + 1, writes)
+        try:
+            yield
+        finally:
+            self.__local.depth = (reads, writes)
+            if not reads and not writes:
+                with self.__cond:
+                    self.__readers -= 1
+                    if not self.__readers:
+                        self.__cond.notify_all()
+
+    @contextmanager
+    def writing(self):
+        """Holds the lock exclusively for the duration of the with block"""
+        reads, writes = self.__depth()
+        if reads and not writes:
+            raise RuntimeError("cannot upgrade a read lock to a write lock")
+        if not writes:
+            with self.__cond:
+                self.__waiting += 1
+                while self.__writer is not None or self.__readers:
+                    self.__cond.wait()
+                self.__waiting -= 1
+                self.__writer = threading.get_ident()
+        self.__local.depth = (reads, writes + 1)
+        try:
+            yield
+        finally:
+            self.__local.depth = (reads, writes)
+            if not writes:
+                with self.__cond:
+                    self.__writer = None
+                    self.__cond.notify_all()
+
+
+class FileLock:
+    """Exclusive advisory lock shared by the processes writing one file"""
+
+    def __init__(self, path):
+        """Creates the lock guarding the file at path"""
+        self.path = path + ".lock"
+
+    @contextmanager
+    def exclusive(self):
+        """Holds the lock for the duration of the with block; does nothing
+        where fcntl is not available"""
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
@@ -0,0 +1,421 @@
+#!/usr/bin/python3
+"""
+Contains the Migration class, copying every object between a FileStorage
+JSON file and the database of a DBStorage
+
+It runs with HBNB_TYPE_STORAGE=db, since only then are the model classes
+mapped to tables, and moves raw records rather than model instances: the
+JSON file is parsed one record at a time and rows are read and written
+with Core statements, chunk rows at a time, so memory does not grow with
+the number of objects.
+
+Classes are copied in the order their foreign keys need: State, City,
+User, Place, Review, Amenity, then the place_amenity links built from the
+amenity_ids of the places. A JSON file is first split into one JSON lines
+file per class in a temporary directory, with its write-ahead log applied
+on the way. Rows whose key the table already holds, or whose foreign key
+names a missing row, are skipped, so that copying twice is harmless.
+
+After every chunk the position reached is written to a checkpoint file,
+<path>.migration by default, and an interrupted copy started again
+resumes there. Copying to a JSON file writes <path>.migrating and moves
+it over path once complete.
+"""
+
+import argparse
+from datetime import datetime, timezone
+import itertools
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from models.base_model import Base
+from models.base_model import time as time_format
+from models.engine.db_storage import classes
+from models.engine.wal import ChangeLog
+from sqlalchemy import select, tuple_
+
+# classes in the order their foreign keys need
+order = ["State", "City", "User", "Place", "Review", "Amenity"]
+# table linking places and amenities, copied last
+links = "place_amenity"
+# characters of the JSON file read at a time
+read_size = 1 << 20
+blank = re.compile(r"\s*")
+
+
+def records(path, size=read_size):
+    """Yields the (key, record) pairs of the JSON object stored at path,
+    holding about size characters of it at a time"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buf, eof = "", False
+
+        def fill(pos):
+            """Drops what precedes pos and reads more, returning the new
+            position of pos"""
+            nonlocal buf, eof
+            chunk = f.read(size)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            return 0
+
+        def skip(pos):
+            """Returns the position of the next non-blank character"""
+            while True:
+                pos = blank.match(buf, pos).end()
+                if pos < len(buf) or eof:
+                    return pos
+                pos = fill(pos)
+
+        def decode(pos):
+            """Returns the (value, end) of the JSON value starting at pos"""
+            while True:
+                try:
+                    return decoder.raw_decode(buf, pos)
+                except ValueError:
+                    if eof:
+                        raise
+                pos = fill(pos)
+
+        def expect(pos, chars):
+            """Returns the character at pos, one of chars"""
+            if buf[pos:pos + 1] not in chars or pos == len(buf):
+                raise ValueError("{}: expected one of {} at character "
+                                 "{}".format(path, chars, pos))
+            return buf[pos]
+
+        pos = skip(0)
+        expect(pos, "{")
+        pos = skip(pos + 1)
+        if buf[pos:pos + 1] == "}":
+            return
+        while True:
+            key, pos = decode(pos)
+            pos = skip(pos)
+            expect(pos, ":")
+            record, pos = decode(skip(pos + 1))
+            yield key, record
+            pos = skip(pos)
+            if expect(pos, ",}") == "}":
+                return
+            pos = skip(pos + 1)
+
+
+def record_of(cls_name, row, amenity_ids=None):
+    """Returns the FileStorage record of the row of class cls_name,
+    without its NULL columns"""
+    record = {"__class__": cls_name}
+    for column, value in row.items():
+        if isinstance(value, datetime):
+            value = value.strftime(time_format)
+        if value is not None:
+            record[column] = value
+    if amenity_ids is not None:
+        record["amenity_ids"] = amenity_ids
+    return record
+
+
+def row_of(record, columns, now):
+    """Returns the row holding record, columns mapping each column to its
+    value when record has none, timestamped now when it has no creation
+    or update time"""
+    row = {column: record.get(column, default)
+           for column, default in columns.items()}
+    for column in ("created_at", "updated_at"):
+        if isinstance(row.get(column), str):
+            row[column] = datetime.strptime(row[column], time_format)
+        elif column in row and row[column] is None:
+            row[column] = now
+    return row
+
+
+def file_signature(path):
+    """Returns the (inode, size, mtime) signature of the file at path, as
+    FileStorage computes it, or None if there is none"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class Migration:
+    """Copies every object between the JSON file at path and the database
+    of storage, a DBStorage, chunk rows at a time"""
+
+    def __init__(self, storage, path, checkpoint=None, chunk=5000,
+                 progress=None):
+        """Creates a migration between storage and the JSON file at path;
+        progress, if given, is called after every chunk with the class
+        name, its rows processed so far and the rows per second"""
+        self.storage = storage
+        self.path = path
+        self.checkpoint = checkpoint or path + ".migration"
+        self.chunk = chunk
+        self.progress = progress
+        self.stats = {}  # class name -> {"copied": rows, "skipped": rows}
+
+    def to_db(self):
+        """Copies the objects of the JSON file, and of its write-ahead log,
+        into the database and returns the stats"""
+        signature = file_signature(self.path)
+        if signature is None:
+            raise FileNotFoundError(self.path)
+        log = file_signature(self.path + ".log")
+        state = self.__resume("to_db", [list(signature), log and list(log)])
+        work = tempfile.mkdtemp(prefix="hbnb-migration-")
+        try:
+            self.__split(signature, work)
+            for name in order + [links]:
+                self.__insert(name, os.path.join(work, name), state)
+        finally:
+            shutil.rmtree(work)
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        return self.stats
+
+    def to_file(self):
+        """Copies the rows of the database into the JSON file and returns
+        the stats"""
+        tmp = self.path + ".migrating"
+        state = self.__resume("to_file", None)
+        if "offset" in state and (not os.path.exists(tmp) or
+                                  os.path.getsize(tmp) < state["offset"]):
+            state = self.__start("to_file", None)
+        with open(tmp, 'r+b' if "offset" in state else 'wb') as f:
+            if "offset" in state:
+                f.truncate(state["offset"])
+                f.seek(state["offset"])
+            else:
+                f.write(b"{")
+                state["offset"] = 1
+            for name in order:
+                if name not in state["finished"]:
+                    self.__select(name, f, state)
+                    state["finished"].append(name)
+                    self.__save(state)
+            f.write(b"}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        return self.stats
+
+    def __resume(self, direction, source):
+        """Returns the checkpointed state of a migration in direction from
+        source, or a new state if the checkpoint is for another one"""
+        try:
+            with open(self.checkpoint, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        if not isinstance(state, dict) or \
+                state.get("direction") != direction or \
+                state.get("path") != self.path or \
+                state.get("source") != source:
+            state = self.__start(direction, source)
+        return state
+
+    def __start(self, direction, source):
+        """Returns the state of a migration in direction from source that
+        did not start yet"""
+        return {"direction": direction, "path": self.path, "source": source,
+                "done": {}, "finished": []}
+
+    def __save(self, state):
+        """Writes state to the checkpoint file, durably"""
+        tmp = self.checkpoint + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint)
+
+    def __report(self, name, done, processed, start):
+        """Calls progress with the rows of class name processed so far and
+        the rate of this run"""
+        if self.progress is not None:
+            seconds = time.perf_counter() - start
+            self.progress(name, done, processed / seconds if seconds else 0)
+
+    def __split(self, signature, work):
+        """Writes the records of the JSON file, updated by its write-ahead
+        log, to one JSON lines file per class in the directory work"""
+        changes = dict(ChangeLog(self.path + ".log").read(signature))
+        files = {name: open(os.path.join(work, name), 'w')
+                 for name in order + [links]}
+        try:
+            def write(record):
+                """Appends record, and its amenity links, to its file"""
+                name = record.get("__class__")
+                if name not in files or name == links:
+                    return
+                files[name].write(json.dumps(record) + "\n")
+                for amenity_id in record.get("amenity_ids") or []:
+                    files[links].write(json.dumps(
+                        {"place_id": record["id"],
+                         "amenity_id": amenity_id}) + "\n")
+            for key, record in records(self.path):
+                if key in changes:
+                    record = changes.pop(key)
+                if record is not None:
+                    write(record)
+            for record in changes.values():
+                if record is not None:
+                    write(record)
+        finally:
+            for f in files.values():
+                f.close()
+
+    def __insert(self, name, path, state):
+        """Inserts the rows of class name, or the links, read from the
+        JSON lines file at path, past those done according to state"""
+        table = Base.metadata.tables[links] if name == links else \
+            classes[name].__table__
+        columns = {column.name: column.default.arg
+                   if column.default is not None and column.default.is_scalar
+                   else None for column in table.columns}
+        done = state["done"].get(name, 0)
+        stats = self.stats.setdefault(name, {"copied": 0, "skipped": 0})
+        start = time.perf_counter()
+        processed = 0
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        with open(path, 'r') as f:
+            lines = itertools.islice(f, done, None)
+            while True:
+                chunk = list(itertools.islice(lines, self.chunk))
+                if not chunk:
+                    break
+                rows = self.__missing(table, [
+                    row_of(json.loads(line), columns, now)
+                    for line in chunk])
+                if rows:
+                    self.storage.bulk_insert(table, rows)
+                    self.storage.save()
+                stats["copied"] += len(rows)
+                stats["skipped"] += len(chunk) - len(rows)
+                done += len(chunk)
+                processed += len(chunk)
+                state["done"][name] = done
+                self.__save(state)
+                self.__report(name, done, processed, start)
+
+    def __missing(self, table, rows):
+        """Returns the rows whose key table does not hold yet and whose
+        foreign keys name existing rows"""
+        keys = list(table.primary_key.columns)
+        if len(keys) == 1:
+            query = select(keys[0]).where(
+                keys[0].in_([row[keys[0].name] for row in rows]))
+            held = {(key,) for key in self.storage.execute(query).scalars()}
+        else:
+            query = select(*keys).where(tuple_(*keys).in_(
+                [tuple(row[key.name] for key in keys) for row in rows]))
+            held = set(map(tuple, self.storage.execute(query)))
+        rows = [row for row in rows
+                if tuple(row[key.name] for key in keys) not in held]
+        for fk in table.foreign_keys:
+            values = {row[fk.parent.name] for row in rows} - {None}
+            if not values:
+                continue
+            query = select(fk.column).where(fk.column.in_(list(values)))
+            found = set(self.storage.execute(query).scalars())
+            rows = [row for row in rows if row[fk.parent.name] is None or
+                    row[fk.parent.name] in found]
+        return rows
+
+    def __select(self, name, f, state):
+        """Appends the rows of class name to the JSON file being written
+        to f, past the id state names"""
+        table = classes[name].__table__
+        link = Base.metadata.tables[links]
+        after = state.get("after") if state.get("class") == name else None
+        done = state["done"].get(name, 0)
+        stats = self.stats.setdefault(name, {"copied": 0, "skipped": 0})
+        start = time.perf_counter()
+        processed = 0
+        while True:
+            query = select(table).order_by(table.c.id).limit(self.chunk)
+            if after is not None:
+                query = query.where(table.c.id > after)
+            rows = self.storage.execute(query).mappings().all()
+            if not rows:
+                break
+            amenities = None
+            if name == "Place":
+                amenities = {row["id"]: [] for row in rows}
+                query = select(link.c.place_id, link.c.amenity_id).where(
+                    link.c.place_id.in_(amenities)).order_by(
+                    link.c.place_id, link.c.amenity_id)
+                for place_id, amenity_id in self.storage.execute(query):
+                    amenities[place_id].append(amenity_id)
+            parts = []
+            for row in rows:
+                record = record_of(name, row, None if amenities is None
+                                   else amenities[row["id"]])
+                parts.append(json.dumps(name + "." + row["id"]) + ": " +
+                             json.dumps(record))
+            data = ",\n".join(parts)
+            if state["offset"] > 1:
+                data = ",\n" + data
+            f.write(data.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            after = rows[-1]["id"]
+            done += len(rows)
+            processed += len(rows)
+            stats["copied"] += len(rows)
+            state.update({"class": name, "after": after,
+                          "offset": f.tell()})
+            state["done"][name] = done
+            self.__save(state)
+            self.__report(name, done, processed, start)
+
+
+def migrate(direction, path, checkpoint=None, chunk=5000, out=print):
+    """Copies the objects of models.storage to the JSON file at path, with
+    direction "export", or from it with "import", printing the progress
+    with out; returns the stats"""
+    import models
+
+    def progress(name, done, rate):
+        """Prints the rows of class name copied so far"""
+        out("{}: {} rows ({:.0f} rows/s)".format(name, done, rate))
+    migration = Migration(models.storage, path, checkpoint, chunk, progress)
+    start = time.perf_counter()
+    if direction == "import":
+        stats = migration.to_db()
+    else:
+        stats = migration.to_file()
+    seconds = time.perf_counter() - start
+    rows = sum(counts["copied"] + counts["skipped"]
+               for counts in stats.values())
+    for name, counts in stats.items():
+        out("{}: {} copied, {} skipped".format(name, counts["copied"],
+                                               counts["skipped"]))
+    out("{} rows in {:.1f} s ({:.0f} rows/s)".format(
+        rows, seconds, rows / seconds if seconds else 0))
+    return stats
+
+
+def main():
+    """Parses the command line and runs the migration"""
+    parser = argparse.ArgumentParser(
+        description="Copies the objects between a JSON file and the "
+                    "database of HBNB_TYPE_STORAGE=db")
+    parser.add_argument("direction", choices=["import", "export"],
+                        help="import the file into the database, or "
+                             "export the database to the file")
+    parser.add_argument("path", nargs="?", default="file.json")
+    parser.add_argument("--checkpoint")
+    parser.add_argument("--chunk", type=int, default=5000)
+    args = parser.parse_args()
+    migrate(args.direction, args.path, args.checkpoint, args.chunk)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/python3
+"""
+Contains the connection pool of DBStorage and its configuration
+
+The database is HBNB_DB_URL, any SQLAlchemy URL, e.g. sqlite:///hbnb.db,
+or else the MySQL database named by HBNB_MYSQL_USER, HBNB_MYSQL_PWD,
+HBNB_MYSQL_HOST and HBNB_MYSQL_DB.
+
+The pool is tuned through the environment:
+    HBNB_MYSQL_POOL_SIZE - connections kept open (default 5)
+    HBNB_MYSQL_POOL_MAX_OVERFLOW - extra connections opened under load and
+        closed when returned (default 10)
+    HBNB_MYSQL_POOL_TIMEOUT - seconds a request waits for a connection
+        before failing (default 30)
+    HBNB_MYSQL_POOL_RECYCLE - seconds after which a connection is replaced,
+        kept below the server's wait_timeout (default 1800)
+    HBNB_MYSQL_POOL_PRE_PING - 1 to test each connection when it is checked
+        out and transparently replace a stale one (default 1)
+    HBNB_MYSQL_STATEMENT_TIMEOUT - milliseconds after which MySQL aborts a
+        SELECT, 0 for no limit (default 0)
+The size, overflow and timeout also apply to a SQLite file, which is
+opened in WAL mode, so that readers never wait for the writer, with:
+    HBNB_SQLITE_JOURNAL_MODE - the journal mode (default WAL)
+    HBNB_SQLITE_SYNCHRONOUS - when to fsync, NORMAL being safe in WAL mode
+        and losing at most the last commits on a power loss (default NORMAL)
+    HBNB_SQLITE_MMAP_SIZE - bytes of the file read through mmap (default
+        268435456)
+    HBNB_SQLITE_CACHE_SIZE - page cache of each connection, in KiB when
+        negative (default -65536)
+    HBNB_SQLITE_BUSY_TIMEOUT - milliseconds a write waits for the lock
+        held by another writer (default 5000)
+An in-memory SQLite database is held by a single shared connection.
+"""
+
+import os
+from os import getenv
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool, StaticPool
+
+
+def database_url():
+    """Returns the URL of the database set by the environment"""
+    url = getenv("HBNB_DB_URL")
+    if url:
+        return url
+    return 'mysql+mysqldb://{}:{}@{}/{}'.format(getenv('HBNB_MYSQL_USER'),
+                                                getenv('HBNB_MYSQL_PWD'),
+                                                getenv('HBNB_MYSQL_HOST'),
+                                                getenv('HBNB_MYSQL_DB'))
+
+
+def create_db_engine(url):
+    """Returns the engine of the database at url; a SQLite file, and its
+    directory, are created if missing, and every connection to it gets
+    the pragmas sqlite_pragmas() returns now"""
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite":
+        return create_engine(url, **engine_options(url))
+    if not is_memory(url):
+        directory = os.path.dirname(os.path.abspath(url.database))
+        os.makedirs(directory, exist_ok=True)
+    engine = create_engine(url, **engine_options(url))
+    pragmas = sqlite_pragmas()
+
+    def connected(dbapi_connection, connection_record):
+        """Sets the pragmas on a new connection"""
+        set_pragmas(dbapi_connection, pragmas)
+    event.listen(engine, "connect", connected)
+    return engine
+
+
+def engine_options(url=None):
+    """Returns the create_engine() keyword arguments of the database at
+    url, MySQL by default, set by the environment"""
+    if url is not None and make_url(url).get_backend_name() == "sqlite":
+        return sqlite_options(url)
+    options = {
+        "poolclass": MeteredPool,
+        "pool_size": int(getenv("HBNB_MYSQL_POOL_SIZE", "5")),
+        "max_overflow": int(getenv("HBNB_MYSQL_POOL_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(getenv("HBNB_MYSQL_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(getenv("HBNB_MYSQL_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": getenv("HBNB_MYSQL_POOL_PRE_PING", "1") == "1",
+    }
+    timeout = int(getenv("HBNB_MYSQL_STATEMENT_TIMEOUT", "0"))
+    if timeout > 0:
+        options["connect_args"] = {
+            "init_command":
+                "SET SESSION max_execution_time={}".format(timeout)}
+    return options
+
+
+def is_memory(url):
+    """Tells whether the SQLite url names an in-memory database"""
+    url = make_url(url)
+    return url.database in (None, "", ":memory:") or \
+        url.query.get("mode") == "memory"
+
+
+def sqlite_options(url):
+    """Returns the create_engine() keyword arguments of the SQLite
+    database at url"""
+    options = {"connect_args": {"check_same_thread": False}}
+    if is_memory(url):
+        options["poolclass"] = StaticPool
+        return options
+    options.update({
+        "poolclass": MeteredPool,
+        "pool_size": int(getenv("HBNB_MYSQL_POOL_SIZE", "5")),
+        "max_overflow": int(getenv("HBNB_MYSQL_POOL_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(getenv("HBNB_MYSQL_POOL_TIMEOUT", "30")),
+    })
+    return options
+
+
+def sqlite_pragmas():
+    """Returns the (pragma, value) pairs set on every SQLite connection"""
+    return [
+        ("journal_mode", getenv("HBNB_SQLITE_JOURNAL_MODE", "WAL")),
+        ("synchronous", getenv("HBNB_SQLITE_SYNCHRONOUS", "NORMAL")),
+        ("mmap_size", int(getenv("HBNB_SQLITE_MMAP_SIZE", str(256 << 20)))),
+        ("cache_size", int(getenv("HBNB_SQLITE_CACHE_SIZE", "-65536"))),
+        ("busy_timeout", int(getenv("HBNB_SQLITE_BUSY_TIMEOUT", "5000"))),
+        ("foreign_keys", "ON"),
+    ]
+
+
+def set_pragmas(dbapi_connection, pragmas):
+    """Sets the (pragma, value) pairs of pragmas on a SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in pragmas:
+            cursor.execute("PRAGMA {}={}".format(pragma, value))
+    finally:
+        cursor.close()
+
+
+class MeteredPool(QueuePool):
+    """QueuePool counting its checkouts, overflow connections, timeouts
+    and the time spent waiting for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        """Creates the pool with zeroed metrics"""
+        super().__init__(*args, **kwargs)
+        self.metrics = {"checkouts": 0, "overflows": 0, "timeouts": 0,
+                        "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+        self.metrics_lock = threading.Lock()  # threads check out at once
+
+    def _do_get(self):
+        """Checks a connection out, recording how long it took"""
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except TimeoutError:
+            with self.metrics_lock:
+                self.metrics["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self.metrics_lock:
+                self.metrics["wait_seconds"] += waited
+                if waited > self.metrics["max_wait_seconds"]:
+                    self.metrics["max_wait_seconds"] = waited
+        overflow = self.checkedout() > self.size()
+        with self.metrics_lock:
+            self.metrics["checkouts"] += 1
+            if overflow:
+                self.metrics["overflows"] += 1
+        return conn
+
+    def recreate(self):
+        """Returns a new pool, as on dispose(), keeping the metrics"""
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        pool.metrics_lock = self.metrics_lock
+        return pool
+
+    def stats(self):
+        """Returns the metrics along with the current pool state"""
+        with self.metrics_lock:
+            metrics = dict(self.metrics)
+        metrics.update(size=self.size(), checked_out=self.checkedout(),
+                       overflow=max(self.overflow(), 0))
+        return metrics
@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+"""
+Contains the ChangeLog class, the write-ahead log of FileStorage
+
+The log sits next to the JSON snapshot (<file>.log). Its first line
+names the signature of the snapshot it applies to; every other line is
+one JSON change record: {"key": <class name>.id, "record": {...}} for a
+created or updated object and {"key": ..., "record": null} for a deleted
+one. A log whose header does not match the current snapshot is stale
+and is ignored. A torn last line left by a crash is never applied: it
+stays unread, and the next append starts on a new line past it.
+"""
+
+import json
+import os
+
+
+class ChangeLog:
+    """Append-only log of the records changed since the last snapshot"""
+
+    def __init__(self, path):
+        """Creates a reader/writer for the log stored at path"""
+        self.path = path
+        self.inode = None  # inode of the log file last read
+        self.offset = 0  # bytes of that file already read
+        self.base = None  # snapshot signature named by its header
+
+    def read(self, base):
+        """Returns the (key, record) changes appended since the last read,
+        or nothing if the log does not apply to the snapshot base"""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            self.inode, self.offset, self.base = None, 0, None
+            return []
+        with f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != self.inode or st.st_size < self.offset:
+                self.inode, self.offset, self.base = st.st_ino, 0, None
+            if self.offset == 0:
+                header = f.readline()
+                if not header.endswith(b"\n"):
+                    return []
+                try:
+                    self.base = json.loads(header.decode("utf-8"))["base"]
+                except (ValueError, KeyError, TypeError):
+                    return []
+                self.offset = len(header)
+            if base is None or self.base != list(base):
+                return []
+            f.seek(self.offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        self.offset += end
+        changes = []
+        for line in data[:end].splitlines():
+            try:
+                change = json.loads(line.decode("utf-8"))
+                changes.append((change["key"], change["record"]))
+            except (ValueError, KeyError, TypeError):
+                continue
+        return changes
+
+    def append(self, changes, base, sync=False):
+        """Appends the (key, record) changes to the log of snapshot base
+        and returns the number of bytes written"""
+        if self.inode is None or self.base != list(base):
+            self.reset(base, sync)
+        data = "\n" + "".join(json.dumps({"key": key, "record": record}) +
+                              "\n" for key, record in changes)
+        data = data.encode("utf-8")
+        with open(self.path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+        return len(data)
+
+    def reset(self, base, sync=False):
+        """Replaces the log by an empty one applying to snapshot base"""
+        header = (json.dumps({"base": list(base)}) + "\n").encode("utf-8")
+        tmp = self.path + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(header)
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.inode = os.stat(self.path).st_ino
+        self.offset = len(header)
+        self.base = list(base)
+
+    def pending(self):
+        """Returns whether the log may hold changes not read yet"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return self.inode is not None
+        return st.st_ino != self.inode or st.st_size != self.offset
+
+    def size(self):
+        """Returns the size in bytes of the log, 0 if there is none"""
+        try:
+            return os.stat(self.path).st_size
+        except OSError:
+            return 0
@@ -4,7 +4,8 @@ import models
 from models.base_model import BaseModel, Base
 from os import getenv
 import sqlalchemy
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, Table
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, Index
+from sqlalchemy import Table
 from sqlalchemy.orm import relationship
 
 if models.storage_t == 'db':
@@ -23,6 +24,19 @@ class Place(BaseModel, Base):
     """Representation of Place """
     if models.storage_t == 'db':
         __tablename__ = 'places'
+        __table_args__ = (
+            Index('ix_places_latitude_longitude', 'latitude', 'longitude'),
+            Index('ix_places_price_by_night', 'price_by_night', 'id'),
+            Index('ix_places_max_guest', 'max_guest', 'id'),
+            Index('ix_places_city_price_by_night',
+                  'city_id', 'price_by_night', 'id'),
+            Index('ix_places_city_number_rooms',
+                  'city_id', 'number_rooms', 'id'),
+            Index('ix_places_city_number_bathrooms',
+                  'city_id', 'number_bathrooms', 'id'),
+            Index('ix_places_city_max_guest', 'city_id', 'max_guest', 'id'),
+            Index('ix_places_description', 'description',
+                  mysql_prefix='FULLTEXT'))
         city_id = Column(String(60), ForeignKey('cities.id'), nullable=False)
         user_id = Column(String(60), ForeignKey('users.id'), nullable=False)
         name = Column(String(128), nullable=False)
@@ -59,20 +73,16 @@ class Place(BaseModel, Base):
         def reviews(self):
             """getter attribute returns the list of Review instances"""
             from models.review import Review
-            review_list = []
-            all_reviews = models.storage.all(Review)
-            for review in all_reviews.values():
-                if review.place_id == self.id:
-                    review_list.append(review)
-            return review_list
+            return list(models.storage.lookup(Review, "place_id",
+                                              self.id).values())
 
         @property
         def amenities(self):
             """getter attribute returns the list of Amenity instances"""
             from models.amenity import Amenity
             amenity_list = []
-            all_amenities = models.storage.all(Amenity)
-            for amenity in all_amenities.values():
-                if amenity.place_id == self.id:
+            for amenity_id in self.amenity_ids:
+                amenity = models.storage.get(Amenity, amenity_id)
+                if amenity is not None:
                     amenity_list.append(amenity)
             return amenity_list
@@ -173,6 +173,30 @@ class TestCityAPI(unittest.TestCase):
         storage.delete(city)
         storage.save()
 
+    def test_autocomplete(self):
+        """Test GET /api/v1/autocomplete for city names"""
+        cities = [City(name=name, state_id=self.state.id)
+                  for name in ["Zzyzx", "zzyzx Springs", "Zzz"]]
+        for city in cities:
+            storage.new(city)
+        storage.save()
+        response = self.client.get("/api/v1/autocomplete?type=city"
+                                   "&prefix=ZZY")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([city["id"] for city in response.json],
+                         [cities[0].id, cities[1].id])
+        response = self.client.get("/api/v1/autocomplete?type=city"
+                                   "&prefix=zz&limit=1")
+        self.assertEqual([city["id"] for city in response.json],
+                         [cities[0].id])
+        for query in ["type=place&prefix=z", "type=city", "prefix=z",
+                      "type=city&prefix=z&limit=x"]:
+            response = self.client.get("/api/v1/autocomplete?" + query)
+            self.assertEqual(response.status_code, 400)
+        for city in cities:
+            storage.delete(city)
+        storage.save()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,263 @@
+#!/usr/bin/python3
+"""
+Contains the TestCachedStorage class
+"""
+
+import models
+from models.engine import cache
+from models.engine.file_storage import FileStorage
+from models.state import State
+import os
+import pycodestyle as pep8
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+CachedStorage = cache.CachedStorage
+
+
+class CountingStorage:
+    """Storage engine holding states in a dictionary and counting the
+    reads reaching it"""
+
+    def __init__(self):
+        """Creates an empty storage"""
+        self.objects = {}
+        self.reads = 0
+
+    def get(self, cls, id, load=None):
+        """Returns the object of class cls and id"""
+        self.reads += 1
+        return self.objects.get(cls.__name__ + "." + id)
+
+    def all(self, cls=None, load=None):
+        """Returns every object"""
+        self.reads += 1
+        return dict(self.objects)
+
+    def count(self, cls=None):
+        """Returns the number of objects"""
+        self.reads += 1
+        return len(self.objects)
+
+    def new(self, obj):
+        """Adds obj"""
+        self.objects[type(obj).__name__ + "." + obj.id] = obj
+
+    def bulk_new(self, objs, batch_size=None, detach=True):
+        """Adds objs"""
+        for obj in objs:
+            self.new(obj)
+
+    def delete(self, obj=None):
+        """Deletes obj"""
+        self.objects.pop(type(obj).__name__ + "." + obj.id, None)
+
+    def save(self):
+        """Does nothing"""
+
+    def changed(self, obj, attr):
+        """Returns whether obj is the stored object of its key"""
+        key = type(obj).__name__ + "." + str(obj.__dict__.get("id"))
+        return self.objects.get(key) is obj
+
+
+class TestCacheDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the cache module"""
+
+    def test_pep8_conformance_cache(self):
+        """Test that models/engine/cache.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/cache.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_cache_module_docstring(self):
+        """Test for the cache.py module docstring"""
+        self.assertTrue(len(cache.__doc__) >= 1, "cache.py needs a docstring")
+
+
+class TestCacheOptions(unittest.TestCase):
+    """Test the cache_options function"""
+
+    def test_environment(self):
+        """Test the options read from the environment"""
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(cache.cache_options(),
+                             {"classes": [], "size": 10000, "ttl": 60.0})
+        env = {"HBNB_CACHE_CLASSES": "State, Amenity",
+               "HBNB_CACHE_SIZE": "50", "HBNB_CACHE_TTL": "2.5"}
+        with mock.patch.dict(os.environ, env, clear=True):
+            self.assertEqual(cache.cache_options(),
+                             {"classes": ["State", "Amenity"], "size": 50,
+                              "ttl": 2.5})
+
+
+class TestCachedStorage(unittest.TestCase):
+    """Test the read-through cache"""
+
+    def setUp(self):
+        """Wraps a storage holding two states"""
+        self.storage = CountingStorage()
+        self.states = [State(name="California"), State(name="Nevada")]
+        for state in self.states:
+            self.storage.new(state)
+        self.cached = CachedStorage(self.storage, ["State"])
+
+    def test_get(self):
+        """Test that repeated gets are served from the cache"""
+        id = self.states[0].id
+        self.assertIs(self.cached.get(State, id), self.states[0])
+        self.assertIs(self.cached.get("State", id), self.states[0])
+        self.assertIsNone(self.cached.get(State, "missing"))
+        self.assertIsNone(self.cached.get(State, "missing"))
+        self.assertEqual(self.storage.reads, 2)
+        metrics = self.cached.cache_metrics()
+        self.assertEqual((metrics["hits"], metrics["misses"]), (2, 2))
+        self.assertEqual(metrics["entries"], 2)
+
+    def test_collections(self):
+        """Test that all() and count() are cached until a state changes"""
+        self.assertEqual(len(self.cached.all(State)), 2)
+        self.assertEqual(self.cached.count(State), 2)
+        self.assertEqual(len(self.cached.all(State)), 2)
+        self.assertEqual(self.storage.reads, 2)
+        self.cached.new(State(name="Oregon"))
+        self.assertEqual(len(self.cached.all(State)), 3)
+        self.assertEqual(self.cached.count(State), 3)
+        self.cached.delete(self.states[0])
+        self.assertEqual(self.cached.count(State), 2)
+        self.cached.bulk_new([State(name="Utah"), State(name="Idaho")])
+        self.assertEqual(self.cached.count(State), 4)
+        self.assertEqual(self.storage.reads, 6)
+
+    def test_invalidation(self):
+        """Test that a change drops the entry of the object and the
+        collections of its class, not the entries of other objects"""
+        first, second = self.states
+        self.cached.get(State, first.id)
+        self.cached.get(State, second.id)
+        self.cached.all(State)
+        self.cached.new(first)
+        self.cached.save()
+        self.assertEqual(self.cached.cache_metrics()["invalidations"], 2)
+        self.cached.get(State, second.id)
+        self.assertEqual(self.storage.reads, 3)
+        self.cached.get(State, first.id)
+        self.cached.all(State)
+        self.assertEqual(self.storage.reads, 5)
+
+    def test_uncached_class(self):
+        """Test that the classes not cached reach the storage"""
+        self.cached.disable(State)
+        self.cached.get(State, self.states[0].id)
+        self.cached.get(State, self.states[0].id)
+        self.cached.all()
+        self.assertEqual(self.storage.reads, 3)
+        self.assertEqual(self.cached.cache_metrics()["misses"], 0)
+        self.cached.enable("State")
+        self.assertTrue(self.cached.cached(State))
+        self.assertIs(self.cached.objects, self.storage.objects)
+
+    def test_ttl(self):
+        """Test that entries expire after ttl seconds"""
+        cached = CachedStorage(self.storage, ["State"], ttl=0)
+        cached.get(State, self.states[0].id)
+        cached.get(State, self.states[0].id)
+        self.assertEqual(self.storage.reads, 2)
+        self.assertEqual(cached.cache_metrics()["expirations"], 1)
+
+    def test_size(self):
+        """Test that the least recently used entries are evicted"""
+        cached = CachedStorage(self.storage, ["State"], size=2)
+        first, second = self.states
+        cached.get(State, first.id)
+        cached.get(State, second.id)
+        cached.get(State, first.id)
+        cached.count(State)
+        metrics = cached.cache_metrics()
+        self.assertEqual((metrics["evictions"], metrics["objects"]), (1, 2))
+        cached.get(State, first.id)
+        self.assertEqual(self.storage.reads, 3)
+        cached.get(State, second.id)
+        self.assertEqual(self.storage.reads, 4)
+        cached.all(State)
+        self.assertEqual(cached.cache_metrics()["objects"], 2)
+        self.assertEqual(cached.cache_metrics()["entries"], 1)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_base_model_save(self):
+        """Test that BaseModel.save() on the wrapped storage drops the
+        entries of the object"""
+        cached = CachedStorage(models.storage, ["State"])
+        state = State(name="Utah")
+        with mock.patch.object(models, "storage", cached):
+            state.save()
+            self.assertIs(cached.get(State, state.id), state)
+            count = cached.count(State)
+            state.name = "Utah Territory"
+            state.save()
+            self.assertEqual(cached.count(State), count)
+            self.assertEqual(cached.cache_metrics()["hits"], 0)
+            state.delete()
+            cached.save()
+            self.assertIsNone(cached.get(State, state.id))
+            self.assertEqual(cached.count(State), count - 1)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_building_keeps_entries(self):
+        """Test that building a copy of a stored object drops no entry,
+        while changing the stored object does"""
+        first = self.states[0]
+        self.cached.get(State, first.id)
+        self.cached.all(State)
+        with mock.patch.object(models, "storage", self.cached):
+            copy = State(**first.to_dict())
+            copy.name = "Copy"
+            self.assertEqual(
+                self.cached.cache_metrics()["invalidations"], 0)
+            self.assertFalse(getattr(self.cached.local, "touched", None))
+            self.assertIs(self.cached.get(State, first.id), first)
+            self.cached.all(State)
+            self.assertEqual(self.storage.reads, 2)
+            first.name = "Renamed"
+        self.assertEqual(self.cached.cache_metrics()["invalidations"], 2)
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_lazy_objects(self):
+        """Test that objects built on first read after a reload drop no
+        entry, so a repeated read is served from the cache"""
+        saved = (FileStorage._FileStorage__file_path,
+                 FileStorage._FileStorage__objects)
+        directory = tempfile.mkdtemp()
+        FileStorage._FileStorage__file_path = os.path.join(directory,
+                                                           "file.json")
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__signature = None
+        try:
+            storage = FileStorage()
+            storage.bulk_new([State(name="California"), State(name="Utah")])
+            storage.save()
+            FileStorage._FileStorage__objects = {}
+            FileStorage._FileStorage__records = {}
+            FileStorage._FileStorage__signature = None
+            storage.reload()
+            cached = CachedStorage(storage, ["State"])
+            with mock.patch.object(models, "storage", cached):
+                self.assertEqual(len(cached.all(State)), 2)
+                self.assertEqual(len(cached.all(State)), 2)
+            metrics = cached.cache_metrics()
+            self.assertEqual((metrics["hits"], metrics["invalidations"]),
+                             (1, 0))
+        finally:
+            (FileStorage._FileStorage__file_path,
+             FileStorage._FileStorage__objects) = saved
+            FileStorage._FileStorage__records = {}
+            FileStorage._FileStorage__signature = None
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    unittest.main()
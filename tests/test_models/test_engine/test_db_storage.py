@@ -1,12 +1,16 @@
 #!/usr/bin/python3
 """
-Contains the TestDBStorageDocs and TestDBStorage classes
+Contains the TestDBStorageDocs, TestDBStorage and TestDBStorageLoad classes
 """
 
+from contextlib import contextmanager
 from datetime import datetime
+import importlib
 import inspect
 import models
 from models.engine import db_storage
+from models.engine.cache import CachedStorage
+from models.engine.pool import MeteredPool
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
@@ -14,6 +18,7 @@ from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
+from sqlalchemy import event
 import unittest
 import pep8
 
@@ -115,6 +120,66 @@ class TestDBStorage(unittest.TestCase):
         """Test that get returns None when an object is not found"""
         self.assertIsNone(models.storage.get(State, "nonexistent_id"))
 
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_get_many(self):
+        """Test that get_many fetches the objects found among the ids"""
+        states = [State(name="Many {}".format(i)) for i in range(3)]
+        for state in states:
+            models.storage.new(state)
+        models.storage.save()
+        ids = [states[0].id, "missing", states[2].id]
+        found = models.storage.get_many(State, ids)
+        self.assertEqual(set(found), {states[0].id, states[2].id})
+        self.assertEqual(found[states[0].id].name, "Many 0")
+        self.assertEqual(models.storage.get_many("City", ids), {})
+        for state in states:
+            models.storage.delete(state)
+        models.storage.save()
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_bulk_new(self):
+        """Test that bulk_new inserts objects and their amenity links in
+        batches, leaving them to be updated by new()"""
+        state = State(name="Bulk")
+        city = City(name="Bulk", state_id=state.id)
+        user = User(email="bulk@hbnb", password="pwd")
+        amenity = Amenity(name="Bulk")
+        places = [Place(name="Bulk {}".format(i), city_id=city.id,
+                        user_id=user.id) for i in range(3)]
+        places[0].amenities.append(amenity)
+        statements = []
+
+        def count(conn, cursor, statement, params, context, executemany):
+            """Counts the statements inserting places"""
+            if statement.startswith("INSERT INTO places"):
+                statements.append(len(params) if executemany else 1)
+        engine = models.storage._DBStorage__engine
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            models.storage.bulk_new(places + [amenity, user, city, state],
+                                    batch_size=2)
+            models.storage.save()
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        self.assertEqual(statements, [2, 1])
+        models.storage.close()
+        place = models.storage.get(Place, places[0].id)
+        self.assertEqual(place.number_rooms, 0)
+        self.assertEqual([a.id for a in place.amenities], [amenity.id])
+        models.storage.close()
+        places[1].name = "Renamed"
+        models.storage.new(places[1])
+        models.storage.save()
+        models.storage.close()
+        self.assertEqual(models.storage.get(Place, places[1].id).name,
+                         "Renamed")
+        for place in places:
+            models.storage.delete(models.storage.get(Place, place.id))
+        models.storage.save()
+        for obj in (amenity, user, city, state):
+            models.storage.delete(models.storage.get(type(obj), obj.id))
+        models.storage.save()
+
     @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
     def test_count(self):
         """Test that count returns the correct count of objects in storage"""
@@ -139,6 +204,143 @@ class TestDBStorage(unittest.TestCase):
         models.storage.save()
         self.assertEqual(models.storage.count(State), initial_state_count)
 
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_counts(self):
+        """Test that counts matches count for every class"""
+        counts = models.storage.counts()
+        self.assertEqual(set(counts), set(classes))
+        for name, cls in classes.items():
+            self.assertEqual(counts[name], models.storage.count(cls))
+        self.assertEqual(sum(counts.values()), models.storage.count())
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_pool_metrics(self):
+        """Test that the connection pool reports its checkouts, and that
+        a pool not counting them, as with HBNB_DB_URL=sqlite://, reports
+        the same metrics"""
+        models.storage.count(State)
+        metrics = models.storage.pool_metrics()
+        self.assertEqual(sorted(metrics), sorted(
+            ["checkouts", "overflows", "timeouts", "wait_seconds",
+             "max_wait_seconds", "size", "checked_out", "overflow"]))
+        self.assertGreaterEqual(metrics["checked_out"], 0)
+        pool = models.storage._DBStorage__engine.pool
+        if isinstance(pool, MeteredPool):
+            self.assertGreaterEqual(metrics["checkouts"], 1)
+
+
+@contextmanager
+def count_queries():
+    """Yields a list that collects the SQL statements run in the block"""
+    engine = models.storage._DBStorage__engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        """Collects one statement"""
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+class TestDBStorageLoad(unittest.TestCase):
+    """Test the number of queries run with eager relationship loading"""
+
+    def setUp(self):
+        """Stores states with cities in a fresh session"""
+        if models.storage_t != 'db':
+            self.skipTest("not testing db storage")
+        self.states = []
+        for i in range(3):
+            state = State(name="State {}".format(i))
+            models.storage.new(state)
+            for j in range(2):
+                models.storage.new(City(name="City {}".format(j),
+                                        state_id=state.id))
+            self.states.append(state)
+        models.storage.save()
+        models.storage.close()
+
+    def tearDown(self):
+        """Removes the states and cities"""
+        if models.storage_t != 'db':
+            return
+        for state in models.storage.all(State, load=["cities"]).values():
+            if state.id in [s.id for s in self.states]:
+                for city in state.cities:
+                    models.storage.delete(city)
+                models.storage.delete(state)
+        models.storage.save()
+        models.storage.close()
+
+    def test_all_lazy(self):
+        """Test that cities are fetched once per state without load"""
+        with count_queries() as statements:
+            states = models.storage.all(State)
+            for state in states.values():
+                state.cities
+        self.assertEqual(len(statements), 1 + len(states))
+
+    def test_all_load(self):
+        """Test that load fetches every state's cities in one query"""
+        with count_queries() as statements:
+            states = models.storage.all(State, load=["cities"])
+            for state in states.values():
+                state.cities
+        self.assertEqual(len(statements), 2)
+        self.assertEqual(len(states["State." + self.states[0].id].cities), 2)
+
+    def test_load_strategies(self):
+        """Test nested paths and joined loading"""
+        with count_queries() as statements:
+            state = models.storage.get(State, self.states[0].id,
+                                       load={"cities": "joined"})
+            self.assertEqual(len(state.cities), 2)
+        self.assertEqual(len(statements), 1)
+        models.storage.close()
+        with count_queries() as statements:
+            states = models.storage.all(State, load=["cities.places",
+                                                     "missing"])
+            for state in states.values():
+                for city in state.cities:
+                    city.places
+        self.assertEqual(len(statements), 3)
+
+    def test_web_flask_pages(self):
+        """Test the queries each web_flask page renders with"""
+        pages = [("8-cities_by_states", "/cities_by_states", 2),
+                 ("10-hbnb_filters", "/hbnb_filters", 3)]
+        for module, url, queries in pages:
+            app = importlib.import_module("web_flask." + module).app
+            with count_queries() as statements:
+                response = app.test_client().get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b"State 2", response.data)
+            self.assertEqual(len(statements), queries, module)
+
+    def test_cached_get(self):
+        """Test that a state cached in one session is attached to the next
+        without a query and lazily loads its cities there"""
+        cached = CachedStorage(models.storage, ["State"])
+        id = self.states[0].id
+        cached.get(State, id)
+        models.storage.close()
+        with count_queries() as statements:
+            state = cached.get(State, id)
+            self.assertIs(cached.get(State, id), state)
+        self.assertEqual(len(statements), 0)
+        self.assertEqual(state.name, "State 0")
+        with count_queries() as statements:
+            self.assertEqual(len(state.cities), 2)
+        self.assertEqual(len(statements), 1)
+        state.name = "Renamed"
+        cached.new(state)
+        cached.save()
+        models.storage.close()
+        self.assertEqual(cached.get(State, id).name, "Renamed")
+
 
 if __name__ == "__main__":
     unittest.main()
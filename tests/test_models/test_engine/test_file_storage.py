@@ -17,6 +17,10 @@ from models.user import User
 import json
 import os
 import pep8
+import subprocess
+import sys
+import tempfile
+import threading
 import unittest
 
 
@@ -73,7 +77,8 @@ class TestFileStorageDocs(unittest.TestCase):
 class TestFileStorage(unittest.TestCase):
     """Test the FileStorage class"""
 
-    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
     def test_all_returns_dict(self):
         """Test that all returns the FileStorage.__objects attr"""
         storage = FileStorage()
@@ -81,7 +86,8 @@ class TestFileStorage(unittest.TestCase):
         self.assertEqual(type(new_dict), dict)
         self.assertIs(new_dict, storage._FileStorage__objects)
 
-    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
     def test_new(self):
         """Test that new adds an object to the FileStorage.__objects attr"""
         storage = FileStorage()
@@ -97,7 +103,8 @@ class TestFileStorage(unittest.TestCase):
                 self.assertEqual(test_dict, storage._FileStorage__objects)
         FileStorage._FileStorage__objects = save
 
-    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
     def test_save(self):
         """Test that save properly saves objects to file.json"""
         storage = FileStorage()
@@ -117,7 +124,8 @@ class TestFileStorage(unittest.TestCase):
             js = f.read()
         self.assertEqual(json.loads(string), json.loads(js))
 
-    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
     def test_get(self):
         """Test that get retrieves the correct object by class and ID"""
         storage = FileStorage()
@@ -129,13 +137,88 @@ class TestFileStorage(unittest.TestCase):
         storage.delete(state)
         storage.save()
 
-    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_get_class_name(self):
+        """Test that get accepts a class name as well as a class"""
+        storage = FileStorage()
+        state = State(name="Named State")
+        storage.new(state)
+        self.assertIs(storage.get("State", state.id), state)
+        self.assertIsNone(storage.get(City, state.id))
+        storage.delete(state)
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_get_many(self):
+        """Test that get_many returns the objects found among the ids"""
+        storage = FileStorage()
+        states = [State(name="Many {}".format(i)) for i in range(3)]
+        for state in states:
+            storage.new(state)
+        found = storage.get_many(State, [states[0].id, "missing",
+                                         states[2].id])
+        self.assertEqual(found, {states[0].id: states[0],
+                                 states[2].id: states[2]})
+        self.assertEqual(storage.get_many("City", [states[0].id]), {})
+        for state in states:
+            storage.delete(state)
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_bulk_new(self):
+        """Test that bulk_new adds every object as new does"""
+        storage = FileStorage()
+        states = [State(name="Bulk {}".format(i)) for i in range(3)]
+        storage.bulk_new(states, batch_size=2)
+        found = storage.get_many(State, [state.id for state in states])
+        self.assertEqual(found, {state.id: state for state in states})
+        self.assertEqual(storage.lookup(State, "name", "Bulk 1"),
+                         {"State." + states[1].id: states[1]})
+        for state in states:
+            storage.delete(state)
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_all_by_class(self):
+        """Test that all filters by class or class name"""
+        storage = FileStorage()
+        state = State(name="Bucket State")
+        city = City(name="Bucket City")
+        storage.new(state)
+        storage.new(city)
+        key = "State." + state.id
+        self.assertIn(key, storage.all(State))
+        self.assertIn(key, storage.all("State"))
+        self.assertNotIn(key, storage.all(City))
+        for obj in storage.all(State).values():
+            self.assertIs(type(obj), State)
+        self.assertEqual(storage.count("State"), storage.count(State))
+        storage.delete(state)
+        storage.delete(city)
+        self.assertNotIn(key, storage.all(State))
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_all_by_class_direct_change(self):
+        """Test that all(cls) sees objects added to __objects directly"""
+        storage = FileStorage()
+        state = State(name="Direct State")
+        key = "State." + state.id
+        storage.all()[key] = state
+        self.assertIs(storage.all(State)[key], state)
+        del storage.all()[key]
+        self.assertNotIn(key, storage.all(State))
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
     def test_get_nonexistent(self):
         """Test that get returns None for non-existent ID"""
         storage = FileStorage()
         self.assertIsNone(storage.get(State, "nonexistent_id"))
 
-    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
     def test_count(self):
         """Test that count returns the correct number of objects in storage"""
         storage = FileStorage()
@@ -148,7 +231,8 @@ class TestFileStorage(unittest.TestCase):
         storage.save()
         self.assertEqual(storage.count(), initial_count)
 
-    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
     def test_count_specific_class(self):
         """Test that count returns the correct number for a specific class"""
         storage = FileStorage()
@@ -161,6 +245,590 @@ class TestFileStorage(unittest.TestCase):
         storage.save()
         self.assertEqual(storage.count(State), initial_count)
 
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_counts(self):
+        """Test that counts matches count for every class"""
+        storage = FileStorage()
+        state = State(name="Counts State")
+        storage.new(state)
+        counts = storage.counts()
+        self.assertEqual(set(counts), set(classes))
+        for name, cls in classes.items():
+            self.assertEqual(counts[name], storage.count(cls))
+        storage.delete(state)
+        self.assertEqual(storage.counts()["State"], counts["State"] - 1)
+
+
+class TempFileStorageTest(unittest.TestCase):
+    """Base class of the tests running FileStorage on a temporary file"""
+
+    def setUp(self):
+        """Points FileStorage at an empty temporary file"""
+        self.saved = (FileStorage._FileStorage__file_path,
+                      FileStorage._FileStorage__objects)
+        fd, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        FileStorage._FileStorage__file_path = self.path
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__signature = None
+        self.storage = FileStorage()
+
+    def tearDown(self):
+        """Restores the original FileStorage file and objects"""
+        (FileStorage._FileStorage__file_path,
+         FileStorage._FileStorage__objects) = self.saved
+        FileStorage._FileStorage__records = {}
+        FileStorage._FileStorage__signature = None
+        os.remove(self.path)
+        for suffix in (".lock", ".fts"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+
+class TestFileStorageReload(TempFileStorageTest):
+    """Test the change-detecting reload of the FileStorage class"""
+
+    def rewrite(self, update):
+        """Rewrites the JSON file as another process would"""
+        with open(self.path, "r") as f:
+            jo = json.load(f)
+        update(jo)
+        with open(self.path, "w") as f:
+            json.dump(jo, f)
+        os.utime(self.path, ns=(0, os.stat(self.path).st_mtime_ns + 1))
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_reload_unchanged_file(self):
+        """Test that reload keeps the objects when the file is unchanged"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        state.name = "Not saved"
+        self.storage.reload()
+        self.assertIs(self.storage.get(State, state.id), state)
+        self.assertEqual(state.name, "Not saved")
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_reload_changed_record(self):
+        """Test that reload only rebuilds the records that changed"""
+        state = State(name="California")
+        city = City(name="San Francisco", state_id=state.id)
+        self.storage.new(state)
+        self.storage.new(city)
+        self.storage.save()
+        key = "State." + state.id
+
+        def rename(jo):
+            jo[key]["name"] = "Nevada"
+        self.rewrite(rename)
+        self.storage.reload()
+        self.assertIsNot(self.storage.get(State, state.id), state)
+        self.assertEqual(self.storage.get(State, state.id).name, "Nevada")
+        self.assertIs(self.storage.get(City, city.id), city)
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_reload_removed_record(self):
+        """Test that reload drops records removed by another writer"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+
+        def remove(jo):
+            del jo["State." + state.id]
+        self.rewrite(remove)
+        self.storage.reload()
+        self.assertIsNone(self.storage.get(State, state.id))
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_reload_fulltext_cache(self):
+        """Test that the texts cached by save are not tokenized again"""
+        review = Review(text="Sunny terrace", place_id="p")
+        self.storage.new(review)
+        self.storage.save()
+        self.assertTrue(os.path.exists(self.path + ".fts"))
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__records = {}
+        FileStorage._FileStorage__signature = None
+        self.storage.reload()
+        index = FileStorage._FileStorage__indexes["Review"]["text"]
+        self.assertEqual(index.stale, 0)
+        found = self.storage.search("sunny")
+        self.assertEqual([obj.id for obj, score in found], [review.id])
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_reload_lazy(self):
+        """Test that reloaded records are only built when first returned"""
+        state = State(name="California")
+        cities = [City(name="City {}".format(i), state_id=state.id)
+                  for i in range(3)]
+        self.storage.bulk_new([state] + cities)
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__records = {}
+        FileStorage._FileStorage__signature = None
+        self.storage.reload()
+        objects = FileStorage._FileStorage__objects
+        Record = file_storage.Record
+        self.assertEqual(self.storage.count(City), 3)
+        self.assertEqual(set(map(type, objects.values())), {Record})
+        city = self.storage.get(City, cities[0].id)
+        self.assertIs(type(city), City)
+        self.assertEqual(city.to_dict(), cities[0].to_dict())
+        self.assertIs(self.storage.get(City, cities[0].id), city)
+        self.assertIs(type(objects["City." + cities[1].id]), Record)
+        self.assertEqual(len(self.storage.lookup(City, "state_id",
+                                                 state.id)), 3)
+        self.storage.save()
+        self.assertIs(type(objects["State." + state.id]), Record)
+        self.assertIs(self.storage.all(), objects)
+        self.assertNotIn(Record, set(map(type, objects.values())))
+        self.assertEqual(self.storage.get(State, state.id).name, "California")
+
+
+class TestFileStorageConcurrency(TempFileStorageTest):
+    """Test FileStorage shared by several threads and processes"""
+
+    def load(self):
+        """Returns the content of the JSON file"""
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_reload_keeps_unsaved(self):
+        """Test that reload does not revert changes not saved yet"""
+        state = State(name="California")
+        other = State(name="Nevada")
+        self.storage.new(state)
+        self.storage.new(other)
+        self.storage.save()
+        state.name = "Not saved"
+        data = self.load()
+        data["State." + state.id]["name"] = "Oregon"
+        data["State." + other.id]["name"] = "Utah"
+        with open(self.path, "w") as f:
+            json.dump(data, f)
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, state.id).name, "Not saved")
+        self.assertEqual(self.storage.get(State, other.id).name, "Utah")
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_save_keeps_other_process(self):
+        """Test that save keeps the objects saved by another process"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        code = ("from models.engine.file_storage import FileStorage\n"
+                "from models.state import State\n"
+                "FileStorage._FileStorage__file_path = {!r}\n"
+                "storage = FileStorage()\n"
+                "storage.reload()\n"
+                "storage.new(State(id='other', name='Other'))\n"
+                "storage.save()\n").format(self.path)
+        subprocess.run([sys.executable, "-c", code], check=True)
+        city = City(name="San Francisco", state_id=state.id)
+        self.storage.new(city)
+        self.storage.save()
+        self.assertEqual(set(self.load()), {"State." + state.id,
+                                            "City." + city.id,
+                                            "State.other"})
+        self.assertEqual(self.storage.get(State, "other").name, "Other")
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_save_keeps_other_process_changes(self):
+        """Test that the first save after a load keeps the updates and
+        deletions another process saved meanwhile"""
+        state = State(name="orig")
+        doomed = State(name="Doomed")
+        self.storage.bulk_new([state, doomed])
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__records = {}
+        FileStorage._FileStorage__signature = None
+        self.storage.reload()
+        code = ("from models.engine.file_storage import FileStorage\n"
+                "from models.state import State\n"
+                "FileStorage._FileStorage__file_path = {!r}\n"
+                "storage = FileStorage()\n"
+                "storage.reload()\n"
+                "storage.get(State, {!r}).name = 'renamed'\n"
+                "storage.delete(storage.get(State, {!r}))\n"
+                "storage.save()\n").format(self.path, state.id, doomed.id)
+        subprocess.run([sys.executable, "-c", code], check=True)
+        city = City(name="San Francisco", state_id=state.id)
+        self.storage.new(city)
+        self.storage.save()
+        data = self.load()
+        self.assertEqual(set(data), {"State." + state.id, "City." + city.id})
+        self.assertEqual(data["State." + state.id]["name"], "renamed")
+        self.assertEqual(self.storage.get(State, state.id).name, "renamed")
+        self.assertIsNone(self.storage.get(State, doomed.id))
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_processes(self):
+        """Test that processes saving to the same file lose no object"""
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        code = ("import sys\n"
+                "from models.engine.file_storage import FileStorage\n"
+                "from models.state import State\n"
+                "FileStorage._FileStorage__file_path = {!r}\n"
+                "storage = FileStorage()\n"
+                "storage.reload()\n"
+                "for i in range(30):\n"
+                "    storage.new(State(id='{{}}-{{}}'.format(sys.argv[1], i),"
+                " name='State'))\n"
+                "    storage.save()\n").format(self.path)
+        # started in an empty directory, so that importing models loads
+        # no other file.json
+        directory = tempfile.mkdtemp()
+        env = dict(os.environ, PYTHONPATH=os.getcwd())
+        writers = [subprocess.Popen([sys.executable, "-c", code, str(n)],
+                                    cwd=directory, env=env)
+                   for n in range(3)]
+        for writer in writers:
+            self.assertEqual(writer.wait(), 0)
+        os.rmdir(directory)
+        self.assertEqual(set(self.load()),
+                         {"State.{}-{}".format(n, i)
+                          for n in range(3) for i in range(30)} |
+                         {"State." + state.id})
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_threads(self):
+        """Test that threads saving and reloading lose no update"""
+        errors = []
+
+        def write(n):
+            try:
+                for i in range(20):
+                    self.storage.new(State(name="{} {}".format(n, i)))
+                    self.storage.save()
+                    self.storage.reload()
+                    self.storage.count(State)
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=write, args=(n,))
+                   for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.load()), 80)
+        self.assertEqual(self.storage.count(State), 80)
+
+
+class TestFileStorageDirty(TempFileStorageTest):
+    """Test that FileStorage only serializes objects that changed"""
+
+    def load(self):
+        """Returns the content of the JSON file"""
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_save_changed_only(self):
+        """Test that save serializes only new and modified objects"""
+        states = [State(name=str(i)) for i in range(3)]
+        for state in states:
+            self.storage.new(state)
+        self.storage.save()
+        self.storage.save()
+        self.assertEqual(self.storage.metrics()["last_serialized"], 0)
+        states[1].name = "Changed"
+        self.storage.save()
+        self.assertEqual(self.storage.metrics()["last_serialized"], 1)
+        self.assertEqual(self.load()["State." + states[1].id]["name"],
+                         "Changed")
+        self.assertEqual(len(self.load()), 3)
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_save_deleted(self):
+        """Test that deleted objects leave the file"""
+        state = State(name="Deleted")
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.delete(state)
+        self.storage.save()
+        self.assertEqual(self.load(), {})
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_save_replaced_objects(self):
+        """Test that a swapped __objects is serialized in full"""
+        state = State(name="Swapped")
+        self.storage.new(state)
+        self.storage.save()
+        other = State(name="Other")
+        FileStorage._FileStorage__objects = {"State." + other.id: other}
+        self.storage.save()
+        self.assertEqual(list(self.load()), ["State." + other.id])
+        metrics = self.storage.metrics()
+        self.assertEqual(metrics["last_serialized"], 1)
+        self.assertGreater(metrics["last_bytes"], 0)
+
+
+class TestFileStorageForeignKeys(unittest.TestCase):
+    """Test the foreign key indexes of the FileStorage class"""
+
+    def setUp(self):
+        """Creates a state with a city, and a place with a review"""
+        self.storage = FileStorage()
+        self.state = State(name="California")
+        self.city = City(name="San Francisco", state_id=self.state.id)
+        self.place = Place(name="Loft", city_id=self.city.id)
+        self.review = Review(text="Great", place_id=self.place.id)
+        self.objs = [self.state, self.city, self.place, self.review]
+        for obj in self.objs:
+            self.storage.new(obj)
+
+    def tearDown(self):
+        """Removes the objects created by setUp"""
+        for obj in self.objs:
+            self.storage.delete(obj)
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_lookup(self):
+        """Test that lookup returns the objects holding a foreign key"""
+        key = "City." + self.city.id
+        self.assertEqual(self.storage.lookup(City, "state_id", self.state.id),
+                         {key: self.city})
+        self.assertEqual(self.storage.lookup("City", "name", "San Francisco"),
+                         {key: self.city})
+        self.assertEqual(self.storage.lookup(City, "state_id", "other"), {})
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_relationship_properties(self):
+        """Test the relationship properties of State, City and Place"""
+        self.assertEqual(self.state.cities, [self.city])
+        self.assertEqual(self.city.places, [self.place])
+        self.assertEqual(self.place.reviews, [self.review])
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_attribute_update(self):
+        """Test that setting a foreign key moves the object in the index"""
+        other = State(name="Nevada")
+        self.storage.new(other)
+        self.objs.append(other)
+        self.city.state_id = other.id
+        self.assertEqual(self.state.cities, [])
+        self.assertEqual(other.cities, [self.city])
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_delete(self):
+        """Test that deleted objects leave the index"""
+        self.storage.delete(self.review)
+        self.assertEqual(self.place.reviews, [])
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_page(self):
+        """Test that page orders by id and resumes after a given id"""
+        cities = [City(name=str(i), state_id=self.state.id) for i in range(4)]
+        for city in cities:
+            self.storage.new(city)
+        self.objs.extend(cities)
+        cities.append(self.city)
+        cities.sort(key=lambda city: city.id)
+        first = self.storage.page(City, 2, state_id=self.state.id)
+        self.assertEqual(first, cities[:2])
+        rest = self.storage.page(City, None, first[-1].id,
+                                 state_id=self.state.id)
+        self.assertEqual(rest, cities[2:])
+        everything = self.storage.page(City)
+        self.assertEqual([city.id for city in everything],
+                         sorted(city.id for city in everything))
+        after = self.storage.page(City, 1, cities[0].id)
+        self.assertGreater(after[0].id, cities[0].id)
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_amenities(self):
+        """Test that Place.amenities follows amenity_ids"""
+        amenity = Amenity(name="Wifi")
+        self.storage.new(amenity)
+        self.objs.append(amenity)
+        self.place.amenity_ids = [amenity.id, "missing"]
+        self.assertEqual(self.place.amenities, [amenity])
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_places_search(self):
+        """Test that places_search intersects states, cities and amenities"""
+        wifi = Amenity(name="Wifi")
+        pool = Amenity(name="Pool")
+        other = City(name="Oakland", state_id=self.state.id)
+        places = [Place(name="Flat", city_id=other.id,
+                        amenity_ids=[wifi.id]),
+                  Place(name="Villa", city_id=self.city.id,
+                        amenity_ids=[wifi.id, pool.id])]
+        for obj in [wifi, pool, other] + places:
+            self.storage.new(obj)
+        self.objs.extend([wifi, pool, other] + places)
+        search = self.storage.places_search
+        located = sorted(places + [self.place], key=lambda p: p.id)
+        self.assertEqual(search(states=[self.state.id]), located)
+        self.assertEqual(search(states=[self.state.id], cities=[other.id]),
+                         located)
+        self.assertEqual(search(cities=[self.city.id], amenities=[wifi.id]),
+                         [places[1]])
+        self.assertEqual(search(amenities=[wifi.id, pool.id]), [places[1]])
+        self.assertEqual(search(amenities=[wifi.id, "missing"]), [])
+        self.assertEqual(search(states=["missing"]), [])
+        self.assertEqual(search(states=[self.state.id], limit=1,
+                                after=located[0].id), located[1:2])
+        places[0].amenity_ids = [pool.id]
+        self.assertEqual(search(amenities=[pool.id]),
+                         sorted(places, key=lambda p: p.id))
+        self.assertEqual(search(), self.storage.page(Place))
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_places_near(self):
+        """Test the radius and box searches through the grid index"""
+        near = Place(name="Near", latitude=37.78, longitude=-122.41)
+        far = Place(name="Far", latitude=34.05, longitude=-118.24)
+        nowhere = Place(name="Nowhere")
+        self.storage.bulk_new([near, far, nowhere])
+        self.objs.extend([near, far, nowhere])
+        self.assertEqual(self.storage.places_near(0, 0, 50), [])
+        self.assertEqual(self.storage.places_in_box(-1, -1, 1, 1), [])
+        found = self.storage.places_near(37.77, -122.42, 10)
+        self.assertEqual([place for place, distance in found], [near])
+        self.assertLess(found[0][1], 2)
+        found = self.storage.places_near(37.77, -122.42, 600)
+        self.assertEqual([place for place, distance in found], [near, far])
+        self.assertEqual(len(self.storage.places_near(37.77, -122.42, 600,
+                                                      limit=1)), 1)
+        far.latitude, far.longitude = 37.76, -122.43
+        found = self.storage.places_near(37.77, -122.42, 10)
+        self.assertEqual({place for place, distance in found}, {near, far})
+        self.storage.delete(near)
+        found = self.storage.places_in_box(37, -123, 38, -122)
+        self.assertEqual([place for place, distance in found], [far])
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_page_ranges(self):
+        """Test that page filters on ranges and sorts on an attribute"""
+        other = City(name="Oakland", state_id=self.state.id)
+        self.storage.new(other)
+        self.objs.append(other)
+        self.place.price_by_night = 10005
+        places = [self.place]
+        for i in range(8):
+            place = Place(name=str(i), price_by_night=10000 + 10 * (i % 4),
+                          max_guest=i, city_id=[self.city, other][i % 2].id)
+            self.storage.new(place)
+            places.append(place)
+        self.objs.extend(places[1:])
+
+        def ordered(objs, reverse=False):
+            """Returns objs by (price, id)"""
+            return sorted(objs, key=lambda p: (p.price_by_night, p.id),
+                          reverse=reverse)
+        cheap = [p for p in places if 10010 <= p.price_by_night <= 10020]
+        ranges = {"price_by_night": (10010, 10020)}
+        page = self.storage.page(Place, 2, None, ranges, "price_by_night")
+        self.assertEqual(page, ordered(cheap)[:2])
+        rest = self.storage.page(Place, None, (page[-1].price_by_night,
+                                               page[-1].id),
+                                 ranges, "price_by_night")
+        self.assertEqual(page + rest, ordered(cheap))
+        in_city = [p for p in places if p.city_id == self.city.id]
+        self.assertEqual(self.storage.page(Place, None, None, None,
+                                           "-price_by_night",
+                                           city_id=self.city.id),
+                         ordered(in_city, reverse=True))
+        guests = [p for p in in_city if p.max_guest >= 4]
+        self.assertEqual(self.storage.page(Place, None, None,
+                                           {"max_guest": (4, None)},
+                                           city_id=self.city.id),
+                         sorted(guests, key=lambda p: p.id))
+        places[1].price_by_night = 10 ** 9
+        self.assertEqual(self.storage.page(Place, 1, None, None,
+                                           "-price_by_night"), [places[1]])
+        self.assertEqual(self.storage.places_search(
+            states=[self.state.id], ranges={"price_by_night": (10001, 10005)}),
+            [self.place])
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_version(self):
+        """Test that the version of a class follows its changes only"""
+        tag, modified = self.storage.version(City)
+        other = self.storage.version("State")
+        self.city.name = "Oakland"
+        self.assertNotEqual(self.storage.version(City)[0], tag)
+        self.assertGreaterEqual(self.storage.version(City)[1], modified)
+        self.assertEqual(self.storage.version(State), other)
+        tag = self.storage.version(City)[0]
+        self.assertEqual(self.storage.version(City)[0], tag)
+        self.storage.delete(self.city)
+        self.assertNotEqual(self.storage.version(City)[0], tag)
+        tag = self.storage.version(City)[0]
+        self.storage.new(self.city)
+        self.assertNotEqual(self.storage.version(City)[0], tag)
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_autocomplete(self):
+        """Test that autocomplete follows new, renamed and deleted names"""
+        other = City(name="san Mateo", state_id=self.state.id)
+        self.storage.new(other)
+        self.objs.append(other)
+        self.assertEqual(self.storage.autocomplete(City, "San "),
+                         [self.city, other])
+        self.assertEqual(self.storage.autocomplete("City", "san", 1),
+                         [self.city])
+        self.city.name = "Oakland"
+        self.assertEqual(self.storage.autocomplete(City, "san"), [other])
+        self.storage.delete(other)
+        self.assertEqual(self.storage.autocomplete(City, "san"), [])
+        self.assertEqual(self.storage.lookup(City, "name", "oakland"), {})
+        self.assertEqual(self.storage.autocomplete(Review, "gre",
+                                                   attr="text"),
+                         [self.review])
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_search(self):
+        """Test that search follows new, changed and deleted texts"""
+        self.place.description = "Zygomorphic loft with zygote views"
+        self.review.text = "Zygomorphic indeed"
+
+        def search(query, cls=None):
+            """Returns the objects found for query"""
+            return [obj for obj, score in
+                    self.storage.search(query, cls)]
+        self.assertEqual(set(search("zygomorphic")), {self.review,
+                                                      self.place})
+        self.assertEqual(search("zygomorphic", Place), [self.place])
+        self.assertEqual(search("zygo*", "Review"), [self.review])
+        self.assertEqual(search("zygote"), [self.place])
+        self.storage.delete(self.review)
+        self.assertEqual(search("zygomorphic"), [self.place])
+        self.review.text = "Not stored"
+        self.assertEqual(search("stored"), [])
+
 
 if __name__ == "__main__":
     unittest.main()
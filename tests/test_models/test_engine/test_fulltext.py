@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+"""
+Contains the TestFullTextIndex class
+"""
+
+from models.engine import fulltext
+import os
+import pycodestyle as pep8
+import random
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+FullTextIndex = fulltext.FullTextIndex
+
+
+class TestFullTextDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the fulltext module"""
+
+    def test_pep8_conformance_fulltext(self):
+        """Test that models/engine/fulltext.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/fulltext.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_fulltext_module_docstring(self):
+        """Test for the fulltext.py module docstring"""
+        self.assertTrue(len(fulltext.__doc__) >= 1,
+                        "fulltext.py needs a docstring")
+
+
+class TestFullTextIndex(unittest.TestCase):
+    """Test the FullTextIndex class"""
+
+    def setUp(self):
+        """Indexes three reviews"""
+        self.index = FullTextIndex("Review", "text")
+        self.texts = {"Review.1": "Quiet loft, fast Wi-Fi",
+                      "Review.2": "Loud street. Loud bar! Loud neighbours",
+                      "Review.3": "A loft near a loud street"}
+        for key, text in self.texts.items():
+            self.index.add(key, SimpleNamespace(text=text))
+
+    def keys(self, query):
+        """Returns the keys found for query, best first"""
+        return [key for key, score in self.index.search(query)]
+
+    def test_tokenize(self):
+        """Test that words are lowercased and split on punctuation"""
+        self.assertEqual(fulltext.tokenize("Fast Wi-Fi, it_s Café 2"),
+                         ["fast", "wi", "fi", "it", "s", "café", "2"])
+        self.assertEqual(fulltext.parse_query("Loft lou* loft"),
+                         [("loft", False), ("lou", True)])
+        self.index.add("Review.4", SimpleNamespace(text="echo " * 300))
+        self.assertEqual(self.keys("echo"), ["Review.4"])
+
+    def test_ranking(self):
+        """Test that BM25 ranks frequent words in short texts first"""
+        self.assertEqual(self.keys("loud"), ["Review.2", "Review.3"])
+        self.assertEqual(self.keys("quiet loft"), ["Review.1", "Review.3"])
+        self.assertEqual(self.keys("garden"), [])
+        self.assertEqual(len(self.index.search("loud loft", 1)), 1)
+        scores = dict(self.index.search("loud street"))
+        self.assertGreater(scores["Review.2"], scores["Review.3"])
+
+    def test_limit(self):
+        """Test that the top results do not depend on the limit"""
+        rand = random.Random(0)
+        words = ["w{}".format(i) for i in range(40)]
+        for i in range(300):
+            text = " ".join(rand.choice(words[:rand.randrange(1, 40)])
+                            for _ in range(rand.randrange(1, 12)))
+            self.index.add("Review.x{}".format(i), SimpleNamespace(text=text))
+        for query in ["w0 w39", "w1 w2 w30", "w3* w0", "loud w38"]:
+            everything = self.index.search(query)
+            for limit in [1, 5, 20]:
+                self.assertEqual(self.index.search(query, limit),
+                                 everything[:limit])
+
+    def test_no_words(self):
+        """Test searching documents none of which holds a word"""
+        index = FullTextIndex("Review", "text")
+        index.add("Review.1", SimpleNamespace(text="!!! ..."))
+        self.assertEqual(index.search("x"), [])
+        self.assertEqual(index.search("x*"), [])
+
+    def test_prefix(self):
+        """Test that a word ending in * matches the words it starts"""
+        self.assertEqual(set(self.keys("lo*")),
+                         {"Review.1", "Review.2", "Review.3"})
+        self.assertEqual(self.keys("neigh*"), ["Review.2"])
+        self.assertEqual(self.keys("neigh"), [])
+        self.index.add("Review.4", SimpleNamespace(text="Neighbourly host"))
+        self.assertEqual(set(self.keys("neigh*")), {"Review.2", "Review.4"})
+
+    def test_remove(self):
+        """Test that a removed text is no longer found"""
+        self.index.remove("Review.2")
+        self.assertEqual(self.keys("loud"), ["Review.3"])
+        self.assertNotIn("neighbours", self.index.postings)
+        self.index.remove("Review.2")
+        self.index.add("Review.2", SimpleNamespace(text="Lovely garden"))
+        self.assertEqual(self.keys("garden"), ["Review.2"])
+        self.assertEqual(self.index.total, 5 + 6 + 2)
+
+    def test_compact(self):
+        """Test that the postings of removed texts are dropped"""
+        for i in range(600):
+            self.index.add("Review.x{}".format(i),
+                           SimpleNamespace(text="spam and eggs"))
+        for i in range(599):
+            self.index.remove("Review.x{}".format(i))
+        self.assertLess(len(self.index.keys), 600)
+        self.assertLess(self.index.dead, 1000)
+        self.assertEqual(self.keys("spam"), ["Review.x599"])
+        self.assertEqual(self.keys("loud"), ["Review.2", "Review.3"])
+
+    def test_cache(self):
+        """Test that cached entries spare tokenizing unchanged texts"""
+        path = os.path.join(tempfile.mkdtemp(), "file.json.fts")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        fulltext.save_cache(path, [self.index])
+        self.assertEqual(self.index.stale, 0)
+        cache = fulltext.load_cache(path)["Review.text"]
+        index = FullTextIndex("Review", "text")
+        index.cache = cache
+        for key, text in self.texts.items():
+            if key == "Review.3":
+                text = "Changed"
+            index.add(key, SimpleNamespace(text=text))
+        self.assertEqual(index.stale, 1)
+        self.assertEqual([key for key, score in index.search("loud")],
+                         ["Review.2"])
+        self.assertEqual([key for key, score in index.search("changed")],
+                         ["Review.3"])
+
+    def test_unreadable_cache(self):
+        """Test that a missing or foreign cache file is ignored"""
+        path = os.path.join(tempfile.mkdtemp(), "file.json.fts")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        self.assertEqual(fulltext.load_cache(path), {})
+        with open(path, "wb") as f:
+            f.write(b"not a cache")
+        self.assertEqual(fulltext.load_cache(path), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
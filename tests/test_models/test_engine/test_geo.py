@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+"""
+Contains the TestGeo class
+"""
+
+from models.engine import geo
+import pycodestyle as pep8
+import unittest
+
+
+class TestGeoDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the geo module"""
+
+    def test_pep8_conformance_geo(self):
+        """Test that models/engine/geo.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/geo.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_geo_module_docstring(self):
+        """Test for the geo.py module docstring"""
+        self.assertTrue(len(geo.__doc__) >= 1, "geo.py needs a docstring")
+
+
+class TestGeo(unittest.TestCase):
+    """Test the distance and bounding box functions"""
+
+    def test_distance(self):
+        """Test the haversine distance between known cities"""
+        sf = (37.7749, -122.4194)
+        la = (34.0522, -118.2437)
+        self.assertAlmostEqual(geo.distance_km(*sf, *la), 559, delta=2)
+        self.assertEqual(geo.distance_km(*sf, *sf), 0)
+        self.assertAlmostEqual(geo.distance_km(0, 179.5, 0, -179.5),
+                               111.2, delta=0.1)
+
+    def test_bounding_box(self):
+        """Test that the box holds the circle and no more than needed"""
+        south, west, north, east = geo.bounding_box(37.0, -122.0, 100)
+        self.assertAlmostEqual(north - 37.0, 0.8993, places=3)
+        self.assertAlmostEqual(37.0 - south, 0.8993, places=3)
+        self.assertGreater(east + 122.0, 0.8993)
+        self.assertLess(east + 122.0, 1.2)
+        for bearing in [(1, 0), (0, 1), (-1, 0), (0, -1)]:
+            lat = 37.0 + bearing[0] * 0.89
+            lng = -122.0 + bearing[1] * 1.12
+            self.assertTrue(geo.in_box(lat, lng, (south, west, north, east)))
+
+    def test_antimeridian(self):
+        """Test a box crossing the antimeridian"""
+        box = geo.bounding_box(0, 179.9, 50)
+        self.assertGreater(box[1], box[3])
+        self.assertTrue(geo.in_box(0, -179.9, box))
+        self.assertTrue(geo.in_box(0, 179.9, box))
+        self.assertFalse(geo.in_box(0, 0, box))
+        self.assertEqual(geo.longitude_ranges(box[1], box[3]),
+                         [(box[1], 180.0), (-180.0, box[3])])
+        self.assertAlmostEqual(geo.box_center(box)[1], 179.9)
+
+    def test_pole(self):
+        """Test that a circle around a pole covers every longitude"""
+        self.assertEqual(geo.bounding_box(89.9, 10, 100)[1:4:2],
+                         (-180.0, 180.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
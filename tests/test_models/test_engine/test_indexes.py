@@ -0,0 +1,217 @@
+#!/usr/bin/python3
+"""
+Contains the TestForeignKeyIndex, TestMultiValueIndex, TestSortedIndex
+and TestGridIndex classes
+"""
+
+from models.engine import indexes
+from models.engine.file_storage import Record
+from models.city import City
+from models.place import Place
+import pycodestyle as pep8
+import unittest
+
+
+class TestIndexesDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the indexes module"""
+
+    def test_pep8_conformance_indexes(self):
+        """Test that models/engine/indexes.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/indexes.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_indexes_module_docstring(self):
+        """Test for the indexes.py module docstring"""
+        self.assertTrue(len(indexes.__doc__) >= 1,
+                        "indexes.py needs a docstring")
+
+
+class TestForeignKeyIndex(unittest.TestCase):
+    """Test the ForeignKeyIndex class"""
+
+    def test_add_lookup_remove(self):
+        """Test that keys are found by value until removed"""
+        index = indexes.ForeignKeyIndex("City", "state_id")
+        city = City(state_id="s1")
+        index.add("City.1", city)
+        index.add("City.2", City(state_id="s1"))
+        self.assertEqual(index.lookup("s1"), ["City.1", "City.2"])
+        index.remove("City.1")
+        self.assertEqual(index.lookup("s1"), ["City.2"])
+        index.remove("City.2")
+        self.assertEqual(index.lookup("s1"), [])
+        self.assertEqual(index.buckets, {})
+
+    def test_reindex(self):
+        """Test that remove then add follows a changed value"""
+        index = indexes.ForeignKeyIndex("City", "state_id")
+        city = City(state_id="s1")
+        index.add("City.1", city)
+        city.state_id = "s2"
+        index.remove("City.1")
+        index.add("City.1", city)
+        self.assertEqual(index.lookup("s1"), [])
+        self.assertEqual(index.lookup("s2"), ["City.1"])
+
+    def test_remove_missing(self):
+        """Test that removing an unknown key is a no-op"""
+        index = indexes.ForeignKeyIndex("City", "state_id")
+        index.remove("City.unknown")
+        self.assertEqual(index.lookup(""), [])
+
+
+class TestMultiValueIndex(unittest.TestCase):
+    """Test the MultiValueIndex class"""
+
+    def test_add_members_remove(self):
+        """Test that a key is found under every element of its list"""
+        index = indexes.MultiValueIndex("Place", "amenity_ids")
+        index.add("Place.1", Place(amenity_ids=["a1", "a2", "a1"]))
+        index.add("Place.2", Place(amenity_ids=["a2"]))
+        index.add("Place.3", Place(amenity_ids=[]))
+        self.assertEqual(set(index.members("a1")), {"Place.1"})
+        self.assertEqual(set(index.members("a2")), {"Place.1", "Place.2"})
+        self.assertEqual(set(index.members("a3")), set())
+        index.remove("Place.1")
+        index.remove("Place.3")
+        self.assertEqual(index.lookup("a1"), [])
+        self.assertEqual(index.lookup("a2"), ["Place.2"])
+        index.remove("Place.2")
+        self.assertEqual(index.buckets, {})
+
+
+class TestSortedIndex(unittest.TestCase):
+    """Test the SortedIndex class"""
+
+    def setUp(self):
+        """Indexes five places by price, one without a numeric price"""
+        self.index = indexes.SortedIndex("Place", "price_by_night")
+        for i, price in enumerate([30, 10, 20, 10, "free"]):
+            self.index.add("Place.{}".format(i),
+                           Place(price_by_night=price))
+
+    def test_scan(self):
+        """Test that keys come in (value, key) order within the range"""
+        index = self.index
+        self.assertEqual(list(index.scan()),
+                         ["Place.1", "Place.3", "Place.2", "Place.0"])
+        self.assertEqual(list(index.scan(15, 30)), ["Place.2", "Place.0"])
+        self.assertEqual(list(index.scan(high=10, reverse=True)),
+                         ["Place.3", "Place.1"])
+        self.assertEqual(index.count(10, 20), 3)
+        self.assertEqual(index.count(40), 0)
+        self.assertEqual(index.lookup(10), ["Place.1", "Place.3"])
+        self.assertNotIn("Place.4", index.values)
+
+    def test_scan_after(self):
+        """Test that a scan resumes past a (value, key) pair"""
+        index = self.index
+        self.assertEqual(list(index.scan(after=(10, "Place.1"))),
+                         ["Place.3", "Place.2", "Place.0"])
+        self.assertEqual(list(index.scan(after=(20, "Place.2"),
+                                         reverse=True)),
+                         ["Place.3", "Place.1"])
+
+    def test_remove(self):
+        """Test that removed keys leave the order"""
+        self.index.remove("Place.1")
+        self.index.remove("Place.4")
+        self.assertEqual(list(self.index.scan()),
+                         ["Place.3", "Place.2", "Place.0"])
+        self.assertEqual(len(self.index.values), 3)
+
+    def test_many_changes(self):
+        """Test that a large batch of changes is merged in one sort"""
+        index = indexes.SortedIndex("Place", "max_guest")
+        places = {"Place.{:05d}".format(i): Place(max_guest=i % 97)
+                  for i in range(3 * indexes.merge_threshold)}
+        for key, place in places.items():
+            index.add(key, place)
+        for key in list(places)[::2]:
+            index.remove(key)
+            del places[key]
+        expected = sorted(places, key=lambda k: (places[k].max_guest, k))
+        self.assertEqual(list(index.scan()), expected)
+        self.assertEqual(index.count(0, 0), len([p for p in places.values()
+                                                 if p.max_guest == 0]))
+
+
+class TestPrefixIndex(unittest.TestCase):
+    """Test the PrefixIndex class"""
+
+    def setUp(self):
+        """Indexes four cities by name, one without a name"""
+        self.index = indexes.PrefixIndex("City", "name")
+        for i, name in enumerate(["San Jose", "santa Cruz", "Sacramento",
+                                  "San Francisco", None]):
+            self.index.add("City.{}".format(i), City(name=name))
+
+    def test_prefix(self):
+        """Test that prefixes match ignoring case, in name order"""
+        index = self.index
+        self.assertEqual(index.prefix("san"),
+                         ["City.3", "City.0", "City.1"])
+        self.assertEqual(index.prefix("SAN ", 1), ["City.3"])
+        self.assertEqual(index.prefix("Sa", 2), ["City.2", "City.3"])
+        self.assertEqual(index.prefix("x"), [])
+        self.assertEqual(len(index.prefix("")), 4)
+        self.assertNotIn("City.4", index.values)
+
+    def test_changes(self):
+        """Test that renamed and removed names are refiled"""
+        index = self.index
+        index.remove("City.3")
+        index.add("City.3", City(name="Oakland"))
+        index.remove("City.0")
+        self.assertEqual(index.prefix("san"), ["City.1"])
+        self.assertEqual(index.prefix("o"), ["City.3"])
+
+
+class TestGridIndex(unittest.TestCase):
+    """Test the GridIndex class"""
+
+    def test_box(self):
+        """Test that a box returns the keys of the cells it overlaps"""
+        index = indexes.GridIndex("Place", cell=1.0)
+        index.add("Place.1", Place(latitude=37.5, longitude=-122.5))
+        index.add("Place.2", Place(latitude=37.9, longitude=-122.1))
+        index.add("Place.3", Place(latitude=-33.9, longitude=151.2))
+        index.add("Place.4", Place(latitude=None, longitude=None))
+        index.add("Place.5", Place())
+        index.add("Place.6", Record({"__class__": "Place", "id": "6"}))
+        self.assertEqual(sorted(index.box(37, -123, 38, -122)),
+                         ["Place.1", "Place.2"])
+        self.assertEqual(index.box(0, 0, 1, 1), [])
+        self.assertEqual(index.box(-1, -1, 1, 1), [])
+        self.assertEqual(sorted(index.box(-90, -180, 90, 180)),
+                         ["Place.1", "Place.2", "Place.3"])
+        self.assertEqual(index.location("Place.3"), (-33.9, 151.2))
+        self.assertNotIn("Place.4", index.values)
+
+    def test_antimeridian(self):
+        """Test a box crossing the antimeridian"""
+        index = indexes.GridIndex("Place", cell=1.0)
+        index.add("Place.1", Place(latitude=0.5, longitude=179.5))
+        index.add("Place.2", Place(latitude=0.5, longitude=-179.5))
+        index.add("Place.3", Place(latitude=0.5, longitude=0.5))
+        self.assertEqual(sorted(index.box(0, 179, 1, -179)),
+                         ["Place.1", "Place.2"])
+
+    def test_remove(self):
+        """Test that removed keys leave their cell"""
+        index = indexes.GridIndex("Place", cell=1.0)
+        place = Place(latitude=10.5, longitude=10.5)
+        index.add("Place.1", place)
+        place.latitude = 20.5
+        index.remove("Place.1")
+        index.add("Place.1", place)
+        self.assertEqual(index.box(10, 10, 11, 11), [])
+        self.assertEqual(index.box(20, 10, 21, 11), ["Place.1"])
+        index.remove("Place.1")
+        self.assertEqual(index.buckets, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+#!/usr/bin/python3
+"""
+Contains the TestKVStorageDocs and TestKVStorage classes
+"""
+
+import models
+from models.amenity import Amenity
+from models.city import City
+from models.engine import kv_storage
+from models.place import Place
+from models.state import State
+import os
+import pycodestyle as pep8
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+KVStorage = kv_storage.KVStorage
+
+
+class TestKVStorageDocs(unittest.TestCase):
+    """Tests to check the documentation and style of KVStorage class"""
+
+    def test_pep8_conformance_kv_storage(self):
+        """Test that models/engine/kv_storage.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/kv_storage.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_kv_storage_module_docstring(self):
+        """Test for the kv_storage.py module docstring"""
+        self.assertTrue(len(kv_storage.__doc__) >= 1,
+                        "kv_storage.py needs a docstring")
+
+    def test_kv_storage_class_docstring(self):
+        """Test for the KVStorage class docstring"""
+        self.assertTrue(len(KVStorage.__doc__) >= 1,
+                        "KVStorage class needs a docstring")
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing kv storage")
+class TestKVStorage(unittest.TestCase):
+    """Test the KVStorage class on a temporary database"""
+
+    def setUp(self):
+        """Opens a storage in a temporary directory"""
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "file.db")
+        self.opened = []
+        self.storage = self.open()
+        self.state = State(name="California")
+        self.city = City(name="San Francisco", state_id=self.state.id)
+        self.amenity = Amenity(name="Wifi")
+        self.places = [Place(name="Place {}".format(i), city_id=self.city.id,
+                             price_by_night=10 * i,
+                             amenity_ids=[self.amenity.id] if i % 2 else [])
+                       for i in range(4)]
+        for obj in [self.state, self.city, self.amenity] + self.places:
+            self.storage.new(obj)
+        self.storage.save()
+
+    def tearDown(self):
+        """Closes the storages and removes the temporary directory"""
+        for storage in self.opened:
+            storage.shutdown()
+        shutil.rmtree(self.dir)
+
+    def open(self, cache_size=None):
+        """Returns a storage on the temporary database"""
+        storage = KVStorage(self.path, cache_size)
+        storage.reload()
+        self.opened.append(storage)
+        return storage
+
+    def test_persisted(self):
+        """Test that saved objects are read back by another storage"""
+        storage = self.open()
+        city = storage.get(City, self.city.id)
+        self.assertIsNot(city, self.city)
+        self.assertEqual(city.to_dict(), self.city.to_dict())
+        self.assertEqual(storage.count(), 7)
+        self.assertEqual(storage.count(Place), 4)
+        self.assertEqual(sorted(storage.all(Place)),
+                         sorted("Place." + p.id for p in self.places))
+        self.assertEqual(storage.get_many("Place", [self.places[0].id, "x"]),
+                         {self.places[0].id: storage.get(
+                             Place, self.places[0].id)})
+
+    def test_pending(self):
+        """Test that changes are seen before save() and kept until then"""
+        state = State(name="Nevada")
+        self.storage.new(state)
+        self.storage.delete(self.places[0])
+        self.assertIs(self.storage.get(State, state.id), state)
+        self.assertIsNone(self.storage.get(Place, self.places[0].id))
+        self.assertEqual(self.storage.counts()["State"], 2)
+        self.assertEqual(self.storage.count(Place), 3)
+        self.assertIsNone(self.open().get(State, state.id))
+        self.storage.close()
+        self.storage.save()
+        storage = self.open()
+        self.assertEqual(storage.get(State, state.id).name, "Nevada")
+        self.assertIsNone(storage.get(Place, self.places[0].id))
+        self.assertEqual(storage.count(Place), 3)
+
+    def test_indexes(self):
+        """Test that lookups, pages and searches follow saved changes"""
+        storage = self.open()
+        ids = sorted(p.id for p in self.places)
+        self.assertEqual(len(storage.lookup(City, "state_id",
+                                            self.state.id)), 1)
+        self.assertEqual([p.id for p in storage.page(Place, 2, ids[0])],
+                         ids[1:3])
+        self.assertEqual(len(storage.page(Place, city_id=self.city.id)), 4)
+        found = storage.places_search(states=[self.state.id],
+                                      amenities=[self.amenity.id])
+        self.assertEqual(sorted(p.id for p in found),
+                         sorted(p.id for p in self.places[1::2]))
+        ranges = {"price_by_night": (10, 20)}
+        self.assertEqual([p.price_by_night for p in storage.page(
+            Place, ranges=ranges, sort="-price_by_night")], [20, 10])
+        self.assertEqual(storage.places_near(0, 0, 50), [])
+        place = self.places[1]
+        place.amenity_ids = []
+        place.city_id = "elsewhere"
+        self.storage.new(place)
+        self.storage.save()
+        storage = self.open()
+        self.assertEqual(len(storage.lookup(Place, "city_id",
+                                            self.city.id)), 3)
+        self.assertEqual(list(storage.lookup(Place, "city_id", "elsewhere")),
+                         ["Place." + place.id])
+        self.assertEqual([p.id for p in storage.places_search(
+            amenities=[self.amenity.id])], [self.places[3].id])
+
+    def test_cache(self):
+        """Test that the cache of objects keeps at most cache_size objects"""
+        storage = self.open(cache_size=2)
+        for place in self.places:
+            storage.get(Place, place.id)
+        storage.get(Place, self.places[3].id)
+        metrics = storage.metrics()
+        self.assertEqual(metrics["cached"], 2)
+        self.assertEqual(metrics["evictions"], 2)
+        self.assertEqual((metrics["hits"], metrics["misses"]), (1, 4))
+
+    def test_changed_uncached(self):
+        """Test that a change to an object no longer cached is saved,
+        while building a copy of a stored object changes nothing"""
+        storage = self.open(cache_size=0)
+        with mock.patch.object(models, "storage", storage):
+            state = storage.get(State, self.state.id)
+            state.name = "Oregon"
+            storage.save()
+            self.assertEqual(storage.metrics()["last_serialized"], 1)
+            State(**dict(state.to_dict(), name="Copy"))
+            storage.save()
+            self.assertEqual(storage.metrics()["last_serialized"], 0)
+        self.assertEqual(self.open().get(State, self.state.id).name,
+                         "Oregon")
+
+    def test_version(self):
+        """Test that a save changes the version of the classes it writes"""
+        tag, modified = self.storage.version(State)
+        self.assertIsNotNone(modified)
+        self.assertEqual(self.storage.version("User"),
+                         (tag.split(".")[0] + ".0", None))
+        self.storage.new(self.state)
+        self.storage.save()
+        self.assertEqual(self.storage.version(State)[0], tag)
+        self.assertEqual(self.storage.metrics()["last_serialized"], 0)
+        self.state.name = "Oregon"
+        self.storage.new(self.state)
+        self.storage.save()
+        self.assertNotEqual(self.storage.version(State)[0], tag)
+        self.assertEqual(self.open().version(State)[0],
+                         self.storage.version(State)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
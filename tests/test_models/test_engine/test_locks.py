@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+"""
+Contains the TestReadWriteLock and TestFileLock classes
+"""
+
+from models.engine import locks
+import os
+import pycodestyle as pep8
+import shutil
+import tempfile
+import threading
+import unittest
+
+ReadWriteLock = locks.ReadWriteLock
+FileLock = locks.FileLock
+
+
+class TestLocksDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the locks module"""
+
+    def test_pep8_conformance_locks(self):
+        """Test that models/engine/locks.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/locks.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_locks_module_docstring(self):
+        """Test for the locks.py module docstring"""
+        self.assertTrue(len(locks.__doc__) >= 1, "locks.py needs a docstring")
+
+
+class TestReadWriteLock(unittest.TestCase):
+    """Test the ReadWriteLock class"""
+
+    def run_thread(self, target):
+        """Runs target in a thread and returns whether it finished"""
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        thread.join(0.2)
+        return not thread.is_alive()
+
+    def test_readers_share(self):
+        """Test that readers do not wait for each other"""
+        lock = ReadWriteLock()
+
+        def read():
+            with lock.reading():
+                pass
+        with lock.reading():
+            self.assertTrue(self.run_thread(read))
+
+    def test_writer_excludes(self):
+        """Test that readers and writers wait for a writer"""
+        lock = ReadWriteLock()
+        done = []
+
+        def read():
+            with lock.reading():
+                done.append("read")
+        with lock.writing():
+            self.assertFalse(self.run_thread(read))
+            self.assertEqual(done, [])
+        for i in range(50):
+            if done:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(done, ["read"])
+
+    def test_reentrant(self):
+        """Test that the thread holding the lock may take it again"""
+        lock = ReadWriteLock()
+        with lock.writing():
+            with lock.writing():
+                with lock.reading():
+                    pass
+        with lock.reading():
+            with lock.reading():
+                pass
+
+        def write():
+            with lock.writing():
+                pass
+        self.assertTrue(self.run_thread(write))
+
+    def test_no_upgrade(self):
+        """Test that a reader cannot become a writer"""
+        lock = ReadWriteLock()
+        with lock.reading():
+            with self.assertRaises(RuntimeError):
+                with lock.writing():
+                    pass
+
+
+@unittest.skipIf(locks.fcntl is None, "no fcntl on this platform")
+class TestFileLock(unittest.TestCase):
+    """Test the FileLock class"""
+
+    def setUp(self):
+        """Creates a temporary directory"""
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "file.json")
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        shutil.rmtree(self.dir)
+
+    def test_exclusive(self):
+        """Test that a second holder waits for the first one"""
+        acquired = threading.Event()
+
+        def hold():
+            with FileLock(self.path).exclusive():
+                acquired.set()
+        with FileLock(self.path).exclusive():
+            self.assertTrue(os.path.exists(self.path + ".lock"))
+            thread = threading.Thread(target=hold, daemon=True)
+            thread.start()
+            self.assertFalse(acquired.wait(0.2))
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+"""
+Contains the TestMigration classes
+"""
+
+import json
+import models
+from models.engine import migration
+import os
+import pycodestyle as pep8
+import shutil
+import tempfile
+import unittest
+
+Migration = migration.Migration
+stamp = "2017-09-28T21:03:54.000001"
+
+
+def write_records(path):
+    """Writes to path a JSON file of states, cities, one of them naming a
+    missing state, a user, places with amenities and a review, and returns
+    its records"""
+    objects = {}
+
+    def add(cls_name, id, **attrs):
+        """Adds the record of class cls_name and id"""
+        attrs.update({"__class__": cls_name, "id": id,
+                      "created_at": stamp, "updated_at": stamp})
+        objects[cls_name + "." + id] = attrs
+    for i in range(3):
+        add("State", "s{}".format(i), name="State {}".format(i))
+    for i in range(5):
+        add("City", "c{}".format(i), name="City {}".format(i),
+            state_id="s{}".format(i % 3))
+    add("City", "orphan", name="Orphan", state_id="missing")
+    add("User", "u0", email="guest@hbnb", password="pwd")
+    add("Amenity", "a0", name="Wifi")
+    add("Amenity", "a1", name="Pool")
+    for i in range(4):
+        add("Place", "p{}".format(i), name="Place {}".format(i),
+            city_id="c{}".format(i), user_id="u0", price_by_night=10 * i,
+            amenity_ids=["a0", "a1"][:i % 3])
+    add("Review", "r0", text="Nice", place_id="p0", user_id="u0")
+    with open(path, 'w') as f:
+        json.dump(objects, f, indent=1)
+    return objects
+
+
+class TestMigrationDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the migration module"""
+
+    def test_pep8_conformance_migration(self):
+        """Test that models/engine/migration.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/migration.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_migration_module_docstring(self):
+        """Test for the migration.py module docstring"""
+        self.assertTrue(len(migration.__doc__) >= 1,
+                        "migration.py needs a docstring")
+
+    def test_migration_class_docstring(self):
+        """Test for the Migration class docstring"""
+        self.assertTrue(len(Migration.__doc__) >= 1,
+                        "Migration class needs a docstring")
+
+
+class TestRecords(unittest.TestCase):
+    """Test the streaming parser of JSON files"""
+
+    def setUp(self):
+        """Creates a temporary directory"""
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "file.json")
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        shutil.rmtree(self.dir)
+
+    def test_records(self):
+        """Test that records are read in order a few characters at a time"""
+        objects = write_records(self.path)
+        for size in (1, 7, 1 << 20):
+            self.assertEqual(list(migration.records(self.path, size)),
+                             list(objects.items()))
+
+    def test_empty_and_invalid(self):
+        """Test an empty object and malformed files"""
+        for text in ("{}", " { \n } "):
+            with open(self.path, 'w') as f:
+                f.write(text)
+            self.assertEqual(list(migration.records(self.path, 2)), [])
+        for text in ("", "[]", '{"a": 1', '{"a": 1 "b": 2}'):
+            with open(self.path, 'w') as f:
+                f.write(text)
+            with self.assertRaises(ValueError):
+                list(migration.records(self.path, 2))
+
+
+@unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+class TestMigration(unittest.TestCase):
+    """Test copying objects between a JSON file and the database"""
+
+    def setUp(self):
+        """Writes the JSON file to copy"""
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "file.json")
+        self.objects = write_records(self.path)
+
+    def tearDown(self):
+        """Removes the temporary directory and the copied rows"""
+        shutil.rmtree(self.dir)
+        storage = models.storage
+        for cls_name in reversed(migration.order):
+            ids = [key.split(".")[1] for key in self.objects
+                   if key.startswith(cls_name + ".")]
+            for obj in storage.get_many(cls_name, ids).values():
+                storage.delete(obj)
+            storage.save()
+
+    def test_to_db(self):
+        """Test that every object with existing references is copied once"""
+        stats = Migration(models.storage, self.path, chunk=2).to_db()
+        self.assertEqual(stats["City"], {"copied": 5, "skipped": 1})
+        self.assertEqual(stats["place_amenity"],
+                         {"copied": 3, "skipped": 0})
+        self.assertIsNone(models.storage.get("City", "orphan"))
+        place = models.storage.get("Place", "p2")
+        self.assertEqual(place.price_by_night, 20)
+        self.assertEqual(place.number_rooms, 0)
+        self.assertEqual(sorted(a.id for a in place.amenities),
+                         ["a0", "a1"])
+        self.assertFalse(os.path.exists(self.path + ".migration"))
+        stats = Migration(models.storage, self.path).to_db()
+        self.assertEqual(sum(counts["copied"] for counts in stats.values()),
+                         0)
+
+    def test_resume(self):
+        """Test that an interrupted copy resumes after its last chunk"""
+        class Stop(Exception):
+            """Interrupts the copy"""
+
+        def progress(name, done, rate):
+            """Stops after the first chunk of cities"""
+            if name == "City":
+                raise Stop
+        with self.assertRaises(Stop):
+            Migration(models.storage, self.path, chunk=2,
+                      progress=progress).to_db()
+        with open(self.path + ".migration", 'r') as f:
+            self.assertEqual(json.load(f)["done"], {"State": 3, "City": 2})
+        stats = Migration(models.storage, self.path, chunk=2).to_db()
+        self.assertEqual(stats["State"], {"copied": 0, "skipped": 0})
+        self.assertEqual(stats["City"], {"copied": 3, "skipped": 1})
+        self.assertEqual(len(models.storage.get_many(
+            "City", ["c{}".format(i) for i in range(5)])), 5)
+
+    def test_to_file(self):
+        """Test that the copied rows are exported back to a JSON file"""
+        Migration(models.storage, self.path).to_db()
+        path = os.path.join(self.dir, "export.json")
+        Migration(models.storage, path, chunk=2).to_file()
+        with open(path, 'r') as f:
+            exported = json.load(f)
+        for key, record in self.objects.items():
+            if key == "City.orphan":
+                self.assertNotIn(key, exported)
+                continue
+            for attr, value in record.items():
+                self.assertEqual(exported[key][attr], value)
+        self.assertEqual(sorted(os.listdir(self.dir)),
+                         ["export.json", "file.json"])
@@ -0,0 +1,190 @@
+#!/usr/bin/python3
+"""
+Contains the TestEngineOptions, TestSQLite and TestMeteredPool classes
+"""
+
+from models.engine import pool
+import os
+import pycodestyle as pep8
+import shutil
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import StaticPool
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+MeteredPool = pool.MeteredPool
+
+
+class TestPoolDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the pool module"""
+
+    def test_pep8_conformance_pool(self):
+        """Test that models/engine/pool.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/pool.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pool_module_docstring(self):
+        """Test for the pool.py module docstring"""
+        self.assertTrue(len(pool.__doc__) >= 1, "pool.py needs a docstring")
+
+
+class TestEngineOptions(unittest.TestCase):
+    """Test the engine_options function"""
+
+    def test_defaults(self):
+        """Test the options used when nothing is configured"""
+        with mock.patch.dict(os.environ, {}, clear=True):
+            options = pool.engine_options()
+        self.assertIs(options["poolclass"], MeteredPool)
+        self.assertEqual(options["pool_size"], 5)
+        self.assertEqual(options["max_overflow"], 10)
+        self.assertTrue(options["pool_pre_ping"])
+        self.assertNotIn("connect_args", options)
+
+    def test_environment(self):
+        """Test that the environment overrides the defaults"""
+        env = {"HBNB_MYSQL_POOL_SIZE": "20",
+               "HBNB_MYSQL_POOL_MAX_OVERFLOW": "0",
+               "HBNB_MYSQL_POOL_TIMEOUT": "2.5",
+               "HBNB_MYSQL_POOL_RECYCLE": "600",
+               "HBNB_MYSQL_POOL_PRE_PING": "0",
+               "HBNB_MYSQL_STATEMENT_TIMEOUT": "1500"}
+        with mock.patch.dict(os.environ, env, clear=True):
+            options = pool.engine_options()
+        self.assertEqual(options["pool_size"], 20)
+        self.assertEqual(options["max_overflow"], 0)
+        self.assertEqual(options["pool_timeout"], 2.5)
+        self.assertEqual(options["pool_recycle"], 600)
+        self.assertFalse(options["pool_pre_ping"])
+        self.assertEqual(options["connect_args"]["init_command"],
+                         "SET SESSION max_execution_time=1500")
+
+    def test_database_url(self):
+        """Test that HBNB_DB_URL overrides the MySQL database"""
+        env = {"HBNB_MYSQL_USER": "hbnb_dev", "HBNB_MYSQL_PWD": "pwd",
+               "HBNB_MYSQL_HOST": "localhost", "HBNB_MYSQL_DB": "hbnb_dev_db"}
+        with mock.patch.dict(os.environ, env, clear=True):
+            self.assertEqual(pool.database_url(), "mysql+mysqldb://hbnb_dev:"
+                             "pwd@localhost/hbnb_dev_db")
+            os.environ["HBNB_DB_URL"] = "sqlite:///hbnb.db"
+            self.assertEqual(pool.database_url(), "sqlite:///hbnb.db")
+
+
+class TestSQLite(unittest.TestCase):
+    """Test the SQLite engines"""
+
+    def setUp(self):
+        """Creates a temporary directory"""
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        shutil.rmtree(self.dir)
+
+    def test_options(self):
+        """Test the pools of in-memory and file databases"""
+        with mock.patch.dict(os.environ, {}, clear=True):
+            for url in ("sqlite://", "sqlite:///:memory:",
+                        "sqlite:///file:db?mode=memory&uri=true"):
+                options = pool.engine_options(url)
+                self.assertIs(options["poolclass"], StaticPool)
+            options = pool.engine_options("sqlite:///hbnb.db")
+        self.assertIs(options["poolclass"], MeteredPool)
+        self.assertEqual(options["pool_size"], 5)
+        self.assertNotIn("pool_pre_ping", options)
+        self.assertFalse(options["connect_args"]["check_same_thread"])
+
+    def test_pragmas(self):
+        """Test that a new database file and its directory are created in
+        WAL mode with the pragmas of the environment"""
+        path = os.path.join(self.dir, "data", "hbnb.db")
+        env = {"HBNB_SQLITE_SYNCHRONOUS": "FULL",
+               "HBNB_SQLITE_CACHE_SIZE": "-1024"}
+        with mock.patch.dict(os.environ, env, clear=True):
+            engine = pool.create_db_engine("sqlite:///" + path)
+        with engine.connect() as conn:
+            pragma = {name: conn.execute(text("PRAGMA " + name)).scalar()
+                      for name in ("journal_mode", "synchronous",
+                                   "mmap_size", "cache_size",
+                                   "foreign_keys")}
+        engine.dispose()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(pragma, {"journal_mode": "wal", "synchronous": 2,
+                                  "mmap_size": 256 << 20,
+                                  "cache_size": -1024, "foreign_keys": 1})
+
+
+class TestMeteredPool(unittest.TestCase):
+    """Test the MeteredPool class"""
+
+    def setUp(self):
+        """Creates a pool of one connection plus one in overflow"""
+        self.pool = MeteredPool(lambda: sqlite3.connect(":memory:"),
+                                pool_size=1, max_overflow=1, timeout=0.05)
+
+    def tearDown(self):
+        """Closes the pooled connections"""
+        self.pool.dispose()
+
+    def test_checkouts(self):
+        """Test that checkouts and overflow connections are counted"""
+        first = self.pool.connect()
+        stats = self.pool.stats()
+        self.assertEqual(stats["checkouts"], 1)
+        self.assertEqual(stats["checked_out"], 1)
+        self.assertEqual(stats["overflows"], 0)
+        second = self.pool.connect()
+        stats = self.pool.stats()
+        self.assertEqual(stats["checked_out"], 2)
+        self.assertEqual(stats["overflow"], 1)
+        self.assertEqual(stats["overflows"], 1)
+        first.close()
+        second.close()
+        self.assertEqual(self.pool.stats()["checked_out"], 0)
+
+    def test_timeout(self):
+        """Test that waiting past the timeout is counted"""
+        conns = [self.pool.connect(), self.pool.connect()]
+        with self.assertRaises(TimeoutError):
+            self.pool.connect()
+        stats = self.pool.stats()
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertGreaterEqual(stats["max_wait_seconds"], 0.05)
+        for conn in conns:
+            conn.close()
+
+    def test_threads(self):
+        """Test that checkouts from concurrent threads are all counted"""
+        def check_out():
+            """Checks a connection out and back in many times"""
+            for _ in range(200):
+                self.pool.connect().close()
+        self.pool.dispose()
+        self.pool = MeteredPool(lambda: sqlite3.connect(
+            ":memory:", check_same_thread=False), pool_size=4,
+            max_overflow=4, timeout=5)
+        threads = [threading.Thread(target=check_out) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = self.pool.stats()
+        self.assertEqual(stats["checkouts"], 1600)
+        self.assertEqual(stats["timeouts"], 0)
+
+    def test_recreate(self):
+        """Test that the metrics survive dispose()"""
+        self.pool.connect().close()
+        recreated = self.pool.recreate()
+        self.assertEqual(recreated.stats()["checkouts"], 1)
+        recreated.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+#!/usr/bin/python3
+"""
+Contains the TestChangeLog and TestFileStorageLog classes
+"""
+
+import json
+import models
+from models.engine import file_storage, wal
+from models.state import State
+import os
+import pycodestyle as pep8
+import shutil
+import tempfile
+import unittest
+
+FileStorage = file_storage.FileStorage
+ChangeLog = wal.ChangeLog
+
+
+class TestWalDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the wal module"""
+
+    def test_pep8_conformance_wal(self):
+        """Test that models/engine/wal.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/wal.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_wal_module_docstring(self):
+        """Test for the wal.py module docstring"""
+        self.assertTrue(len(wal.__doc__) >= 1, "wal.py needs a docstring")
+
+
+class TestChangeLog(unittest.TestCase):
+    """Test the ChangeLog class"""
+
+    def setUp(self):
+        """Creates a log in a temporary directory"""
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "file.json.log")
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        shutil.rmtree(self.dir)
+
+    def test_append_read(self):
+        """Test that appended changes are read back once"""
+        log = ChangeLog(self.path)
+        log.append([("State.1", {"id": "1"}), ("State.2", None)], (1, 2, 3))
+        reader = ChangeLog(self.path)
+        self.assertEqual(reader.read((1, 2, 3)),
+                         [("State.1", {"id": "1"}), ("State.2", None)])
+        self.assertEqual(reader.read((1, 2, 3)), [])
+        log.append([("State.3", None)], (1, 2, 3))
+        self.assertEqual(reader.read((1, 2, 3)), [("State.3", None)])
+
+    def test_stale_base(self):
+        """Test that a log written for another snapshot is ignored"""
+        ChangeLog(self.path).append([("State.1", None)], (1, 2, 3))
+        self.assertEqual(ChangeLog(self.path).read((1, 2, 4)), [])
+
+    def test_torn_tail(self):
+        """Test that a partially written last line is never applied"""
+        log = ChangeLog(self.path)
+        log.append([("State.1", None)], (1, 2, 3))
+        with open(self.path, "a") as f:
+            f.write('{"key": "State.2", "rec')
+        reader = ChangeLog(self.path)
+        self.assertEqual(reader.read((1, 2, 3)), [("State.1", None)])
+        log.append([("State.3", None)], (1, 2, 3))
+        self.assertEqual(reader.read((1, 2, 3)), [("State.3", None)])
+
+
+class TestFileStorageLog(unittest.TestCase):
+    """Test FileStorage with a write-ahead log"""
+
+    def setUp(self):
+        """Points FileStorage at a temporary file"""
+        self.saved = (FileStorage._FileStorage__file_path,
+                      FileStorage._FileStorage__objects)
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "file.json")
+        FileStorage._FileStorage__file_path = self.path
+        self.restart()
+
+    def tearDown(self):
+        """Restores the original FileStorage file and objects"""
+        (FileStorage._FileStorage__file_path,
+         FileStorage._FileStorage__objects) = self.saved
+        FileStorage._FileStorage__records = {}
+        FileStorage._FileStorage__signature = None
+        shutil.rmtree(self.dir)
+
+    def restart(self):
+        """Forgets all state, as a freshly started process would"""
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__records = {}
+        FileStorage._FileStorage__signature = None
+        self.storage = FileStorage(log=True)
+        self.storage.reload()
+
+    def snapshot(self):
+        """Returns the content of the JSON snapshot"""
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_save_appends(self):
+        """Test that save logs changes instead of rewriting the file"""
+        self.storage.save()
+        state = State(name="Logged")
+        self.storage.new(state)
+        self.storage.save()
+        self.assertEqual(self.snapshot(), {})
+        self.assertGreater(os.path.getsize(self.path + ".log"), 0)
+        self.restart()
+        self.assertEqual(self.storage.get(State, state.id).name, "Logged")
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_update_and_delete(self):
+        """Test that updates and deletes are replayed"""
+        self.storage.save()
+        kept = State(name="Before")
+        gone = State(name="Gone")
+        self.storage.new(kept)
+        self.storage.new(gone)
+        self.storage.save()
+        kept.name = "After"
+        self.storage.delete(gone)
+        self.storage.save()
+        self.restart()
+        self.assertEqual(self.storage.get(State, kept.id).name, "After")
+        self.assertIsNone(self.storage.get(State, gone.id))
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_compact(self):
+        """Test that compact folds the log into the snapshot"""
+        self.storage.save()
+        state = State(name="Compacted")
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.compact()
+        self.assertIn("State." + state.id, self.snapshot())
+        self.restart()
+        self.assertEqual(self.storage.get(State, state.id).name, "Compacted")
+
+    @unittest.skipIf(models.storage_t in ('db', 'kv'),
+                     "not testing file storage")
+    def test_full_save_discards_log(self):
+        """Test that a log older than the snapshot is not replayed"""
+        self.storage.save()
+        state = State(name="Logged")
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.delete(state)
+        FileStorage().save()
+        self.restart()
+        self.assertIsNone(self.storage.get(State, state.id))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,17 @@
 #!/usr/bin/python3
 """
-Contains the TestPlaceDocs classes
+Contains the TestPlaceDocs, TestPlace and TestPlaceAPI classes
 """
 
+from api.v1.app import app
 from datetime import datetime
 import inspect
 import models
-from models import place
+from models import place, storage
+from models.amenity import Amenity
+from models.city import City
+from models.state import State
+from models.user import User
 from models.base_model import BaseModel
 import pycodestyle as pep8
 import unittest
@@ -198,3 +203,195 @@ class TestPlace(unittest.TestCase):
         place = Place()
         string = "[Place] ({}) {}".format(place.id, place.__dict__)
         self.assertEqual(string, str(place))
+
+
+class TestPlaceAPI(unittest.TestCase):
+    """Test the Place API endpoints"""
+
+    def setUp(self):
+        """Creates two states with a city and places, one with Wifi"""
+        app.testing = True
+        self.client = app.test_client()
+        self.user = User(email="a@b.c", password="pwd")
+        self.wifi = Amenity(name="Wifi")
+        self.states = [State(name="California"), State(name="Nevada")]
+        self.cities = [City(name="City", state_id=state.id)
+                       for state in self.states]
+        self.places = [Place(name="Place {}".format(i), user_id=self.user.id,
+                             city_id=self.cities[i % 2].id,
+                             price_by_night=100 * (i + 1), max_guest=i)
+                       for i in range(4)]
+        self.objs = [self.user, self.wifi] + self.states + self.cities + \
+            self.places
+        for obj in self.objs:
+            storage.new(obj)
+        self.places[0].latitude, self.places[0].longitude = -45.1, 169.1
+        self.places[1].latitude, self.places[1].longitude = -45.2, 169.2
+        if models.storage_t == 'db':
+            self.places[0].amenities.append(self.wifi)
+        else:
+            self.places[0].amenity_ids = [self.wifi.id]
+        storage.save()
+
+    def tearDown(self):
+        """Removes the objects created by setUp"""
+        for obj in reversed(self.objs):
+            storage.delete(obj)
+        storage.save()
+
+    def search(self, body, query=""):
+        """Returns the ids listed by POST /api/v1/places_search"""
+        response = self.client.post('/api/v1/places_search' + query,
+                                    json=body)
+        self.assertEqual(response.status_code, 200)
+        return [place["id"] for place in response.json]
+
+    def test_places_search(self):
+        """Test POST /api/v1/places_search filters"""
+        ids = sorted(place.id for place in self.places)
+        everything = self.search({})
+        self.assertEqual(everything, sorted(everything))
+        self.assertTrue(set(ids) <= set(everything))
+        self.assertEqual(self.search({"states": [self.states[0].id]}),
+                         sorted(p.id for p in self.places[0::2]))
+        self.assertEqual(self.search({"states": [self.states[0].id],
+                                      "cities": [self.cities[1].id]}), ids)
+        self.assertEqual(self.search({"cities": [self.cities[0].id],
+                                      "amenities": [self.wifi.id]}),
+                         [self.places[0].id])
+        self.assertEqual(self.search({"states": [], "cities": [],
+                                      "amenities": [self.wifi.id]}),
+                         [self.places[0].id])
+
+    def test_places_search_paginated(self):
+        """Test POST /api/v1/places_search with limit and cursor"""
+        body = {"states": [state.id for state in self.states]}
+        response = self.client.post('/api/v1/places_search?limit=3',
+                                    json=body)
+        self.assertEqual(len(response.json), 3)
+        cursor = response.headers["X-Next-Cursor"]
+        rest = self.search(body, "?limit=3&cursor=" + cursor)
+        self.assertEqual([place["id"] for place in response.json] + rest,
+                         sorted(place.id for place in self.places))
+
+    def test_places_search_invalid(self):
+        """Test POST /api/v1/places_search with a bad body"""
+        response = self.client.post('/api/v1/places_search', data="x",
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/v1/places_search',
+                                    json={"states": "California"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_places_near(self):
+        """Test GET /api/v1/places/near sorts by distance"""
+        response = self.client.get('/api/v1/places/near?lat=-45.21'
+                                   '&lng=169.21&radius_km=20')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([place["id"] for place in response.json],
+                         [self.places[1].id, self.places[0].id])
+        self.assertLess(response.json[0]["distance_km"], 2)
+        response = self.client.get('/api/v1/places/near?lat=-45.21'
+                                   '&lng=169.21&radius_km=20&limit=1')
+        self.assertEqual(len(response.json), 1)
+        for query in ["lat=91&lng=0&radius_km=1", "lat=0&lng=0",
+                      "lat=x&lng=0&radius_km=1", "lat=0&lng=0&radius_km=0"]:
+            with self.subTest(query=query):
+                response = self.client.get('/api/v1/places/near?' + query)
+                self.assertEqual(response.status_code, 400)
+
+    def test_places_within(self):
+        """Test GET /api/v1/places/within lists the places in a box"""
+        response = self.client.get('/api/v1/places/within?south=-45.15'
+                                   '&west=169&north=-45&east=169.15')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([place["id"] for place in response.json],
+                         [self.places[0].id])
+        response = self.client.get('/api/v1/places/within?south=-45'
+                                   '&west=169&north=-46&east=170')
+        self.assertEqual(response.status_code, 400)
+
+    def test_places_sorted(self):
+        """Test the range and sort parameters of the place collections"""
+        url = '/api/v1/cities/{}/places'.format(self.cities[1].id)
+        response = self.client.get(url + '?sort=-price')
+        self.assertEqual([place["id"] for place in response.json],
+                         [self.places[3].id, self.places[1].id])
+        response = self.client.get(url + '?sort=price&limit=1')
+        self.assertEqual(response.json[0]["id"], self.places[1].id)
+        cursor = response.headers["X-Next-Cursor"]
+        response = self.client.get(url + '?sort=price&limit=1&cursor=' +
+                                   cursor)
+        self.assertEqual([place["id"] for place in response.json],
+                         [self.places[3].id])
+        self.assertNotIn("X-Next-Cursor", response.headers)
+        response = self.client.get(url + '?min_price=150&max_guests=2')
+        self.assertEqual([place["id"] for place in response.json],
+                         [self.places[1].id])
+        ids = self.search({"states": [self.states[0].id]},
+                          "?sort=-guests&min_price=100")
+        self.assertEqual(ids, [self.places[2].id, self.places[0].id])
+        for query in ["sort=name", "min_price=cheap", "sort=price&cursor=" +
+                      cursor[:-2], "cursor=" + cursor]:
+            with self.subTest(query=query):
+                response = self.client.get(url + '?' + query)
+                self.assertEqual(response.status_code, 400)
+
+    def test_search(self):
+        """Test GET /api/v1/search over place descriptions"""
+        self.places[0].description = "Xylophone cottage"
+        self.places[1].description = "Cottage near a xylophone museum"
+        storage.save()
+        response = self.client.get('/api/v1/search?q=xylophone+cottage'
+                                   '&type=place')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([place["id"] for place in response.json],
+                         [self.places[0].id, self.places[1].id])
+        self.assertGreater(response.json[0]["score"], 0)
+        response = self.client.get('/api/v1/search?q=xylo*&limit=1')
+        self.assertEqual(len(response.json), 1)
+        for query in ['', '?q=+', '?q=x&type=user', '?q=x&limit=0']:
+            response = self.client.get('/api/v1/search' + query)
+            self.assertEqual(response.status_code, 400)
+
+    def test_batch(self):
+        """Test POST /api/v1/places/batch applies all its items with one
+        save, or none of them"""
+        url = '/api/v1/places/batch'
+        saves = storage.metrics()["saves"]
+        creates = [{"name": "New {}".format(i), "city_id": self.cities[0].id,
+                    "user_id": self.user.id, "max_guest": i}
+                   for i in range(3)]
+        response = self.client.post(url, json={
+            "create": creates,
+            "update": [{"id": self.places[0].id, "name": "Renamed",
+                        "city_id": self.cities[1].id}],
+            "delete": [self.places[3].id]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(storage.metrics()["saves"], saves + 1)
+        created = [item["object"] for item in response.json["create"]]
+        self.objs.extend(storage.get(Place, place["id"])
+                         for place in created)
+        self.objs.remove(self.places[3])
+        self.assertEqual([place["max_guest"] for place in created],
+                         [0, 1, 2])
+        self.assertEqual(response.json["update"][0]["status"], 200)
+        place = storage.get(Place, self.places[0].id)
+        self.assertEqual((place.name, place.city_id),
+                         ("Renamed", self.cities[0].id))
+        self.assertIsNone(storage.get(Place, self.places[3].id))
+        response = self.client.post(url, json={
+            "create": [creates[0], {"name": "No user",
+                                    "city_id": self.cities[0].id},
+                       dict(creates[0], user_id="missing"),
+                       dict(creates[0], id=self.places[1].id)],
+            "delete": [self.places[1].id, "missing"]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([item["status"] for item in
+                          response.json["create"] + response.json["delete"]],
+                         [424, 400, 404, 409, 409, 404])
+        self.assertEqual(storage.metrics()["saves"], saves + 1)
+        self.assertIsNotNone(storage.get(Place, self.places[1].id))
+        for body in [[], {"create": {}}, {"insert": []}]:
+            response = self.client.post(url, json=body)
+            self.assertEqual(response.status_code, 400)
@@ -3,8 +3,9 @@
 Contains the TestStateDocs, TestState classes, and API tests.
 """
 
-import unittest
 import inspect
+import json
+import unittest
 import pycodestyle as pep8
 from api.v1.app import app
 from models import storage
@@ -117,6 +118,90 @@ class TestStateAPI(unittest.TestCase):
         storage.delete(state)
         storage.save()
 
+    def test_get_states_paginated(self):
+        """Test GET /api/v1/states walks every state with limit/cursor"""
+        states = [State(name="Paged {}".format(i)) for i in range(5)]
+        for state in states:
+            storage.new(state)
+        storage.save()
+
+        ids = []
+        url = '/api/v1/states?limit=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.json), 2)
+            ids.extend(state["id"] for state in response.json)
+            url = response.headers.get("X-Next-Cursor")
+            if url:
+                self.assertIn('rel="next"', response.headers["Link"])
+                url = '/api/v1/states?limit=2&cursor=' + url
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(ids), storage.count(State))
+        for state in states:
+            self.assertIn(state.id, ids)
+
+        for state in states:
+            storage.delete(state)
+        storage.save()
+
+    def test_get_states_streamed(self):
+        """Test GET /api/v1/states?stream=1 returns the same array"""
+        state = State(name="Streamed")
+        storage.new(state)
+        storage.save()
+        whole = self.client.get('/api/v1/states')
+        streamed = self.client.get('/api/v1/states?stream=1')
+        self.assertEqual(streamed.status_code, 200)
+        self.assertTrue(streamed.is_streamed)
+        self.assertEqual(json.loads(streamed.data), whole.json)
+        storage.delete(state)
+        storage.save()
+
+    def test_get_states_invalid_page(self):
+        """Test GET /api/v1/states with a bad limit or cursor"""
+        for query in ["limit=0", "limit=abc", "cursor=!!!"]:
+            with self.subTest(query=query):
+                response = self.client.get('/api/v1/states?' + query)
+                self.assertEqual(response.status_code, 400)
+
+    def test_conditional_get(self):
+        """Test that unchanged states are answered 304 Not Modified"""
+        state = State(name="Polled")
+        storage.new(state)
+        storage.save()
+        for url in ['/api/v1/states', '/api/v1/states/' + state.id]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                etag = response.headers["ETag"]
+                response = self.client.get(
+                    url, headers={"If-None-Match": etag})
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.data, b"")
+                self.assertEqual(response.headers["ETag"], etag)
+                response = self.client.get(
+                    url, headers={"If-None-Match": '"stale"'})
+                self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/v1/states/' + state.id)
+        modified = response.headers["Last-Modified"]
+        response = self.client.get('/api/v1/states/' + state.id,
+                                   headers={"If-Modified-Since": modified})
+        self.assertEqual(response.status_code, 304)
+        tags = [self.client.get(url).headers["ETag"] for url in
+                ['/api/v1/states', '/api/v1/states/' + state.id,
+                 '/api/v1/states?limit=1']]
+        self.assertEqual(len(set(tags)), 3)
+        self.client.put('/api/v1/states/' + state.id, json={"name": "New"})
+        for url, etag in zip(['/api/v1/states',
+                              '/api/v1/states/' + state.id], tags):
+            response = self.client.get(url, headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 200)
+        storage.delete(state)
+        storage.save()
+        response = self.client.get('/api/v1/states',
+                                   headers={"If-None-Match": tags[0]})
+        self.assertEqual(response.status_code, 200)
+
 
 if __name__ == '__main__':
     unittest.main()